@@ -26,7 +26,7 @@ goto :start_build
 
 :python_not_found
 echo Python not found in PATH.
-echo Please install Python 3.7+ and add it to your PATH.
+echo Please install Python 3.9+ and add it to your PATH.
 echo.
 pause
 exit /b 1
@@ -58,9 +58,16 @@ echo.
 echo Creating portable .exe with PyInstaller
 echo.
 
-REM Build with PyInstaller
-echo Running PyInstaller
-pyinstaller --onefile --windowed --add-data "update.bat;." --name "DHH-Installer" --icon=NONE --clean installer.py
+REM The sync engine runs before every game launch: a console-mode one-directory
+REM build starts without unpacking itself to %%TEMP%% and can write to stdout
+echo Running PyInstaller (dhh-sync)
+pyinstaller --onedir --console --exclude-module tkinter --name "dhh-sync" --icon=NONE --clean installer.py
+
+if errorlevel 1 goto :build_failed
+
+REM Build with PyInstaller; the installer copies the bundled dhh-sync into each instance
+echo Running PyInstaller (installer)
+pyinstaller --onefile --windowed --add-data "update.bat;." --add-data "dist\dhh-sync;dhh-sync" --name "DHH-Installer" --icon=NONE --clean installer.py
 
 if errorlevel 1 goto :build_failed
 
@@ -73,6 +80,7 @@ if exist dist\DHH-Installer.exe (
     echo Output: dist\DHH-Installer.exe
     echo.
     echo The installer is ready to use. It's a portable .exe file with all dependencies bundled.
+    echo It includes dist\dhh-sync\ and copies it into each instance.
 ) else (
     echo WARNING: Could not find output executable. Check dist directory.
 )
@@ -6,47 +6,172 @@ Interactive installer for Prism Launcher with Ukrainian/English localization
 Complete rewrite with proper instance structure and improved UX
 """
 
-import tkinter as tk
-from tkinter import ttk, messagebox
 import os
 import sys
 import json
+import zlib
+import time
 import shutil
+import hashlib
 import logging
+import argparse
+import tempfile
+import re
+import socket
+import threading
+import functools
 import webbrowser
-from pathlib import Path
+from pathlib import Path, PurePosixPath
+from collections import Counter
+from contextlib import contextmanager, nullcontext
 from threading import Thread
+from dataclasses import dataclass, asdict, replace
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from urllib.parse import urljoin, urlsplit, quote, unquote
 from typing import Optional, Callable
 
+import jvm_tuning
+from jvm_tuning import JvmProfile, java_major_version, physical_memory_mb, tune_jvm
+
 # Try to use requests library for better networking (fallback to urllib)
 try:
     import requests
+    from requests.adapters import HTTPAdapter
     HAS_REQUESTS = True
 except ImportError:
     HAS_REQUESTS = False
     import urllib.request
     import urllib.error
+    import http.client
     import ssl
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(), logging.FileHandler('installer.log', encoding='utf-8')]
-)
+# TOML parser for pack metadata (stdlib on Python 3.11+)
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# GUI toolkit, imported by import_gui() so headless commands work without Tk or a display
+tk = ttk = messagebox = None
+
 logger = logging.getLogger(__name__)
 
+
+def setup_logging(log_file: Optional[str] = 'installer.log', level: int = logging.DEBUG):
+    """Log to stderr and, optionally, a file in the working directory"""
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s', handlers=handlers)
+
+
+def import_gui():
+    """Load tkinter on first use of the GUI"""
+    global tk, ttk, messagebox
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
 # Pack configuration
 PACK_NAME = "DHH"
 PACK_URL = "https://dhh.dobrovolskyi.xyz/pack.toml"
 MINECRAFT_VERSION = "1.21.1"
 NEOFORGE_VERSION = "21.1.218"
 LWJGL_VERSION = "3.3.3"
-MIN_MEMORY = 4096  # 4GB in MB
-MAX_MEMORY = 8192  # 8GB in MB
 PRE_LAUNCH_CMD = 'cmd /c \\"$INST_DIR/minecraft/update.bat\\" \\"$INST_JAVA\\"'
 
+# Pack sync engine configuration
+SYNC_WORKERS = 8  # Parallel downloads (also the keep-alive pool size)
+SYNC_TIMEOUT = 30  # Seconds per connect/read
+SYNC_MANIFEST = 'dhh-manifest.json'  # Local record of installed pack files
+PACK_MANIFEST = 'manifest-{side}.json'  # Compiled per-side manifest next to pack.toml (tools/compile_manifest.py)
+PACK_MANIFEST_FORMAT = 1
+PACK_SNAPSHOT_DIR = 'v/{id}/'  # Immutable per-index copy written by tools/publish.py (id = index hash[:16])
+METADATA_HEADERS = {'Accept-Encoding': 'gzip'}  # TOML/JSON compress well; jars are never re-encoded
+UPDATE_STATE_FILE = 'update-state.json'  # Shared with update.bat / update.sh
+VERIFY_CACHE_FILE = 'verify-cache.json'  # Stat data -> verified hash, next to the state file
+SYNC_ENGINE_NAME = 'dhh-sync'  # Name of the engine copy placed next to update.bat
+SYNC_EXIT_KEPT = 75  # Sync failed but the previous pack version is still installed (EX_TEMPFAIL)
+CHUNK_SIZE = 1024 * 1024  # 1 MB streaming chunks
+HASH_BUFFER = 4 * 1024 * 1024  # 4 MB read buffer when hashing local files
+SYNC_RETRIES = 3  # Attempts per file; interrupted attempts resume with HTTP Range
+PER_HOST_CONNECTIONS = 4  # Concurrent downloads per origin host
+RATE_LIMIT_CHUNK = 64 * 1024  # Smaller chunks keep a bandwidth cap smooth
+ORIGIN_STATS_FILE = 'origin-stats.json'  # Learned per-host latency/throughput
+# Extra origins for jars/zips, tried alongside the metafile URL ({path} is pack-relative)
+MIRRORS = ('https://dhh.dobrovolskyi.xyz/{path}',)
+STORE_MAX_BYTES = 10 * 1024 ** 3  # Shared jar store limit (10 GB), LRU evicted
+STORE_EXTENSIONS = ('.jar', '.zip')  # Immutable files safe to share between instances
+STORE_MTIME = 1_000_000_000  # Fixed mtime of store objects; any in-place write changes it
+GENERATIONS_DIR = '.dhh/generations'  # One complete snapshot per synced pack version (hardlinked)
+GENERATION_FILE = 'generation.json'  # Pack version and file list of a snapshot
+GENERATION_JOURNAL = 'switch.json'  # Exists only while a generation is being made live
+KEEP_GENERATIONS = 3  # The live one plus two to roll back to
+STAGE_LOCK = 'stage.lock'  # In GENERATIONS_DIR while a background update is staging
+STAGE_LOCK_TIMEOUT = 3600  # Seconds after which a stage lock is considered abandoned
+BACKGROUND_WORKERS = 2  # Parallel downloads of a background update (the game is running)
+LOD_INDEX = 'lod/index.json'  # Distant Horizons data next to pack.toml (server/export_lods.py)
+LOD_FORMAT = 1
+LOD_STATE_FILE = 'dhh-lod.json'  # Installed and staged LOD versions, next to the state file
+LOD_STAGING_DIR = '.dhh/lod'  # LOD databases being assembled, made live before the game starts
+LOD_SIDECARS = ('-wal', '-shm', '-journal')  # SQLite files that belong to the database they replace
+LAN_PORT = 8780  # HTTP port of a LAN cache (`serve`)
+LAN_DISCOVERY_PORT = 8781  # UDP port LAN caches answer discovery broadcasts on
+LAN_DISCOVERY_TIMEOUT = 0.3  # Seconds a sync with downloads pending listens for LAN caches
+LAN_PROBE = b'DHH-LAN?'
+LAN_OBJECT_PATH = '/dhh-cache/{hash_format}/{hash}/{filename}'  # Hash-addressed files on a LAN cache
+LAN_PACK_TTL = 15  # Seconds a LAN cache serves pack.toml before revalidating upstream
+LAN_WAIT = 20  # Seconds a LAN request waits for an upstream fetch before being redirected there
+LAN_STATE_FILE = 'lan-cache.json'  # Last resolved pack, so a LAN cache can restart offline
+TRACE_FILE = 'dhh-trace.jsonl'  # Span trace of sync runs, next to the state file
+INSTALLER_TRACE_FILE = 'installer-trace.jsonl'  # Span trace of the GUI, next to installer.log
+TRACE_MAX_BYTES = 2 * 1024 * 1024  # Trace is rotated to .1 beyond this size
+PROFILE_INTERVAL = 0.005  # Seconds between stack samples in --profile mode
+
+# Hardware tiers: pack configs merged with per-tier settings on the client
+TIERS = ('low', 'medium', 'high', 'ultra')
+TIER_STATE_FILE = 'dhh-tier.json'  # Chosen tier and the config values last written for it
+TIER_DEFAULTS_DIR = '.dhh/defaults'  # Pristine copies of tiered pack configs, merged into the live ones
+GPU_VENDORS = {'0x10de': 'nvidia', '0x1002': 'amd', '0x8086': 'intel'}  # PCI vendor ids
+# Highest tier each GPU vendor gets (integrated Intel and macOS OpenGL struggle with shaders + LODs)
+GPU_TIER_CAP = {'nvidia': 'ultra', 'amd': 'ultra', 'intel': 'medium', 'apple': 'medium', None: 'high'}
+# Settings per config file and tier; values are written verbatim (TOML/properties syntax).
+# DH's [server] section only applies to the integrated (single-player) server.
+TIER_SETTINGS = {
+    'config/DistantHorizons.toml': {
+        'server.realTimeUpdateDistanceRadiusInChunks': ('64', '128', '256', '256'),
+        'server.maxGenerationRequestDistance': ('512', '1024', '2048', '4096'),
+        'server.maxSyncOnLoadRequestDistance': ('512', '1024', '2048', '4096'),
+        'server.generationRequestRateLimit': ('5', '10', '20', '20'),
+        'common.multiThreading.threadRunTimeRatio': ('"0.5"', '"0.75"', '"1.0"', '"1.0"'),
+        'common.worldGenerator.distantGeneratorMode': ('"SURFACE"', '"FEATURES"', '"FEATURES"', '"FEATURES"'),
+        'client.advanced.graphics.quality.lodChunkRenderDistanceRadius': ('64', '128', '256', '512'),
+        'client.advanced.graphics.quality.maxHorizontalResolution': ('"TWO_BLOCKS"', '"BLOCK"', '"BLOCK"', '"BLOCK"'),
+        'client.advanced.graphics.quality.horizontalQuality': ('"LOW"', '"MEDIUM"', '"MEDIUM"', '"HIGH"'),
+        'client.advanced.graphics.quality.verticalQuality': ('"LOW"', '"MEDIUM"', '"MEDIUM"', '"HIGH"'),
+        'client.advanced.graphics.quality.transparency': ('"FAKE"', '"COMPLETE"', '"COMPLETE"', '"COMPLETE"'),
+        'client.advanced.graphics.quality.lodBiomeBlending': ('1', '3', '3', '5'),
+        'client.advanced.graphics.ssao.enableSsao': ('false', 'true', 'true', 'true'),
+    },
+    # Shaders off on low; otherwise the pack's shaderpack, with shorter shadow distances on weaker tiers
+    'config/iris.properties': {
+        'enableShaders': ('false', 'true', 'true', 'true'),
+        'maxShadowRenderDistance': ('8', '8', '12', '16'),
+    },
+}
+DH_THREADS_KEY = 'common.multiThreading.numberOfThreads'
+DH_THREAD_SHARE = (0.25, 0.34, 0.5, 0.5)  # Fraction of cores given to DH world gen/LOD building per tier
+
 PRISM_DOWNLOAD_URL = "https://prismlauncher.org/download/"
+PRISM_CACHE_FILE = 'prism-location.json'  # Last discovered launcher, in the per-user dir
+PRISM_PROBE_WORKERS = 6  # Candidate directories searched concurrently
+PRISM_PROBE_DEPTH = 3  # Subdirectory levels searched below each candidate
+PRISM_PROBE_TIMEOUT = 15  # Seconds before discovery gives up on slow mounts
+# Launcher data folders that never contain the executable but can be huge
+PRISM_SKIP_DIRS = {'instances', 'libraries', 'assets', 'meta', 'cache', 'logs', 'icons', 'themes'}
 
 # Translations
 TRANSLATIONS = {
@@ -65,7 +190,10 @@ TRANSLATIONS = {
         'copying_files': 'Копіювання файлів...',
         'configuring': 'Налаштування...',
         'success': 'Встановлення завершено!',
-        'success_desc': 'Модпак DHH успішно встановлено.\n\nТепер ви можете запустити його через Prism Launcher.\nПри першому запуску буде завантажено моди.',
+        'success_desc': 'Модпак DHH успішно встановлено.\n\nУсі моди вже завантажено, тож можна одразу запускати його через Prism Launcher.',
+        'success_desc_deferred': 'Модпак DHH успішно встановлено.\n\nТепер ви можете запустити його через Prism Launcher.\nПри першому запуску буде завантажено моди.',
+        'downloading_mods': 'Завантаження модів...',
+        'download_progress': '{done:.0f} / {total:.0f} МБ  •  {speed:.1f} МБ/с  •  залишилось {eta}',
         'error': 'Помилка',
         'error_instance_create': 'Не вдалося створити екземпляр.',
         'error_file_copy': 'Не вдалося скопіювати файли.',
@@ -91,7 +219,10 @@ TRANSLATIONS = {
         'copying_files': 'Copying files...',
         'configuring': 'Configuring...',
         'success': 'Installation complete!',
-        'success_desc': 'DHH modpack has been successfully installed.\n\nYou can now launch it through Prism Launcher.\nMods will be downloaded on first launch.',
+        'success_desc': 'DHH modpack has been successfully installed.\n\nAll mods are already downloaded, so you can launch it through Prism Launcher right away.',
+        'success_desc_deferred': 'DHH modpack has been successfully installed.\n\nYou can now launch it through Prism Launcher.\nMods will be downloaded on first launch.',
+        'downloading_mods': 'Downloading mods...',
+        'download_progress': '{done:.0f} / {total:.0f} MB  •  {speed:.1f} MB/s  •  {eta} left',
         'error': 'Error',
         'error_instance_create': 'Failed to create instance.',
         'error_file_copy': 'Failed to copy files.',
@@ -105,305 +236,2806 @@ TRANSLATIONS = {
 }
 
 
-class InstallerApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title(TRANSLATIONS['uk']['title'])
-        self.root.geometry('600x450')
-        self.root.resizable(False, False)
-        
-        # Center window on screen
-        self.root.update_idletasks()
-        width = self.root.winfo_width()
-        height = self.root.winfo_height()
-        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
-        y = (self.root.winfo_screenheight() // 2) - (height // 2)
-        self.root.geometry(f'+{x}+{y}')
-        
-        # Language (default: Ukrainian)
-        self.current_lang = 'uk'
-        
-        # Prism Launcher paths
-        self.prism_path: Optional[Path] = None
-        self.prism_instances_path: Optional[Path] = None
-        
-        # Pack configuration
-        self.instance_name = PACK_NAME
-        
-        # Created instance path (for success screen)
-        self.created_instance_path: Optional[Path] = None
-        
-        # Setup UI
-        self.setup_ui()
-        
-        logger.info("Installer initialized")
+class SyncError(Exception):
+    """Raised when the pack cannot be synchronised"""
+
+
+class HttpResponse:
+    """Streaming HTTP response shared by the requests and urllib backends"""
     
-    def setup_ui(self):
-        """Setup the user interface"""
-        # Main container
-        self.main_frame = ttk.Frame(self.root, padding="20")
-        self.main_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Header with language toggle
-        header_frame = ttk.Frame(self.main_frame)
-        header_frame.pack(fill=tk.X, pady=(0, 20))
-        
-        self.title_label = ttk.Label(header_frame, text=self.t('title'), font=('Segoe UI', 18, 'bold'))
-        self.title_label.pack(side=tk.LEFT)
-        
-        self.lang_button = ttk.Button(header_frame, text=self.t('language_toggle'), 
-                                command=self.toggle_language, width=15)
-        self.lang_button.pack(side=tk.RIGHT)
-        
-        # Content frame (changes based on state)
-        self.content_frame = ttk.Frame(self.main_frame)
-        self.content_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Show welcome screen initially
-        self.show_welcome_screen()
+    def __init__(self, status: int, headers, url: str, chunks: Callable, release: Callable):
+        self.status = status
+        self.headers = {k.lower(): v for k, v in headers.items()}
+        self.url = url
+        self._chunks = chunks
+        self._release = [release]
     
-    def t(self, key: str) -> str:
-        """Get translation for current language"""
-        return TRANSLATIONS[self.current_lang].get(key, key)
+    def iter_content(self, chunk_size: int = CHUNK_SIZE):
+        """Yield the body in chunks"""
+        return self._chunks(chunk_size)
     
-    def toggle_language(self):
-        """Toggle between Ukrainian and English"""
-        self.current_lang = 'en' if self.current_lang == 'uk' else 'uk'
-        self.update_ui_text()
+    def read(self) -> bytes:
+        """Read the whole body"""
+        return b''.join(self.iter_content())
     
-    def update_ui_text(self):
-        """Update all UI text when language changes"""
-        self.root.title(self.t('title'))
-        self.title_label.config(text=self.t('title'))
-        self.lang_button.config(text=self.t('language_toggle'))
-        
-        # Update button texts if they exist
-        for widget in self.content_frame.winfo_children():
-            if isinstance(widget, ttk.Button):
-                # Update known buttons by their current text patterns
-                widget.update()
+    def on_close(self, callback: Callable):
+        """Run callback when the response is closed"""
+        self._release.append(callback)
     
-    def clear_content(self):
-        """Clear content frame"""
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        callbacks, self._release = self._release, []
+        for callback in callbacks:
+            callback()
     
-    def show_welcome_screen(self):
-        """Show welcome screen"""
-        self.clear_content()
-        
-        # Welcome message
-        welcome_label = ttk.Label(self.content_frame, text=self.t('welcome'), 
-                                 font=('Segoe UI', 14, 'bold'))
-        welcome_label.pack(pady=(40, 10))
-        
-        desc_label = ttk.Label(self.content_frame, text=self.t('welcome_desc'),
-                              justify=tk.CENTER, wraplength=500, font=('Segoe UI', 10))
-        desc_label.pack(pady=(0, 40))
-        
-        # Start button
-        start_btn = ttk.Button(self.content_frame, text=self.t('start_installation'), 
-                              command=self.start_installation, width=25)
-        start_btn.pack(pady=20)
+    def __enter__(self):
+        return self
     
-    def show_prism_not_found_screen(self):
-        """Show Prism Launcher not found screen with download instructions"""
-        self.clear_content()
-        
-        # Warning icon (using emoji)
-        icon_label = ttk.Label(self.content_frame, text="⚠️", font=('Segoe UI', 48))
-        icon_label.pack(pady=(20, 10))
-        
-        # Title
-        title_label = ttk.Label(self.content_frame, text=self.t('prism_not_found'),
-                               font=('Segoe UI', 14, 'bold'))
-        title_label.pack(pady=(0, 10))
-        
-        # Description
-        desc_label = ttk.Label(self.content_frame, text=self.t('prism_not_found_desc'),
-                              justify=tk.CENTER, wraplength=500, font=('Segoe UI', 10))
-        desc_label.pack(pady=(0, 30))
-        
-        # Buttons frame
-        btn_frame = ttk.Frame(self.content_frame)
-        btn_frame.pack(pady=20)
-        
-        # Download button (primary)
-        download_btn = ttk.Button(btn_frame, text=self.t('download_prism'),
-                                 command=self.open_prism_download, width=20)
-        download_btn.pack(side=tk.LEFT, padx=10)
-        
-        # Check again button
-        check_btn = ttk.Button(btn_frame, text=self.t('check_again'),
-                              command=self.check_prism_again, width=20)
-        check_btn.pack(side=tk.LEFT, padx=10)
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HttpClient:
+    """Thread-safe HTTP client with keep-alive connection pooling
     
-    def show_progress_screen(self, message: str):
-        """Show progress screen with spinner"""
-        self.clear_content()
-        
-        # Spacer
-        ttk.Frame(self.content_frame).pack(pady=50)
-        
-        # Status message
-        self.status_label = ttk.Label(self.content_frame, text=message,
-                                      font=('Segoe UI', 12))
-        self.status_label.pack(pady=20)
-        
-        # Progress bar (indeterminate)
-        self.progress = ttk.Progressbar(self.content_frame, mode='indeterminate', length=400)
-        self.progress.pack(pady=20)
-        self.progress.start(10)
+    Uses a requests Session when available, otherwise keeps one
+    http.client connection per host and thread so that consecutive
+    downloads from the same CDN reuse the TLS session.
+    """
     
-    def update_status(self, message: str):
-        """Update status message"""
-        if hasattr(self, 'status_label'):
-            self.status_label.config(text=message)
-        self.root.update_idletasks()
+    MAX_REDIRECTS = 5
     
-    def show_success_screen(self):
-        """Show success screen"""
-        self.clear_content()
-        
-        # Success icon
-        icon_label = ttk.Label(self.content_frame, text="✅", font=('Segoe UI', 48))
-        icon_label.pack(pady=(30, 10))
-        
-        # Title
-        title_label = ttk.Label(self.content_frame, text=self.t('success'),
-                               font=('Segoe UI', 14, 'bold'))
-        title_label.pack(pady=(0, 10))
-        
-        # Description
-        desc_label = ttk.Label(self.content_frame, text=self.t('success_desc'),
-                              justify=tk.CENTER, wraplength=500, font=('Segoe UI', 10))
-        desc_label.pack(pady=(0, 20))
-        
-        # Instance path
-        if self.created_instance_path:
-            path_frame = ttk.Frame(self.content_frame)
-            path_frame.pack(pady=10)
+    def __init__(self, pool_size: int = SYNC_WORKERS, timeout: float = SYNC_TIMEOUT):
+        self.timeout = timeout
+        self.user_agent = f"{PACK_NAME}-Installer"
+        if HAS_REQUESTS:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self.session.headers['User-Agent'] = self.user_agent
+        else:
+            self._local = threading.local()
+            self._ssl_context = ssl.create_default_context()
+    
+    def request(self, method: str, url: str, headers: Optional[dict] = None) -> HttpResponse:
+        """Send a request and return a streaming response (redirects are followed)"""
+        if HAS_REQUESTS:
+            try:
+                resp = self.session.request(method, url, headers=headers, stream=True,
+                                            timeout=self.timeout, allow_redirects=True)
+            except requests.RequestException as e:
+                raise SyncError(f"{method} {url} failed: {e}") from e
             
-            path_label = ttk.Label(path_frame, text=self.t('instance_path'),
-                                  font=('Segoe UI', 9))
-            path_label.pack(side=tk.LEFT)
+            def chunks(n):
+                try:
+                    yield from resp.iter_content(n)
+                except requests.RequestException as e:
+                    raise SyncError(f"{method} {url} interrupted: {e}") from e
             
-            path_value = ttk.Label(path_frame, text=str(self.created_instance_path),
-                                  font=('Segoe UI', 9, 'italic'))
-            path_value.pack(side=tk.LEFT, padx=5)
-        
-        # Buttons
-        btn_frame = ttk.Frame(self.content_frame)
-        btn_frame.pack(pady=30)
-        
-        # Launch Prism button
-        if self.prism_path:
-            launch_btn = ttk.Button(btn_frame, text=self.t('launch_prism'),
-                                   command=self.launch_prism, width=20)
-            launch_btn.pack(side=tk.LEFT, padx=10)
+            return HttpResponse(resp.status_code, resp.headers, resp.url, chunks, resp.close)
         
-        # Close button
-        close_btn = ttk.Button(btn_frame, text=self.t('close'),
-                              command=self.root.quit, width=15)
-        close_btn.pack(side=tk.LEFT, padx=10)
+        for _ in range(self.MAX_REDIRECTS + 1):
+            resp, release = self._urllib_request(method, url, headers or {})
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader('Location'):
+                location = urljoin(url, resp.getheader('Location'))
+                resp.read()
+                release()
+                url = location
+                continue
+            
+            # Only sent when a caller asked for it (METADATA_HEADERS); requests decodes by itself
+            gzipped = (resp.getheader('Content-Encoding') or '').lower() == 'gzip'
+            
+            def chunks(n, resp=resp, gzipped=gzipped):
+                decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+                while True:
+                    try:
+                        chunk = resp.read(n)
+                    except (http.client.HTTPException, OSError) as e:
+                        raise SyncError(f"{method} {url} interrupted: {e}") from e
+                    if not chunk:
+                        break
+                    yield decoder.decompress(chunk) if decoder else chunk
+                if decoder:
+                    yield decoder.flush()
+            
+            return HttpResponse(resp.status, dict(resp.getheaders()), url, chunks, release)
+        raise SyncError(f"Too many redirects: {url}")
     
-    def show_error(self, message: str):
-        """Show error dialog and reset to welcome screen"""
-        if hasattr(self, 'progress'):
-            self.progress.stop()
-        messagebox.showerror(self.t('error'), message)
-        self.show_welcome_screen()
+    def get(self, url: str, headers: Optional[dict] = None) -> HttpResponse:
+        """GET a URL, raising SyncError for non-2xx responses"""
+        resp = self.request('GET', url, headers)
+        if resp.status >= 400:
+            resp.close()
+            raise SyncError(f"GET {url} returned HTTP {resp.status}")
+        return resp
     
-    def open_prism_download(self):
-        """Open Prism Launcher download page in browser"""
-        logger.info(f"Opening download page: {PRISM_DOWNLOAD_URL}")
-        webbrowser.open(PRISM_DOWNLOAD_URL)
+    def get_bytes(self, url: str) -> bytes:
+        """GET a small resource fully into memory"""
+        with self.get(url, METADATA_HEADERS) as resp:
+            return resp.read()
     
-    def check_prism_again(self):
-        """Re-check for Prism Launcher after user installs it"""
-        self.show_progress_screen(self.t('checking_prism'))
+    def _urllib_request(self, method: str, url: str, headers: dict):
+        """Send a request over a pooled per-thread http.client connection"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        pool = getattr(self._local, 'connections', None)
+        if pool is None:
+            pool = self._local.connections = {}
         
-        def check_worker():
-            if self.find_prism_launcher():
-                self.root.after(0, self.continue_installation)
-            else:
-                self.root.after(0, self.show_prism_not_found_screen)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        headers = {'User-Agent': self.user_agent, 'Connection': 'keep-alive', **headers}
         
-        Thread(target=check_worker, daemon=True).start()
-    
-    def launch_prism(self):
-        """Launch Prism Launcher"""
-        if self.prism_path and self.prism_path.exists():
+        # A pooled connection may have been closed by the server; retry once on a fresh one.
+        # Connections leave the pool while in use, since the body may be read on another thread.
+        for attempt in range(2):
+            conn = pool.pop(key, None)
+            if conn is None:
+                if parts.scheme == 'https':
+                    conn = http.client.HTTPSConnection(parts.netloc, timeout=self.timeout,
+                                                       context=self._ssl_context)
+                else:
+                    conn = http.client.HTTPConnection(parts.netloc, timeout=self.timeout)
             try:
-                import subprocess
-                subprocess.Popen([str(self.prism_path)], start_new_session=True)
-                logger.info(f"Launched Prism Launcher: {self.prism_path}")
-            except Exception as e:
-                logger.error(f"Failed to launch Prism: {e}")
-    
-    def start_installation(self):
-        """Start the installation process"""
-        self.show_progress_screen(self.t('checking_prism'))
+                conn.request(method, path, headers=headers)
+                resp = conn.getresponse()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                if attempt:
+                    raise SyncError(f"{method} {url} failed: {e}") from e
         
-        def install_worker():
-            # Step 1: Check for Prism Launcher
-            if not self.find_prism_launcher():
-                self.root.after(0, self.show_prism_not_found_screen)
-                return
-            
-            self.root.after(0, self.continue_installation)
+        def release():
+            # Only fully read responses leave the connection reusable
+            if resp.isclosed() and key not in pool:
+                pool[key] = conn
+            else:
+                conn.close()
         
-        Thread(target=install_worker, daemon=True).start()
+        return resp, release
+
+
+def parse_toml(text: str) -> dict:
+    """Parse TOML text, falling back to a subset parser on old Pythons"""
+    if tomllib is not None:
+        return tomllib.loads(text)
+    return _parse_toml_subset(text)
+
+
+def _parse_toml_subset(text: str) -> dict:
+    """Parse the flat TOML subset packwiz writes (tables, arrays of tables, scalars)"""
+    root: dict = {}
+    current = root
     
-    def continue_installation(self):
-        """Continue installation after Prism is found"""
-        self.show_progress_screen(self.t('prism_found'))
-        
-        def install_worker():
+    def table(keys):
+        node = root
+        for key in keys:
+            node = node.setdefault(key, {})
+            if isinstance(node, list):
+                node = node[-1]
+        return node
+    
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('[['):
+            keys = [k.strip().strip('"') for k in line[2:-2].split('.')]
+            current = {}
+            table(keys[:-1]).setdefault(keys[-1], []).append(current)
+        elif line.startswith('['):
+            current = table([k.strip().strip('"') for k in line[1:-1].split('.')])
+        elif '=' in line:
+            key, value = line.split('=', 1)
+            current[key.strip().strip('"')] = _parse_toml_value(value.strip())
+    return root
+
+
+def _parse_toml_value(value: str):
+    """Parse a single TOML scalar or inline array"""
+    if value.startswith("'"):
+        return value[1:value.index("'", 1)]
+    if value.startswith('"') or value.startswith('['):
+        decoder = json.JSONDecoder()
+        try:
+            return decoder.raw_decode(value)[0]
+        except ValueError:
+            return value
+    value = value.split('#', 1)[0].strip()
+    if value in ('true', 'false'):
+        return value == 'true'
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def new_hasher(hash_format: str):
+    """Create a hashlib object for a packwiz hash-format"""
+    try:
+        return hashlib.new(hash_format.lower())
+    except ValueError:
+        raise SyncError(f"Unsupported hash format: {hash_format}") from None
+
+
+def hash_file(path: Path, hash_format: str) -> str:
+    """Hash a file on disk
+    
+    Reads into one large reusable buffer; hashlib releases the GIL for
+    big updates, so several files can be hashed in parallel threads.
+    """
+    hasher = new_hasher(hash_format)
+    buffer = bytearray(HASH_BUFFER)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+
+def load_json(path: Path, default=None):
+    """Read a JSON file, returning default if it is missing or corrupt"""
+    try:
+        # utf-8-sig: update.bat writes its JSON through PowerShell, which adds a BOM
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return default
+
+
+def save_json(path: Path, data):
+    """Write a JSON file atomically"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class Tracer:
+    """Append-only JSON-lines trace of timed spans and events
+    
+    Every call is a no-op until open() is given a file. Spans nest per
+    thread, and annotate() adds fields to the innermost open span, so deep
+    code can report origins or cache hits without threading state through.
+    """
+    
+    def __init__(self):
+        self._file = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.run_id = None
+    
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+    
+    def open(self, path: Path):
+        """Start appending to path (rotated once it exceeds TRACE_MAX_BYTES)"""
+        path = Path(path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.exists() and path.stat().st_size > TRACE_MAX_BYTES:
+                os.replace(path, path.with_name(path.name + '.1'))
+            self._file = open(path, 'a', encoding='utf-8')
+        except OSError as e:
+            logger.warning(f"Tracing disabled, cannot write {path}: {e}")
+            return
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+        self.event('run', argv=sys.argv[1:], python=sys.version.split()[0], platform=sys.platform,
+                   frozen=getattr(sys, 'frozen', False), requests=HAS_REQUESTS)
+    
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+    
+    def _write(self, record: dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self._file:
+                self._file.write(line + '\n')
+                self._file.flush()
+    
+    def _stack(self) -> list:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+    
+    def event(self, name: str, **fields):
+        """Record a point-in-time event"""
+        if self._file:
+            self._write({'ts': round(time.time(), 3), 'run': self.run_id, 'event': name, **fields})
+    
+    def annotate(self, **fields):
+        """Add fields to the innermost span open on this thread"""
+        if self._file:
+            stack = self._stack()
+            if stack:
+                stack[-1].update(fields)
+    
+    @contextmanager
+    def span(self, name: str, **fields):
+        """Time the enclosed block; yields the span's field dict for extra fields"""
+        if not self._file:
+            yield fields
+            return
+        stack = self._stack()
+        stack.append(fields)
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            fields['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stack.pop()
+            self._write({'ts': round(started_at, 3), 'run': self.run_id, 'span': name,
+                         'ms': round((time.perf_counter() - started) * 1000, 2),
+                         'thread': threading.current_thread().name, **fields})
+
+
+TRACE = Tracer()
+
+
+def traced(name: str):
+    """Decorator recording each call of a function as a trace span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACE.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """Periodically samples the stacks of all threads into folded-stack format
+    
+    cProfile only sees the thread that enabled it, while the hot paths
+    (hashing, downloads) run in worker pools. The output (one
+    "outer;inner;leaf count" line per stack) loads into speedscope or
+    flamegraph.pl.
+    """
+    
+    def __init__(self, path: Path, interval: float = PROFILE_INTERVAL):
+        self.path = Path(path)
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = Thread(target=self._sample, name='profiler', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                for stack, count in self.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info(f"Profile written to {self.path} ({sum(self.samples.values())} samples)")
+        except OSError as e:
+            logger.warning(f"Could not write profile {self.path}: {e}")
+
+
+@contextmanager
+def diagnostics(trace_path: Optional[Path] = None, profile_path: Optional[Path] = None):
+    """Trace and/or profile the enclosed command"""
+    if trace_path:
+        TRACE.open(trace_path)
+    profiler = SamplingProfiler(profile_path) if profile_path else None
+    if profiler:
+        profiler.start()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.stop()
+        TRACE.close()
+
+
+def user_cache_dir() -> Path:
+    """Per-user directory for data shared by all instances (store, discovery cache)"""
+    if sys.platform == 'win32':
+        return Path(os.getenv('LOCALAPPDATA', Path.home() / 'AppData' / 'Local')) / PACK_NAME
+    if sys.platform == 'darwin':
+        return Path.home() / 'Library' / 'Caches' / PACK_NAME
+    return Path(os.getenv('XDG_CACHE_HOME', Path.home() / '.cache')) / PACK_NAME.lower()
+
+
+def default_store_dir() -> Path:
+    """Per-user location of the shared content store"""
+    override = os.getenv('DHH_STORE')
+    if override:
+        return Path(override)
+    return user_cache_dir() / 'store'
+
+
+def detect_java_major(search_dirs: list[Path]) -> Optional[int]:
+    """Newest Java among Prism's managed runtimes, JAVA_HOME and PATH
+    
+    Prism picks a runtime that satisfies Minecraft, so the newest one
+    found is the best guess for what the instance will run.
+    """
+    exe = 'javaw.exe' if sys.platform == 'win32' else 'java'
+    candidates = []
+    for directory in search_dirs:
+        if directory.is_dir():
+            candidates += sorted(directory.glob(f'*/bin/{exe}')) + sorted(directory.glob(f'*/*/bin/{exe}'))
+    if os.getenv('JAVA_HOME'):
+        candidates.append(Path(os.environ['JAVA_HOME']) / 'bin' / exe)
+    on_path = shutil.which('java')
+    if on_path:
+        candidates.append(Path(on_path))
+    
+    versions = [java_major_version(java) for java in dict.fromkeys(candidates[:8]) if java.exists()]
+    versions = [v for v in versions if v]
+    return max(versions) if versions else None
+
+
+def detect_gpu_vendor() -> Optional[str]:
+    """Vendor of the strongest GPU ('nvidia', 'amd', 'intel' or 'apple'), or None if unknown"""
+    import subprocess
+    found = set()
+    if sys.platform.startswith('linux'):
+        for vendor_file in Path('/sys/class/drm').glob('card*/device/vendor'):
             try:
-                # Step 2: Create instance
-                self.root.after(0, lambda: self.update_status(self.t('creating_instance')))
-                instance_path = self.create_instance()
-                if not instance_path:
-                    self.root.after(0, lambda: self.show_error(self.t('error_instance_create')))
-                    return
-                
-                # Step 3: Copy update.bat
-                self.root.after(0, lambda: self.update_status(self.t('copying_files')))
-                if not self.copy_update_bat(instance_path):
-                    self.root.after(0, lambda: self.show_error(self.t('error_file_copy')))
-                    return
-                
-                # Step 4: Configure instance
-                self.root.after(0, lambda: self.update_status(self.t('configuring')))
-                if not self.configure_instance(instance_path):
-                    self.root.after(0, lambda: self.show_error(self.t('error_config')))
+                found.add(GPU_VENDORS.get(vendor_file.read_text().strip().lower()))
+            except OSError:
+                pass
+    else:
+        if sys.platform == 'win32':
+            command = ['powershell', '-NoProfile', '-Command',
+                       'Get-CimInstance Win32_VideoController | ForEach-Object Name']
+        else:
+            command = ['system_profiler', 'SPDisplaysDataType']
+        try:
+            output = subprocess.run(command, capture_output=True, text=True, timeout=15,
+                                    creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)).stdout.lower()
+        except (OSError, subprocess.SubprocessError):
+            output = ''
+        for marker, vendor in (('nvidia', 'nvidia'), ('radeon', 'amd'), ('amd', 'amd'),
+                               ('intel', 'intel'), ('apple', 'apple')):
+            if marker in output:
+                found.add(vendor)
+    # A discrete card wins over the integrated one next to it
+    return next((vendor for vendor in ('nvidia', 'amd', 'intel', 'apple') if vendor in found), None)
+
+
+def classify_hardware(ram_mb: Optional[int], cores: Optional[int], gpu: Optional[str]) -> tuple[str, str]:
+    """Tier for this machine and a readable reason; the weakest component decides
+    
+    Thresholds sit slightly below 8/16/32 GB because installed RAM is
+    reported minus what the firmware and integrated graphics reserve.
+    """
+    by_cores = 1 if cores is None else 0 if cores < 4 else 1 if cores < 6 else 2 if cores < 12 else 3
+    by_ram = 1 if ram_mb is None else 0 if ram_mb < 7 * 1024 else 1 if ram_mb < 15 * 1024 else 2 if ram_mb < 30 * 1024 else 3
+    level = min(by_cores, by_ram, TIERS.index(GPU_TIER_CAP.get(gpu, 'high')))
+    ram = f"{round(ram_mb / 1024)} GB" if ram_mb else 'unknown'
+    return TIERS[level], f"{cores or '?'} cores, {ram} RAM, {gpu or 'unknown'} GPU"
+
+
+def _reflink(src: Path, dest: Path) -> bool:
+    """Copy-on-write clone of src to dest where the filesystem supports it"""
+    if sys.platform.startswith('linux'):
+        import fcntl
+        FICLONE = 0x40049409
+        try:
+            with open(src, 'rb') as s, open(dest, 'wb') as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except OSError:
+            dest.unlink(missing_ok=True)
+            return False
+    if sys.platform == 'darwin':
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.clonefile(os.fsencode(src), os.fsencode(dest), 0) == 0
+    return False
+
+
+def _place_file(src: Path, dest: Path, link: bool) -> str:
+    """Atomically replace dest with src's content: a hardlink if `link`, else a private copy"""
+    tmp_path = dest.with_name(dest.name + '.link')
+    tmp_path.unlink(missing_ok=True)
+    if link:
+        try:
+            os.link(src, tmp_path)
+            os.replace(tmp_path, dest)
+            return 'hardlink'
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+    method = 'reflink' if _reflink(src, tmp_path) else 'copy'
+    if method == 'copy':
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dest)
+    return method
+
+
+class ContentStore:
+    """Content-addressed store of pack jars shared by every instance on this machine
+    
+    Files are keyed by the hash the pack pins for them and placed into
+    instances by hardlink, reflink or (as a last resort) copy. Last use is
+    tracked through atime so that concurrent syncs need no shared index.
+    """
+    
+    def __init__(self, root: Optional[Path] = None, max_bytes: int = STORE_MAX_BYTES):
+        self.root = Path(root) if root else default_store_dir()
+        self.max_bytes = max_bytes
+        self.tmp_dir = self.root / 'tmp'
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+    
+    def path_for(self, hash_format: str, digest: str) -> Path:
+        """Location of an object in the store"""
+        return self.root / hash_format.lower() / digest[:2] / digest
+    
+    def temp_path(self) -> Path:
+        """Fresh temp file on the store's filesystem, so commits are a rename"""
+        fd, name = tempfile.mkstemp(suffix='.part', dir=self.tmp_dir)
+        os.close(fd)
+        return Path(name)
+    
+    def partial_path(self, hash_format: str, digest: str) -> Path:
+        """Stable temp file for an object, so interrupted downloads can resume"""
+        return self.tmp_dir / f'{hash_format.lower()}-{digest}.part'
+    
+    def commit(self, tmp_path: Path, hash_format: str, digest: str) -> Path:
+        """Move a verified temp file into the store"""
+        path = self.path_for(hash_format, digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(tmp_path, 0o644)  # mkstemp creates owner-only files
+        os.utime(tmp_path, (time.time(), STORE_MTIME))
+        os.replace(tmp_path, path)
+        return path
+    
+    def adopt(self, src: Path, hash_format: str, digest: str) -> bool:
+        """Add an already verified file from an instance to the store"""
+        path = self.path_for(hash_format, digest)
+        if path.exists():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(src, path)
+            os.utime(path, (time.time(), STORE_MTIME))
+        except FileExistsError:
+            return False
+        except OSError:
+            tmp_path = self.temp_path()
+            shutil.copyfile(src, tmp_path)
+            self.commit(tmp_path, hash_format, digest)
+        return True
+    
+    def link(self, hash_format: str, digest: str, dest: Path) -> Optional[str]:
+        """Place a stored object at dest, returning the method used or None on a miss"""
+        src = self.path_for(hash_format, digest)
+        try:
+            st = src.stat()
+        except FileNotFoundError:
+            return None
+        if st.st_mtime != STORE_MTIME:
+            # Written through a hardlink since it was stored, so the content is suspect
+            logger.warning(f"Discarding modified store object: {src.name}")
+            src.unlink(missing_ok=True)
+            return None
+        
+        method = _place_file(src, dest, link=True)
+        
+        # Bump atime only: mtime marks the object as unmodified
+        os.utime(src, ns=(time.time_ns(), st.st_mtime_ns))
+        return method
+    
+    def evict(self) -> int:
+        """Drop least recently used objects until the store fits max_bytes"""
+        objects = []
+        total = 0
+        now = time.time()
+        for path in self.root.glob('*/*/*'):
+            if not path.is_file():
+                continue
+            st = path.stat()
+            objects.append((st.st_atime, st.st_size, path))
+            total += st.st_size
+        
+        # Interrupted downloads (and their journals) that were never resumed
+        for path in self.tmp_dir.glob('*.part*'):
+            if now - path.stat().st_mtime > 7 * 86400:
+                path.unlink(missing_ok=True)
+        
+        freed = 0
+        for _, size, path in sorted(objects):
+            if total - freed <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            freed += size
+        if freed:
+            logger.info(f"Evicted {freed} bytes from content store")
+        return freed
+
+
+class Generations:
+    """Complete snapshots of the synced pack versions of one instance
+    
+    A sync downloads into a staging generation and touches the live files
+    only once every file is there and verified, so a failed update leaves
+    the previous version intact. Jars and zips in a generation are
+    hardlinks of the live files, so old versions cost directory entries
+    rather than bytes, and rolling back to one is a round of renames.
+    """
+    
+    def __init__(self, minecraft_dir: Path, keep: int = KEEP_GENERATIONS):
+        self.root = Path(minecraft_dir) / GENERATIONS_DIR
+        self.keep = keep
+        self.history_path = self.root / 'history.json'  # Generation ids, newest first
+        self.journal_path = self.root / GENERATION_JOURNAL
+        self.lock_path = self.root / STAGE_LOCK
+    
+    def staging(self, generation_id: str) -> Path:
+        return self.root / f'.tmp-{generation_id}'
+    
+    def files_dir(self, generation_id: str) -> Path:
+        return self.root / generation_id / 'files'
+    
+    def load(self, generation_id: str) -> Optional[dict]:
+        return load_json(self.root / generation_id / GENERATION_FILE)
+    
+    def history(self) -> list[str]:
+        """Complete generations, newest first"""
+        return [g for g in load_json(self.history_path, []) if (self.root / g / GENERATION_FILE).is_file()]
+    
+    def find(self, rel_path: str, digest: str) -> Optional[Path]:
+        """A kept copy of this exact file, so going forward again after a rollback is free too"""
+        for generation_id in self.history():
+            entry = (self.load(generation_id) or {}).get('files', {}).get(rel_path)
+            path = self.files_dir(generation_id) / rel_path
+            if entry and entry['hash'] == digest and path.is_file():
+                return path
+        return None
+    
+    def commit(self, generation_id: str, info: dict):
+        """Seal the staging directory as a generation"""
+        staging = self.staging(generation_id)
+        save_json(staging / GENERATION_FILE, info)
+        final = self.root / generation_id
+        if final.exists():
+            shutil.rmtree(final)
+        os.replace(staging, final)
+        
+        history = [generation_id] + [g for g in self.history() if g != generation_id]
+        for old in history[self.keep:]:
+            shutil.rmtree(self.root / old, ignore_errors=True)
+        if not self.staging_busy():
+            for leftover in self.root.glob('.tmp-*'):
+                shutil.rmtree(leftover, ignore_errors=True)
+        save_json(self.history_path, history[:self.keep])
+    
+    def staging_busy(self) -> bool:
+        """Whether a background update holds the stage lock"""
+        try:
+            return time.time() - self.lock_path.stat().st_mtime < STAGE_LOCK_TIMEOUT
+        except FileNotFoundError:
+            return False
+    
+    @contextmanager
+    def stage_lock(self):
+        """Hold the stage lock for a background update; yields False if another one holds it"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        if self.lock_path.exists() and not self.staging_busy():
+            self.lock_path.unlink(missing_ok=True)  # Abandoned by a process that died
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            yield False
+            return
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            yield True
+        finally:
+            self.lock_path.unlink(missing_ok=True)
+
+
+class VerifyCache:
+    """Persistent cache of verified hashes keyed by file stat data
+    
+    A file whose size, mtime and inode are unchanged since it was last
+    hashed is not read again, so verifying a warm instance costs one
+    stat per file instead of reading every jar.
+    """
+    
+    RACY_SECONDS = 2  # Files modified this recently may still change within mtime granularity
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries: dict = load_json(path, {})
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _stat_key(st: os.stat_result) -> list:
+        return [st.st_size, st.st_mtime_ns, st.st_ino]
+    
+    def record(self, rel_path: str, file_path: Path, hash_format: str, digest: str):
+        """Remember that file_path, as it is on disk now, has the given hash"""
+        st = file_path.stat()
+        if time.time() - st.st_mtime < self.RACY_SECONDS:
+            return
+        key = self._stat_key(st)
+        with self._lock:
+            entry = self.entries.get(rel_path)
+            if not entry or entry['stat'] != key:
+                entry = self.entries[rel_path] = {'stat': key, 'hashes': {}}
+            entry['hashes'][hash_format] = digest
+    
+    def hash(self, rel_path: str, file_path: Path, hash_format: str) -> Optional[str]:
+        """Hash of a file, from the cache when its stat data is unchanged (None if missing)"""
+        try:
+            st = file_path.stat()
+        except FileNotFoundError:
+            return None
+        
+        entry = self.entries.get(rel_path)
+        if entry and entry['stat'] == self._stat_key(st) and hash_format in entry['hashes']:
+            with self._lock:
+                self.hits += 1
+            return entry['hashes'][hash_format]
+        
+        digest = hash_file(file_path, hash_format)
+        with self._lock:
+            self.misses += 1
+        # Only cache the result if the file did not change while it was being read
+        if self._stat_key(file_path.stat()) == self._stat_key(st):
+            self.record(rel_path, file_path, hash_format, digest)
+        return digest
+    
+    def hash_many(self, items: list[tuple[str, Path, str]], workers: int = SYNC_WORKERS) -> dict:
+        """Hash (rel_path, file_path, hash_format) items in parallel"""
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            digests = pool.map(lambda item: self.hash(*item), items)
+            return {item[0]: digest for item, digest in zip(items, digests)}
+    
+    def save(self, keep: Optional[set] = None):
+        """Persist the cache, dropping entries for files no longer in the pack"""
+        with self._lock:
+            if keep is not None:
+                self.entries = {k: v for k, v in self.entries.items() if k in keep}
+            save_json(self.path, self.entries)
+
+
+@dataclass
+class PackFile:
+    """A single file the pack wants installed"""
+    path: str  # Destination, relative to the minecraft directory
+    url: str
+    hash: str
+    hash_format: str
+    side: str = 'both'
+    preserve: bool = False
+    size: Optional[int] = None  # Bytes, when known from a previous install
+
+
+class RateLimiter:
+    """Token bucket shared by all download threads (global bandwidth cap)"""
+    
+    def __init__(self, bytes_per_second: int):
+        self.rate = bytes_per_second
+        self.allowance = float(bytes_per_second)
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def consume(self, nbytes: int):
+        """Account for nbytes, sleeping if the cap has been exceeded"""
+        with self._lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.last) * self.rate)
+            self.last = now
+            self.allowance -= nbytes
+            delay = -self.allowance / self.rate if self.allowance < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+
+class OriginScheduler:
+    """Per-host connection limits and learned origin ranking for downloads
+    
+    Every jar can come from its own URL or from any configured mirror.
+    Time-to-first-byte and throughput are tracked per host (EWMA) and
+    persisted, so later runs go straight to the fastest origin; hosts
+    without samples yet are raced against each other. LAN caches are
+    tried first and never raced, so a room of installs shares one uplink.
+    """
+    
+    ALPHA = 0.3  # EWMA weight of a new sample
+    MIN_SAMPLE_BYTES = 256 * 1024  # Smaller transfers say more about latency than throughput
+    MAX_FAILURES = 5
+    
+    def __init__(self, stats_path: Path, mirrors: tuple = (), per_host: int = PER_HOST_CONNECTIONS):
+        self.stats_path = stats_path
+        self.stats: dict = load_json(stats_path, {})
+        self.mirrors = list(mirrors)
+        self.local: list[str] = []  # LAN cache templates (see discover_lan_caches)
+        self.per_host = per_host
+        self._slots: dict = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def host(url: str) -> str:
+        return urlsplit(url).netloc
+    
+    def add_local(self, templates: list[str]):
+        """Use LAN caches (URL templates like mirrors) ahead of every other origin"""
+        for template in templates:
+            if template not in self.local:
+                self.local.append(template)
+    
+    def is_local(self, url: str) -> bool:
+        return any(self.host(url) == self.host(template) for template in self.local)
+    
+    def urls_for(self, pack_file: PackFile) -> list[str]:
+        """LAN cache, primary and mirror URLs for immutable pack files
+        
+        Templates may use {path}, {filename}, {hash_format} and {hash}.
+        """
+        if not pack_file.path.lower().endswith(STORE_EXTENSIONS):
+            return [pack_file.url]
+        fields = {
+            'path': quote(pack_file.path),
+            'filename': quote(Path(pack_file.path).name),
+            'hash_format': pack_file.hash_format.lower(),
+            'hash': pack_file.hash,
+        }
+        urls = [template.format(**fields) for template in self.local]
+        for url in [pack_file.url] + [template.format(**fields) for template in self.mirrors]:
+            if url not in urls:
+                urls.append(url)
+        return urls
+    
+    def slot(self, url: str) -> threading.Semaphore:
+        """Semaphore limiting concurrent connections to url's host"""
+        with self._lock:
+            return self._slots.setdefault(self.host(url), threading.Semaphore(self.per_host))
+    
+    def expected_seconds(self, url: str, size: Optional[int]) -> Optional[float]:
+        """Estimated transfer time from url's host, or None if it has no samples"""
+        stats = self.stats.get(self.host(url))
+        if not stats:
+            return None
+        known_bps = sorted(s['bps'] for s in self.stats.values() if s.get('bps'))
+        bps = stats.get('bps') or (known_bps[len(known_bps) // 2] if known_bps else 1024 * 1024)
+        seconds = stats.get('ttfb', 0) + (size or CHUNK_SIZE) / bps
+        return seconds * (1 + stats.get('failures', 0))
+    
+    def rank(self, urls: list[str], size: Optional[int] = None) -> list[str]:
+        """Order candidate URLs fastest first; unmeasured hosts keep configured order
+        
+        LAN caches stay in front until they keep failing.
+        """
+        def key(item):
+            index, url = item
+            expected = self.expected_seconds(url, size)
+            failing = self.stats.get(self.host(url), {}).get('failures', 0) >= 2
+            return (not self.is_local(url) or failing, expected is None, expected or 0, index)
+        return [url for _, url in sorted(enumerate(urls), key=key)]
+    
+    def should_race(self, urls: list[str]) -> bool:
+        """Race the top candidates while any of them is still unmeasured (never a LAN cache)"""
+        return (len(urls) > 1 and not self.is_local(urls[0])
+                and any(self.host(url) not in self.stats for url in urls))
+    
+    def record(self, url: str, ttfb: Optional[float] = None, nbytes: int = 0, seconds: float = 0.0):
+        """Fold a successful request into the host's statistics"""
+        with self._lock:
+            stats = self.stats.setdefault(self.host(url), {})
+            if ttfb is not None:
+                stats['ttfb'] = self._ewma(stats.get('ttfb'), ttfb)
+            if nbytes >= self.MIN_SAMPLE_BYTES and seconds > 0:
+                stats['bps'] = self._ewma(stats.get('bps'), nbytes / seconds)
+                stats['failures'] = max(0, stats.get('failures', 0) - 1)
+    
+    def record_failure(self, url: str):
+        with self._lock:
+            stats = self.stats.setdefault(self.host(url), {})
+            stats['failures'] = min(self.MAX_FAILURES, stats.get('failures', 0) + 1)
+    
+    def _ewma(self, old: Optional[float], sample: float) -> float:
+        return sample if old is None else old + self.ALPHA * (sample - old)
+    
+    def save(self):
+        with self._lock:
+            save_json(self.stats_path, self.stats)
+
+
+class SyncProgress:
+    """Thread-safe byte and file counters for a sync, reported through a callback
+    
+    Files whose size is not known yet are estimated from the average of the
+    known ones, so the total settles as downloads start.
+    """
+    
+    def __init__(self, callback: Optional[Callable[[dict], None]] = None, interval: float = 0.1):
+        self.callback = callback
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._sizes: dict[str, Optional[int]] = {}
+        self._done: dict[str, int] = {}
+        self._finished = 0
+        self._transferred = 0
+        self._started = time.monotonic()
+        self._last_report = 0.0
+    
+    def begin(self, files: list['PackFile']):
+        """Start tracking the files about to be downloaded"""
+        with self._lock:
+            self._sizes = {f.path: f.size for f in files}
+            self._done = dict.fromkeys(self._sizes, 0)
+            self._finished = 0
+            self._transferred = 0
+            self._started = time.monotonic()
+        self.report(force=True)
+    
+    def set_size(self, path: str, size: int):
+        with self._lock:
+            self._sizes[path] = size
+    
+    def restart(self, path: str, offset: int = 0):
+        """A (re)started download already has offset bytes on disk"""
+        with self._lock:
+            self._done[path] = offset
+    
+    def advance(self, path: str, nbytes: int):
+        with self._lock:
+            self._done[path] = self._done.get(path, 0) + nbytes
+            self._transferred += nbytes
+        self.report()
+    
+    def finish(self, path: str, size: Optional[int] = None):
+        """A file is done (installed, or given up on)"""
+        with self._lock:
+            self._finished += 1
+            if size is not None:
+                self._sizes[path] = size
+                self._done[path] = size
+        self.report(force=True)
+    
+    def snapshot(self) -> dict:
+        with self._lock:
+            known = [size for size in self._sizes.values() if size is not None]
+            unknown = len(self._sizes) - len(known)
+            average = sum(known) / len(known) if known else 0
+            total = sum(known) + unknown * average
+            done = sum(self._done.values())
+            elapsed = max(time.monotonic() - self._started, 1e-6)
+            bps = self._transferred / elapsed
+            files_total = len(self._sizes)
+            if total:
+                fraction = min(done / total, 1.0)
+            else:
+                fraction = self._finished / files_total if files_total else 1.0
+            return {
+                'done_bytes': done,
+                'total_bytes': int(max(total, done)),
+                'files_done': self._finished,
+                'files_total': files_total,
+                'bytes_per_second': bps,
+                'eta_seconds': (total - done) / bps if bps and total > done else None,
+                'fraction': fraction,
+            }
+    
+    def report(self, force: bool = False):
+        if not self.callback:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+        self.callback(self.snapshot())
+
+
+def discover_lan_caches(pack_url: str, timeout: float = LAN_DISCOVERY_TIMEOUT) -> list[str]:
+    """Broadcast for LAN caches of this pack and return their base URLs
+    
+    Caches only ever serve files by the hash the upstream pack pins, so
+    an answer from any host on the network is safe to use.
+    """
+    found = []
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            for address in ('255.255.255.255', '127.0.0.1'):
+                try:
+                    sock.sendto(LAN_PROBE, (address, LAN_DISCOVERY_PORT))
+                except OSError:
+                    pass
+            deadline = time.monotonic() + timeout
+            while (remaining := deadline - time.monotonic()) > 0:
+                sock.settimeout(remaining)
+                try:
+                    data, (host, _) = sock.recvfrom(4096)
+                    reply = json.loads(data)
+                except socket.timeout:
+                    break
+                except (OSError, ValueError):
+                    continue
+                if not isinstance(reply, dict) or reply.get('pack_url') != pack_url:
+                    continue
+                base = f"http://{host}:{int(reply.get('port', LAN_PORT))}"
+                if base not in found:
+                    found.append(base)
+    except OSError as e:
+        logger.debug(f"LAN discovery failed: {e}")
+    TRACE.event('lan_discovery', caches=found)
+    return found
+
+
+def _close_response(future):
+    """Done-callback that closes the response of a request that lost a race"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+CONFIG_SECTION = re.compile(r'^\[([^\[\]]+)\]$')
+CONFIG_ENTRY = re.compile(r'^(\s*)([A-Za-z0-9_.\-]+)(\s*=\s*)(.*?)\s*$')
+
+
+def _config_entries(lines: list[str], fmt: str):
+    """(line index, dotted key, match) for every key = value line of a TOML or .properties file"""
+    section = ''
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped or stripped[0] in '#!':
+            continue
+        header = CONFIG_SECTION.match(stripped) if fmt == 'toml' else None
+        if header:
+            section = header.group(1).strip() + '.'
+            continue
+        match = CONFIG_ENTRY.match(line.rstrip('\r\n'))
+        if match:
+            yield i, section + match.group(2), match
+
+
+def read_config_values(text: str, fmt: str) -> dict[str, str]:
+    """Raw value of every key, by dotted path"""
+    return {key: match.group(4) for _, key, match in _config_entries(text.splitlines(), fmt)}
+
+
+def write_config_values(text: str, fmt: str, values: dict[str, str]) -> str:
+    """Replace raw values in place, keeping comments, indentation and line endings
+    
+    Missing keys are appended to .properties files; in TOML they are
+    skipped, since DH regenerates its file on launch anyway.
+    """
+    lines = text.splitlines(keepends=True)
+    pending = dict(values)
+    for i, key, match in _config_entries(lines, fmt):
+        if key in pending:
+            ending = lines[i][len(lines[i].rstrip('\r\n')):]
+            lines[i] = f"{match.group(1)}{match.group(2)}{match.group(3)}{pending.pop(key)}{ending}"
+    if pending and fmt == 'properties':
+        eol = '\r\n' if '\r\n' in text else '\n'
+        if lines and not lines[-1].endswith('\n'):
+            lines[-1] += eol
+        lines += [f"{key}={value}{eol}" for key, value in pending.items()]
+    elif pending:
+        logger.debug(f"Not in the pack config, skipped: {', '.join(pending)}")
+    return ''.join(lines)
+
+
+def merge_config(shipped: str, current: Optional[str], base: dict[str, str], overrides: dict[str, str],
+                 fmt: str) -> tuple[str, dict[str, str]]:
+    """Three-way merge of a config file
+    
+    The pack's copy with the tier settings applied is the new version,
+    `base` holds the values written last time, and `current` is the live
+    file. A key whose live value differs from base was edited by the
+    player and keeps that value. Returns the merged text and the
+    generated values, the base for the next merge.
+    """
+    generated = write_config_values(shipped, fmt, overrides)
+    values = read_config_values(generated, fmt)
+    if current is None:
+        return generated, values
+    edits = {key: value for key, value in read_config_values(current, fmt).items()
+             if key in values and value != base.get(key) and value != values[key]}
+    return write_config_values(generated, fmt, edits), values
+
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class ConfigTuner:
+    """Fit the pack's Distant Horizons and shader settings to the machine
+    
+    The pack ships one DH profile tuned for a strong desktop. Tiered pack
+    configs (TIER_SETTINGS) are therefore synced to TIER_DEFAULTS_DIR
+    instead of over the live file. After each sync, the tier's settings are
+    merged into the live files with merge_config(), so player edits
+    survive both pack updates and tier changes.
+    """
+    
+    def __init__(self, minecraft_dir: Path, tier: str = 'auto'):
+        self.minecraft_dir = Path(minecraft_dir)
+        self.tier = tier  # 'auto' or one of TIERS
+        self.state_path = self.minecraft_dir / TIER_STATE_FILE
+    
+    @staticmethod
+    def redirect(files: list[PackFile]) -> list[PackFile]:
+        """Sync tiered pack configs to the defaults directory"""
+        return [replace(f, path=f"{TIER_DEFAULTS_DIR}/{f.path}") if f.path in TIER_SETTINGS else f
+                for f in files]
+    
+    def choose(self, state: dict, detect_gpu: bool) -> tuple[str, str, dict]:
+        """Tier, reason and the hardware it was based on (GPU detection is cached between syncs)"""
+        hardware = {'ram_mb': physical_memory_mb(), 'cores': os.cpu_count(),
+                    'gpu': detect_gpu_vendor() if detect_gpu or 'hardware' not in state
+                    else state['hardware'].get('gpu')}
+        tier, reason = classify_hardware(hardware['ram_mb'], hardware['cores'], hardware['gpu'])
+        if self.tier in TIERS:
+            tier, reason = self.tier, f"chosen, detected {tier}: {reason}"
+        return tier, reason, hardware
+    
+    def settings(self, tier: str, cores: Optional[int], shaderpack: Optional[str]) -> dict[str, dict[str, str]]:
+        """Raw values to write, per config file"""
+        level = TIERS.index(tier)
+        settings = {rel_path: {key: values[level] for key, values in keys.items()}
+                    for rel_path, keys in TIER_SETTINGS.items()}
+        settings['config/DistantHorizons.toml'][DH_THREADS_KEY] = str(
+            max(1, round((cores or 4) * DH_THREAD_SHARE[level])))
+        if shaderpack:
+            settings['config/iris.properties']['shaderPack'] = shaderpack
+        return settings
+    
+    @traced('tune')
+    def apply(self, files: Optional[list[PackFile]] = None) -> dict:
+        """Merge the tier into the live configs; `files` is the synced pack (None on the fast path)"""
+        state = load_json(self.state_path, {})
+        tier, reason, hardware = self.choose(state, detect_gpu=files is not None)
+        shaderpack = state.get('shaderpack')
+        if files is not None:
+            shaderpack = next((PurePosixPath(f.path).name for f in files
+                               if f.path.startswith('shaderpacks/') and f.path.endswith('.zip')), None)
+        
+        applied = state.get('applied', {})
+        changed = []
+        for rel_path, overrides in self.settings(tier, hardware['cores'], shaderpack).items():
+            fmt = 'properties' if rel_path.endswith('.properties') else 'toml'
+            live = self.minecraft_dir / rel_path
+            current = _read_text(live)
+            shipped = _read_text(self.minecraft_dir / TIER_DEFAULTS_DIR / rel_path)
+            if shipped is not None:
+                base = applied.get(rel_path) or read_config_values(shipped, fmt)
+            elif fmt == 'properties':
+                # Not part of the pack: the tier settings go into whatever the mod wrote
+                shipped, base = current or '', applied.get(rel_path, {})
+            else:
+                continue  # Pack config not synced yet
+            
+            text, applied[rel_path] = merge_config(shipped, current, base, overrides, fmt)
+            if text != current:
+                live.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = live.with_name(live.name + '.tmp')
+                with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                    f.write(text)
+                os.replace(tmp_path, live)
+                changed.append(rel_path)
+        
+        save_json(self.state_path, {'tier': tier, 'reason': reason, 'hardware': hardware,
+                                    'shaderpack': shaderpack, 'applied': applied})
+        logger.info(f"Hardware tier: {tier} ({reason})" + (f", updated {', '.join(changed)}" if changed else ''))
+        TRACE.annotate(tier=tier, changed=len(changed))
+        return {'tier': tier, 'changed': changed}
+
+
+class PackSync:
+    """Synchronise a minecraft directory with the packwiz pack
+    
+    Replaces packwiz-installer: parses pack.toml, index.toml and the
+    [download] blocks of the metafiles, diffs them against the local
+    manifest and downloads only missing or changed files in parallel.
+    """
+    
+    def __init__(self, minecraft_dir: Path, pack_url: str = PACK_URL, side: str = 'client',
+                 workers: int = SYNC_WORKERS, http: Optional[HttpClient] = None,
+                 store: Optional[ContentStore] = None, mirrors: tuple = MIRRORS,
+                 per_host: int = PER_HOST_CONNECTIONS, rate_limit: Optional[int] = None,
+                 on_progress: Optional[Callable[[dict], None]] = None, lan: Optional[str] = None,
+                 tier: Optional[str] = None, lods: bool = True):
+        self.minecraft_dir = Path(minecraft_dir)
+        self.pack_url = pack_url
+        self.side = side
+        self.workers = workers
+        self.http = http or HttpClient(pool_size=workers)
+        self.store = store
+        self.scheduler = OriginScheduler(self.minecraft_dir / ORIGIN_STATS_FILE, mirrors, per_host)
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.lan = lan  # 'auto' (discover), a LAN cache base URL, or None
+        # 'auto' or one of TIERS: tune DH/shader configs to the hardware (clients only)
+        self.tuner = ConfigTuner(self.minecraft_dir, tier) if tier and side == 'client' else None
+        self.lods = lods and side == 'client'  # Pre-built Distant Horizons data the server publishes
+        self.progress = SyncProgress(on_progress)
+        self._digest_locks: dict[str, threading.Lock] = {}
+        self._digest_locks_guard = threading.Lock()
+        self._race_pool = ThreadPoolExecutor(max_workers=workers)
+        self.manifest_path = self.minecraft_dir / SYNC_MANIFEST
+        self.state_path = self.minecraft_dir / UPDATE_STATE_FILE
+        self.generations = Generations(self.minecraft_dir)
+        self._staging: Optional[Path] = None  # Where downloads go while a sync is staging a generation
+        self.verify_cache = VerifyCache(self.minecraft_dir / VERIFY_CACHE_FILE)
+        self.cancelled = threading.Event()  # Set by cancel(), checked between files and chunks
+    
+    def cancel(self):
+        """Stop a running sync soon; partial downloads are kept and the live files stay as they were"""
+        self.cancelled.set()
+    
+    def _check_cancelled(self, what: str):
+        if self.cancelled.is_set():
+            raise SyncError(f"{what} cancelled")
+    
+    @traced('check_for_update')
+    def check_for_update(self, force: bool = False) -> tuple[Optional[dict], dict]:
+        """Conditionally fetch pack.toml
+        
+        Returns (None, validators) when the installed index hash still matches,
+        without touching metafiles or local jars; otherwise the parsed pack.
+        """
+        state = load_json(self.state_path, {})
+        installed_hash = state.get('index_hash')
+        manifest = load_json(self.manifest_path, {})
+        in_sync = not force and installed_hash and manifest.get('index_hash') == installed_hash
+        
+        headers = dict(METADATA_HEADERS)
+        if in_sync and state.get('pack_etag'):
+            headers['If-None-Match'] = state['pack_etag']
+        if in_sync and state.get('pack_last_modified'):
+            headers['If-Modified-Since'] = state['pack_last_modified']
+        
+        with self.http.request('GET', self.pack_url, headers) as resp:
+            validators = {
+                'pack_etag': resp.headers.get('etag', state.get('pack_etag')),
+                'pack_last_modified': resp.headers.get('last-modified', state.get('pack_last_modified')),
+            }
+            TRACE.annotate(status=resp.status, conditional=in_sync and len(headers) > len(METADATA_HEADERS))
+            if resp.status == 304 and in_sync:
+                return None, validators
+            if resp.status != 200:
+                raise SyncError(f"GET {self.pack_url} returned HTTP {resp.status}")
+            pack = parse_toml(resp.read().decode('utf-8'))
+        
+        if in_sync and pack.get('index', {}).get('hash') == installed_hash:
+            return None, validators
+        if in_sync and not force and pack.get('index', {}).get('hash') == state.get('rolled_back_from'):
+            logger.info("Staying on the rolled back pack version until a newer one is published")
+            return None, validators
+        return pack, validators
+    
+    def save_state(self, index_hash: Optional[str], validators: dict):
+        """Record the synced index hash and pack.toml validators in update-state.json"""
+        state = load_json(self.state_path, {})
+        updates = {'index_hash': index_hash, **validators}
+        if all(state.get(key) == value for key, value in updates.items()):
+            return
+        state.update(updates)
+        save_json(self.state_path, state)
+    
+    @traced('fetch_manifest')
+    def fetch_manifest(self, pack: dict) -> Optional[list[PackFile]]:
+        """Load the compiled manifest for this side in one request
+        
+        The immutable copy under the index's snapshot directory is tried
+        first (CDN-cacheable), then the one next to pack.toml. Returns None
+        (fall back to index.toml and the metafiles) if the host publishes
+        neither or it was built from a different index.
+        """
+        index_hash = pack.get('index', {}).get('hash', '').lower()
+        name = PACK_MANIFEST.format(side=self.side)
+        candidates = [urljoin(self.pack_url, PACK_SNAPSHOT_DIR.format(id=index_hash[:16]) + name),
+                      urljoin(self.pack_url, name)]
+        manifest = None
+        for url in candidates:
+            try:
+                with self.http.request('GET', url, METADATA_HEADERS) as resp:
+                    TRACE.annotate(status=resp.status, url=url)
+                    if resp.status != 200:
+                        continue
+                    manifest = json.loads(resp.read().decode('utf-8'))
+                    break
+            except (SyncError, OSError, ValueError) as e:
+                logger.debug(f"No usable pack manifest at {url}: {e}")
+        if manifest is None:
+            return None
+        
+        if (not isinstance(manifest, dict) or manifest.get('format') != PACK_MANIFEST_FORMAT
+                or manifest.get('side') != self.side or manifest.get('index_hash') != index_hash):
+            logger.info("Pack manifest is stale or unsupported, reading metafiles instead")
+            TRACE.annotate(stale=True)
+            return None
+        
+        try:
+            files = [PackFile(f['path'], urljoin(url, f['url']), f['hash'].lower(), f['hash_format'],
+                              f.get('side', 'both'), f.get('preserve', False), f.get('size'))
+                     for f in manifest['files']]
+        except (KeyError, TypeError, AttributeError):
+            logger.warning("Malformed pack manifest, reading metafiles instead")
+            return None
+        TRACE.annotate(files=len(files))
+        return files
+    
+    @traced('fetch_index')
+    def fetch_index(self, pack: dict) -> tuple[str, dict]:
+        """Download index.toml and verify it against the hash in pack.toml"""
+        index_info = pack.get('index', {})
+        index_url = urljoin(self.pack_url, quote(index_info.get('file', 'index.toml')))
+        data = self.http.get_bytes(index_url)
+        TRACE.annotate(bytes=len(data))
+        
+        expected = index_info.get('hash')
+        if expected:
+            hasher = new_hasher(index_info.get('hash-format', 'sha256'))
+            hasher.update(data)
+            if hasher.hexdigest() != expected.lower():
+                raise SyncError("index.toml hash does not match pack.toml")
+        return index_url, parse_toml(data.decode('utf-8'))
+    
+    def resolve_files(self, index_url: str, index: dict) -> list[PackFile]:
+        """Turn index entries into concrete downloads for this side"""
+        return self.select_side(self.resolve_entries(index_url, index), self.side)
+    
+    @traced('resolve_files')
+    def resolve_entries(self, index_url: str, index: dict) -> list[PackFile]:
+        """Turn index entries into downloads for every side (metafiles are fetched in parallel)"""
+        default_format = index.get('hash-format', 'sha256')
+        entries = index.get('files', [])
+        
+        def resolve(entry: dict) -> Optional[PackFile]:
+            rel_path = entry['file']
+            url = urljoin(index_url, quote(rel_path))
+            hash_format = entry.get('hash-format', default_format)
+            
+            if not entry.get('metafile'):
+                return PackFile(entry.get('alias', rel_path), url, entry['hash'].lower(),
+                                hash_format, preserve=entry.get('preserve', False))
+            
+            data = self.http.get_bytes(url)
+            hasher = new_hasher(hash_format)
+            hasher.update(data)
+            if hasher.hexdigest() != entry['hash'].lower():
+                raise SyncError(f"Metafile hash mismatch: {rel_path}")
+            
+            meta = parse_toml(data.decode('utf-8'))
+            download = meta.get('download', {})
+            if 'url' not in download:
+                raise SyncError(f"Metafile has no download URL: {rel_path}")
+            
+            dest = Path(entry.get('alias', rel_path)).parent / meta['filename']
+            return PackFile(dest.as_posix(), download['url'], download['hash'].lower(),
+                            download.get('hash-format', 'sha512'), meta.get('side', 'both'),
+                            entry.get('preserve', False))
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            files = [f for f in pool.map(resolve, entries) if f is not None]
+        TRACE.annotate(entries=len(entries), files=len(files))
+        return files
+    
+    @staticmethod
+    def select_side(files: list[PackFile], side: str) -> list[PackFile]:
+        """The files one side installs; several metafiles may name the same jar, so each destination once"""
+        unique = {}
+        for pack_file in files:
+            if pack_file.side not in ('both', side):
+                continue
+            known = unique.setdefault(pack_file.path, pack_file)
+            if known.hash != pack_file.hash:
+                raise SyncError(f"Conflicting hashes for {pack_file.path} in the index")
+        return list(unique.values())
+    
+    def _dest(self, rel_path: str) -> Path:
+        """Resolve a pack-relative path, refusing anything outside the minecraft dir"""
+        dest = (self.minecraft_dir / rel_path).resolve()
+        if not dest.is_relative_to(self.minecraft_dir.resolve()):
+            raise SyncError(f"Refusing to write outside instance: {rel_path}")
+        return dest
+    
+    def _target(self, rel_path: str) -> Path:
+        """Where a download goes: into the staging generation while one is open, else live"""
+        dest = self._dest(rel_path)
+        return dest if self._staging is None else self._staging / rel_path
+    
+    @traced('plan')
+    def plan(self, files: list[PackFile], manifest: dict) -> tuple[list[PackFile], list[str]]:
+        """Work out which files need downloading and which stale files to remove"""
+        installed = manifest.get('files', {})
+        checks = []
+        for pack_file in files:
+            dest = self._dest(pack_file.path)
+            if not (pack_file.preserve and dest.exists()):
+                checks.append((pack_file, dest))
+        
+        # Verify local files (O(stat) for files already in the verification cache)
+        digests = self.verify_cache.hash_many(
+            [(f.path, dest, f.hash_format) for f, dest in checks], self.workers)
+        logger.info(f"Verified {len(checks)} files ({self.verify_cache.hits} cached, "
+                    f"{self.verify_cache.misses} hashed)")
+        
+        to_download = []
+        for pack_file, dest in checks:
+            if digests[pack_file.path] != pack_file.hash:
+                to_download.append(pack_file)
+            elif self._use_store(pack_file):
+                # Share files a previous installer (e.g. packwiz-installer) already placed
+                if self.store.adopt(dest, pack_file.hash_format, pack_file.hash):
+                    self.verify_cache.record(pack_file.path, dest, pack_file.hash_format, pack_file.hash)
+        
+        wanted = {f.path for f in files}
+        to_remove = [path for path in installed if path not in wanted]
+        TRACE.annotate(verified=len(checks), cache_hits=self.verify_cache.hits,
+                       cache_misses=self.verify_cache.misses, to_download=len(to_download),
+                       to_remove=len(to_remove))
+        return to_download, to_remove
+    
+    def _use_store(self, pack_file: PackFile) -> bool:
+        """Only immutable pack files are shared; configs may be edited in place"""
+        return (self.store is not None and not pack_file.preserve
+                and pack_file.path.lower().endswith(STORE_EXTENSIONS))
+    
+    @traced('file')
+    def download(self, pack_file: PackFile) -> tuple[int, bool]:
+        """Install a file from the store or the network
+        
+        Returns (bytes downloaded, whether it came from the store). Network
+        downloads are retried, resuming from the partial file each time.
+        """
+        self._check_cancelled(f"Download of {pack_file.path}")
+        dest = self._target(pack_file.path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        use_store = self._use_store(pack_file)
+        TRACE.annotate(path=pack_file.path)
+        
+        if self._staging is not None and dest.is_file() and \
+                hash_file(dest, pack_file.hash_format) == pack_file.hash:
+            # Staged by an earlier attempt that failed on another file
+            self.progress.finish(pack_file.path, dest.stat().st_size)
+            return 0, False
+        kept = self.generations.find(pack_file.path, pack_file.hash) if self._staging is not None else None
+        if kept:
+            method = _place_file(kept, dest, link=pack_file.path.lower().endswith(STORE_EXTENSIONS))
+            self.verify_cache.record(pack_file.path, dest, pack_file.hash_format, pack_file.hash)
+            self.progress.finish(pack_file.path, dest.stat().st_size)
+            logger.info(f"Installed {pack_file.path} from a kept generation ({method})")
+            return 0, False
+        
+        if use_store:
+            # Files sharing a digest share one partial; the second waits and links
+            with self._digest_locks_guard:
+                digest_lock = self._digest_locks.setdefault(pack_file.hash, threading.Lock())
+            with digest_lock:
+                return self._download(pack_file, dest, use_store)
+        return self._download(pack_file, dest, use_store)
+    
+    def _download(self, pack_file: PackFile, dest: Path, use_store: bool) -> tuple[int, bool]:
+        if use_store:
+            method = self.store.link(pack_file.hash_format, pack_file.hash, dest)
+            TRACE.annotate(store='hit' if method else 'miss')
+            if method:
+                self.verify_cache.record(pack_file.path, dest, pack_file.hash_format, pack_file.hash)
+                self.progress.finish(pack_file.path, dest.stat().st_size)
+                logger.info(f"Installed {pack_file.path} from store ({method})")
+                return 0, True
+            part_path = self.store.partial_path(pack_file.hash_format, pack_file.hash)
+        else:
+            part_path = dest.with_name(dest.name + '.part')
+        
+        size = self.fetch_with_retries(pack_file, part_path)
+        
+        # Only a verified file is moved into place, atomically
+        if use_store:
+            self.store.commit(part_path, pack_file.hash_format, pack_file.hash)
+            self.store.link(pack_file.hash_format, pack_file.hash, dest)
+        else:
+            os.replace(part_path, dest)
+        
+        self.verify_cache.record(pack_file.path, dest, pack_file.hash_format, pack_file.hash)
+        self.progress.finish(pack_file.path, dest.stat().st_size)
+        TRACE.annotate(bytes=size)
+        logger.info(f"Downloaded {pack_file.path} ({size} bytes)")
+        return size, False
+    
+    def fetch_with_retries(self, pack_file: PackFile, part_path: Path) -> int:
+        """Download and verify pack_file into part_path, resuming between attempts"""
+        size = 0
+        for attempt in range(1, SYNC_RETRIES + 1):
+            TRACE.annotate(attempts=attempt)
+            try:
+                size += self._fetch(pack_file, part_path)
+                return size
+            except SyncError as e:
+                if attempt == SYNC_RETRIES or self.cancelled.is_set():
+                    raise
+                logger.warning(f"{e} - retrying ({attempt}/{SYNC_RETRIES})")
+                if self.cancelled.wait(2 ** (attempt - 1)):
+                    raise
+        return size
+    
+    def _open(self, url: str, headers: dict) -> HttpResponse:
+        """GET url while holding one of its host's connection slots"""
+        slot = self.scheduler.slot(url)
+        slot.acquire()
+        started = time.monotonic()
+        try:
+            resp = self.http.request('GET', url, headers)
+        except BaseException:
+            slot.release()
+            self.scheduler.record_failure(url)
+            raise
+        resp.on_close(slot.release)
+        
+        if resp.status >= 400 and resp.status != 416:
+            resp.close()
+            self.scheduler.record_failure(url)
+            raise SyncError(f"GET {url} returned HTTP {resp.status}")
+        self.scheduler.record(url, ttfb=time.monotonic() - started)
+        return resp
+    
+    def _race(self, urls: list[str]) -> tuple[str, HttpResponse]:
+        """Request a file from several origins at once, keeping the first to answer"""
+        futures = {self._race_pool.submit(self._open, url, {}): url for url in urls}
+        pending = set(futures)
+        winner = None
+        error = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                elif winner is None:
+                    winner = (futures[future], future.result())
+                else:
+                    future.result().close()
+        
+        # Losers still connecting are closed as soon as they answer
+        for future in pending:
+            future.add_done_callback(_close_response)
+        if winner is None:
+            raise error
+        return winner
+    
+    def _fetch(self, pack_file: PackFile, part_path: Path) -> int:
+        """Stream a file into part_path from the best origin, failing over between mirrors
+        
+        A small journal next to the partial file remembers the origin, expected
+        hash and validators, so a later attempt (or launch) can continue with
+        an HTTP Range request. Returns the number of bytes transferred.
+        """
+        journal_path = part_path.with_name(part_path.name + '.json')
+        journal = load_json(journal_path, {})
+        urls = self.scheduler.rank(self.scheduler.urls_for(pack_file), pack_file.size)
+        
+        # Resume from the origin that produced the partial data
+        resume_url = None
+        offset = 0
+        validator = journal.get('etag') or journal.get('last_modified')
+        if (part_path.exists() and validator and journal.get('url') in urls
+                and journal.get('hash') == pack_file.hash):
+            offset = part_path.stat().st_size
+            if offset:
+                resume_url = journal['url']
+                urls.remove(resume_url)
+                urls.insert(0, resume_url)
+        
+        error = None
+        i = 0
+        while i < len(urls):
+            url = urls[i]
+            if url == resume_url:
+                batch = [url]
+                headers = {'Range': f'bytes={offset}-', 'If-Range': validator}
+            else:
+                batch = urls[i:i + 2] if self.scheduler.should_race(urls[i:i + 2]) else [url]
+                headers = {}
+            i += len(batch)
+            
+            try:
+                if len(batch) > 1:
+                    url, resp = self._race(batch)
+                else:
+                    resp = self._open(url, headers)
+            except SyncError as e:
+                error = e
+                continue
+            
+            TRACE.annotate(origin=self.scheduler.host(url), raced=len(batch) > 1)
+            with resp:
+                fetched = self._stream(pack_file, part_path, journal_path, url, resp,
+                                       offset if url == resume_url else 0)
+            if fetched is not None:
+                return fetched
+            
+            # Wrong content from this origin; the partial is gone, try the next one
+            self.scheduler.record_failure(url)
+            error = SyncError(f"Hash mismatch for {pack_file.path} from {self.scheduler.host(url)}")
+        
+        raise error or SyncError(f"No origin available for {pack_file.path}")
+    
+    def _stream(self, pack_file: PackFile, part_path: Path, journal_path: Path, url: str,
+                resp: HttpResponse, offset: int) -> Optional[int]:
+        """Write a response body into part_path, hashing inline
+        
+        Returns the bytes transferred, or None if the finished file's hash is
+        wrong. Interruptions raise SyncError and leave the partial for resuming.
+        """
+        if resp.status == 416:
+            # Partial is as long as (or longer than) the file; start over
+            part_path.unlink(missing_ok=True)
+            journal_path.unlink(missing_ok=True)
+            raise SyncError(f"Invalid partial download for {pack_file.path}")
+        
+        hasher = new_hasher(pack_file.hash_format)
+        resumed = (offset and resp.status == 206
+                   and resp.headers.get('content-range', '').startswith(f'bytes {offset}-'))
+        if resumed:
+            # Hash state cannot be persisted, so seed it from the bytes already on disk
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+            logger.info(f"Resuming {pack_file.path} at {offset} bytes")
+            TRACE.annotate(resumed_from=offset)
+        else:
+            offset = 0
+        self.progress.restart(pack_file.path, offset)
+        length = resp.headers.get('content-length')
+        if length and 'content-encoding' not in resp.headers:
+            self.progress.set_size(pack_file.path, offset + int(length))
+        
+        # Weak ETags are not allowed in If-Range
+        etag = resp.headers.get('etag')
+        save_json(journal_path, {
+            'url': url,
+            'hash': pack_file.hash,
+            'etag': etag if etag and not etag.startswith('W/') else None,
+            'last_modified': resp.headers.get('last-modified'),
+        })
+        
+        started = time.monotonic()
+        chunk_size = RATE_LIMIT_CHUNK if self.limiter else CHUNK_SIZE
+        fetched = 0
+        with open(part_path, 'ab' if resumed else 'wb') as f:
+            for chunk in resp.iter_content(chunk_size):
+                self._check_cancelled(f"Download of {pack_file.path}")
+                hasher.update(chunk)
+                f.write(chunk)
+                fetched += len(chunk)
+                self.progress.advance(pack_file.path, len(chunk))
+                if self.limiter:
+                    self.limiter.consume(len(chunk))
+        
+        # A connection dropped mid-body can look like a clean EOF; keep the partial
+        if length and 'content-encoding' not in resp.headers and fetched < int(length):
+            raise SyncError(f"Download of {pack_file.path} interrupted at {offset + fetched} bytes")
+        
+        if hasher.hexdigest() != pack_file.hash:
+            part_path.unlink(missing_ok=True)
+            journal_path.unlink(missing_ok=True)
+            return None
+        journal_path.unlink(missing_ok=True)
+        self.scheduler.record(url, nbytes=fetched, seconds=time.monotonic() - started)
+        return fetched
+    
+    def run(self, force: bool = False, defer: bool = False, stage: bool = False) -> dict:
+        """Synchronise the minecraft directory, returning a summary
+        
+        With defer, an update that the server does not require is handed
+        to a background process (stage) and made live on the next run.
+        """
+        with TRACE.span('sync', side=self.side, force=force, workers=self.workers,
+                        store=self.store is not None, defer=defer, stage=stage) as span:
+            if stage:
+                with self.generations.stage_lock() as acquired:
+                    summary = self._run(force, stage=True) if acquired else {'busy': True}
+                    if acquired and self.lods:
+                        summary['lods'] = self._sync_lods(defer, True, summary)
+            else:
+                summary = self._run(force, defer)
+                if self.lods:
+                    summary['lods'] = self._sync_lods(defer, False, summary)
+            span.update(summary)
+            return summary
+    
+    def _run(self, force: bool, defer: bool = False, stage: bool = False) -> dict:
+        self.minecraft_dir.mkdir(parents=True, exist_ok=True)
+        # A background stage runs next to the game, so it never touches live files
+        activated = None
+        if not stage:
+            self._recover()
+            activated = self._activate_pending()
+        
+        pack, validators = self.check_for_update(force)
+        if pack is None:
+            # Fast path: one conditional request, no metafiles, no hashing
+            self.save_state(load_json(self.state_path, {})['index_hash'], validators)
+            logger.info("Pack is up to date")
+            return {'up_to_date': True, 'activated': activated, 'tier': None if stage else self._tune(None)}
+        
+        # One request when the host publishes a compiled manifest, ~110 otherwise
+        files = self.fetch_manifest(pack)
+        if files is None:
+            index_url, index = self.fetch_index(pack)
+            files = self.resolve_files(index_url, index)
+        if self.tuner:
+            files = self.tuner.redirect(files)
+        
+        if defer:
+            reason = self.mandatory_change(pack, files)
+            if reason is None:
+                # Validators are not saved, so the next launch looks at pack.toml again
+                started = self.spawn_background()
+                logger.info(f"Pack {pack.get('version', '?')} can wait: "
+                            + ("downloading it in the background, it goes live on the next launch"
+                               if started else "a background update is already running"))
+                return {'up_to_date': False, 'deferred': True, 'background': started,
+                        'pack_version': pack.get('version')}
+            logger.info(f"Pack {pack.get('version', '?')} is needed to join the server ({reason})")
+        
+        manifest = load_json(self.manifest_path, {})
+        installed = dict(manifest.get('files', {}))
+        for pack_file in files:
+            known = installed.get(pack_file.path)
+            if pack_file.size is None and known and known.get('hash') == pack_file.hash:
+                pack_file.size = known.get('size')
+        
+        to_download, to_remove = self.plan(files, manifest)
+        logger.info(f"Pack {pack.get('version', '?')}: {len(files)} files, "
+                    f"{len(to_download)} to download, {len(to_remove)} to remove")
+        
+        if to_download and self.lan:
+            caches = discover_lan_caches(self.pack_url) if self.lan == 'auto' else [self.lan.rstrip('/')]
+            if caches:
+                logger.info(f"Using LAN cache: {', '.join(caches)}")
+            self.scheduler.add_local([base + LAN_OBJECT_PATH for base in caches])
+        
+        # Largest first, so one big file does not start last and stretch the tail
+        # (unknown sizes count as large)
+        to_download.sort(key=lambda f: f.size if f.size is not None else float('inf'), reverse=True)
+        self.progress.begin(to_download)
+        
+        # Downloads are staged; the live files stay untouched until all of them succeeded
+        generation_id = pack.get('index', {}).get('hash', 'unknown').lower()[:16]
+        self._staging = self.generations.staging(generation_id) / 'files'
+        
+        downloaded_bytes = 0
+        store_hits = 0
+        errors = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.download, f): f for f in to_download}
+            for future in as_completed(futures):
+                pack_file = futures[future]
+                try:
+                    size, from_store = future.result()
+                    downloaded_bytes += size
+                    store_hits += from_store
+                except (SyncError, OSError) as e:
+                    if not self.cancelled.is_set():
+                        logger.error(f"Failed to download {pack_file.path}: {e}")
+                    errors.add(pack_file.path)
+                    self.progress.finish(pack_file.path)
+        
+        self._race_pool.shutdown(wait=False)
+        self.scheduler.save()
+        self._staging = None
+        
+        if self.cancelled.is_set():
+            self.verify_cache.save()
+            raise SyncError("Sync cancelled; the previous pack version is still installed")
+        if errors:
+            # The staged files are picked up again by the next run
+            self.verify_cache.save()
+            raise SyncError(f"{len(errors)} file(s) failed to download; the previous pack version is "
+                            "still installed")
+        
+        self._snapshot(generation_id, pack, files, to_download)
+        if stage:
+            self.verify_cache.save()
+            state = load_json(self.state_path, {})
+            state['pending_generation'] = {'id': generation_id, 'base': state.get('index_hash'),
+                                           'pack_version': pack.get('version')}
+            save_json(self.state_path, state)
+            logger.info(f"Staged generation {generation_id}; it goes live on the next launch")
+            return {'up_to_date': False, 'staged': generation_id, 'pack_version': pack.get('version'),
+                    'downloaded': len(to_download), 'downloaded_bytes': downloaded_bytes}
+        self._activate(generation_id)
+        self.verify_cache.save(keep={f.path for f in files})
+        if self.store:
+            self.store.evict()
+        
+        self.save_state(pack.get('index', {}).get('hash'), validators)
+        state = load_json(self.state_path, {})
+        if state.pop('rolled_back_from', None) is not None:
+            save_json(self.state_path, state)
+        return {
+            'up_to_date': False,
+            'tier': self._tune(files),
+            'pack_version': pack.get('version'),
+            'generation': generation_id,
+            'files': len(files),
+            'downloaded': len(to_download),
+            'downloaded_bytes': downloaded_bytes,
+            'store_hits': store_hits,
+            'removed': len(to_remove),
+        }
+    
+    @traced('snapshot')
+    def _snapshot(self, generation_id: str, pack: dict, files: list[PackFile], downloaded: list[PackFile]):
+        """Complete the staged generation with the unchanged live files and seal it"""
+        staging = self.generations.staging(generation_id) / 'files'
+        fresh = {f.path for f in downloaded}
+        entries = {}
+        for pack_file in files:
+            dest = self._dest(pack_file.path)
+            staged = staging / pack_file.path
+            if pack_file.path not in fresh:
+                if pack_file.preserve:
+                    # Belongs to the player once installed; not part of any snapshot
+                    entries[pack_file.path] = {'hash': pack_file.hash, 'hash_format': pack_file.hash_format,
+                                               'size': pack_file.size, 'side': pack_file.side}
+                    continue
+                staged.parent.mkdir(parents=True, exist_ok=True)
+                _place_file(dest, staged, link=pack_file.path.lower().endswith(STORE_EXTENSIONS))
+            entries[pack_file.path] = {'hash': pack_file.hash, 'hash_format': pack_file.hash_format,
+                                       'size': staged.stat().st_size, 'side': pack_file.side}
+        
+        self.generations.commit(generation_id, {
+            'pack_version': pack.get('version'),
+            'versions': pack.get('versions', {}),
+            'index_hash': pack.get('index', {}).get('hash'),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'files': entries,
+        })
+        TRACE.annotate(generation=generation_id, files=len(entries))
+    
+    @traced('activate')
+    def _activate(self, generation_id: str) -> dict:
+        """Make a generation live: changed files are renamed into place, stale ones removed
+        
+        A journal marks the switch as in progress, so an interrupted one is
+        finished by the next run instead of leaving a mix of two versions.
+        """
+        info = self.generations.load(generation_id)
+        if info is None:
+            raise SyncError(f"Generation {generation_id} is missing or incomplete")
+        files_dir = self.generations.files_dir(generation_id)
+        save_json(self.generations.journal_path, {'generation': generation_id})
+        
+        placed = 0
+        for rel_path, entry in info['files'].items():
+            src = files_dir / rel_path
+            if not src.is_file():
+                continue  # Preserved file, left to the player
+            dest = self._dest(rel_path)
+            if self.verify_cache.hash(rel_path, dest, entry['hash_format']) == entry['hash']:
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            _place_file(src, dest, link=rel_path.lower().endswith(STORE_EXTENSIONS))
+            self.verify_cache.record(rel_path, dest, entry['hash_format'], entry['hash'])
+            placed += 1
+        
+        for rel_path in load_json(self.manifest_path, {}).get('files', {}):
+            if rel_path in info['files']:
+                continue
+            dest = self._dest(rel_path)
+            # Tiered configs moved to TIER_DEFAULTS_DIR; the live copy belongs to the player now
+            if dest.is_file() and not (self.tuner and rel_path in TIER_SETTINGS):
+                dest.unlink()
+                logger.info(f"Removed stale file: {rel_path}")
+        
+        save_json(self.manifest_path, {
+            'pack_version': info.get('pack_version'),
+            'index_hash': info.get('index_hash'),
+            'files': info['files'],
+        })
+        state = load_json(self.state_path, {})
+        state.update({'generation': generation_id, 'index_hash': info.get('index_hash')})
+        state.pop('pending_generation', None)  # Whatever was staged before is based on an older version
+        save_json(self.state_path, state)
+        self.generations.journal_path.unlink(missing_ok=True)
+        logger.info(f"Generation {generation_id} ({info.get('pack_version')}) is live, {placed} file(s) switched")
+        TRACE.annotate(generation=generation_id, placed=placed)
+        return info
+    
+    def _activate_pending(self) -> Optional[str]:
+        """Switch to the generation a background update staged, if it still follows the live one"""
+        state = load_json(self.state_path, {})
+        pending = state.get('pending_generation')
+        if not pending:
+            return None
+        if pending.get('base') != state.get('index_hash') or not self.generations.load(pending['id']):
+            logger.info(f"Discarding staged generation {pending['id']}: the live pack changed since")
+            state.pop('pending_generation')
+            save_json(self.state_path, state)
+            return None
+        logger.info(f"Switching to {pending.get('pack_version')}, downloaded in the background")
+        self._activate(pending['id'])
+        self.verify_cache.save()
+        return pending['id']
+    
+    def mandatory_change(self, pack: dict, files: list[PackFile]) -> Optional[str]:
+        """Why this update has to be installed before the game starts, or None if it can wait
+        
+        The server rejects clients whose Minecraft or NeoForge version, or
+        whose set of side = "both" mods, differs from its own. Client-only
+        mods, resource/shader packs and configs can follow a launch later.
+        """
+        state = load_json(self.state_path, {})
+        live = self.generations.load(state['generation']) if state.get('generation') else None
+        if live is None:
+            return "no complete pack version is installed"
+        if live.get('versions') != pack.get('versions', {}):
+            return f"versions {live.get('versions')} -> {pack.get('versions', {})}"
+        wanted = {f.path: f for f in files}
+        for rel_path in sorted(set(wanted) | set(live['files'])):
+            if not (rel_path.startswith('mods/') and rel_path.endswith('.jar')):
+                continue
+            new, old = wanted.get(rel_path), live['files'].get(rel_path)
+            # Entries without a side predate side tracking; assume the server needs them
+            sides = {new.side if new else None, old.get('side', 'both') if old else None}
+            if 'both' in sides and (new is None or old is None or new.hash != old['hash']):
+                change = 'added' if old is None else 'removed' if new is None else 'changed'
+                return f"server-side mod {rel_path} {change}"
+        return None
+    
+    def spawn_background(self) -> bool:
+        """Start a detached, low-priority `sync --stage` of this instance; False if one is running"""
+        import subprocess
+        if self.generations.staging_busy():
+            return False
+        # The PyInstaller build is the engine itself; from source, run this script
+        command = [sys.executable]
+        if not getattr(sys, 'frozen', False):
+            command.append(str(Path(__file__).resolve()))
+        command += ['sync', str(self.minecraft_dir.resolve()), '--pack-url', self.pack_url, '--stage',
+                    '--workers', str(min(self.workers, BACKGROUND_WORKERS))]
+        command += ['--store', str(self.store.root)] if self.store else ['--no-store']
+        if self.tuner is None:
+            command.append('--no-tier')
+        if not self.lods:
+            command.append('--no-lod')
+        
+        options = {'cwd': str(self.minecraft_dir), 'stdin': subprocess.DEVNULL,
+                   'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+        if sys.platform == 'win32':
+            # Idle priority also lowers I/O priority, so chunk loading in the game comes first
+            options['creationflags'] = (subprocess.IDLE_PRIORITY_CLASS | subprocess.DETACHED_PROCESS
+                                        | subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:
+            options['start_new_session'] = True  # Outlives the launcher's pre-launch command
+            options['preexec_fn'] = lambda: os.nice(10)
+        try:
+            subprocess.Popen(command, **options)
+        except OSError as e:
+            logger.warning(f"Could not start the background update: {e}")
+            return False
+        return True
+    
+    def _sync_lods(self, defer: bool, stage: bool, summary: dict) -> Optional[dict]:
+        """Install the server's LODs; a failure here never fails the sync"""
+        if not stage and self.generations.staging_busy():
+            return None  # The background update takes care of them, and may be writing them right now
+        try:
+            result = LodSync(self.minecraft_dir, self.pack_url, self.http, self.workers,
+                             cancelled=self.cancelled).run(defer, stage)
+        except (SyncError, OSError) as e:
+            logger.warning(f"Could not install the server's LODs, Distant Horizons will stream them instead: {e}")
+            return None
+        if result.get('deferred') and not summary.get('background'):
+            result['background'] = self.spawn_background()
+        return result
+    
+    def _recover(self):
+        """Finish a switch that a previous run was interrupted in"""
+        journal = load_json(self.generations.journal_path)
+        if journal and self.generations.load(journal['generation']):
+            logger.warning(f"Finishing interrupted switch to generation {journal['generation']}")
+            self._activate(journal['generation'])
+    
+    def generation_list(self) -> list[dict]:
+        """Kept generations, newest first"""
+        current = load_json(self.state_path, {}).get('generation')
+        return [{'generation': g, 'live': g == current,
+                 **{k: v for k, v in self.generations.load(g).items() if k != 'files'}}
+                for g in self.generations.history()]
+    
+    def rollback(self, to: Optional[str] = None) -> dict:
+        """Make an earlier generation live again, without downloading anything
+        
+        The pack version rolled back from is skipped by later syncs until
+        the pack publishes another one (or a sync is forced).
+        """
+        with TRACE.span('rollback', to=to) as span:
+            self._recover()
+            state = load_json(self.state_path, {})
+            current = state.get('generation')
+            history = self.generations.history()
+            if to is None:
+                older = history[history.index(current) + 1:] if current in history else history[1:]
+                if not older:
+                    raise SyncError("No earlier generation to roll back to")
+                to = older[0]
+            elif to not in history:
+                raise SyncError(f"Unknown generation: {to} (kept: {', '.join(history) or 'none'})")
+            elif to == current:
+                raise SyncError(f"Generation {to} is already live")
+            
+            rolled_back_from = state.get('index_hash')
+            info = self._activate(to)
+            self.verify_cache.save(keep=set(info['files']))
+            state = load_json(self.state_path, {})
+            state['rolled_back_from'] = rolled_back_from
+            state['rolled_back_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            save_json(self.state_path, state)
+            self._tune(None)
+            summary = {'generation': to, 'pack_version': info.get('pack_version'), 'from': current}
+            span.update(summary)
+            return summary
+    
+    def _tune(self, files: Optional[list[PackFile]]) -> Optional[str]:
+        """Apply the hardware tier; a failure here never fails the sync"""
+        if not self.tuner:
+            return None
+        try:
+            return self.tuner.apply(files)['tier']
+        except OSError as e:
+            logger.warning(f"Could not apply hardware tier: {e}")
+            return None
+
+
+class LodSync:
+    """Install the server's pre-built Distant Horizons LODs before the first join
+    
+    The server publishes each dimension's DistantHorizons.sqlite as a list
+    of compressed, hash-named blocks (server/export_lods.py). A new
+    database is assembled next to the live one from the blocks that are
+    already on disk and downloads of the rest. It replaces the live one
+    only while the game is not running, so DH never sees a half-written
+    file. An update of the world the player already has can wait for a
+    background run, because DH streams missing LODs from the server anyway.
+    """
+    
+    def __init__(self, minecraft_dir: Path, pack_url: str = PACK_URL, http: Optional[HttpClient] = None,
+                 workers: int = SYNC_WORKERS, cancelled: Optional[threading.Event] = None):
+        self.minecraft_dir = Path(minecraft_dir)
+        self.index_url = urljoin(pack_url, LOD_INDEX)
+        self.http = http or HttpClient(pool_size=workers)
+        self.workers = workers
+        self.cancelled = cancelled or threading.Event()  # The owning PackSync's, so cancel() stops LODs too
+        self.state_path = self.minecraft_dir / LOD_STATE_FILE
+        self.staging_dir = self.minecraft_dir / LOD_STAGING_DIR
+    
+    @traced('lods')
+    def run(self, defer: bool = False, stage: bool = False) -> dict:
+        """Bring the LOD databases up to date, returning a summary
+        
+        Most launches end after one conditional request for lod/index.json;
+        the block manifest is only fetched when the version changed. With
+        stage, databases are only assembled, since the game may be running.
+        With defer, a newer version of the installed world is left to a
+        background run.
+        """
+        activated = None if stage else self._activate_staged()
+        state = load_json(self.state_path, {})
+        # Validators only count while the databases they were recorded with are all there
+        status, world, validators = self.check_index(state if self._installed(state) else {})
+        if status == 'missing':
+            return {'available': False, 'activated': activated}
+        if status == 'unchanged' or (world['key'] == state.get('world') and world['version'] == state.get('version')
+                                     and self._installed(state)):
+            self._save_installed(state.get('world'), state.get('version'), validators)
+            logger.info(f"LODs of {state.get('world')} are up to date (version {state.get('version')})")
+            return {'available': True, 'activated': activated, 'world': state.get('world'),
+                    'version': state.get('version'), 'up_to_date': True}
+        
+        manifest_url, manifest = self.fetch_manifest(world)
+        key, version = manifest['world'], manifest['version']
+        installed = state.get('files', {}) if state.get('world') == key else {}
+        staged = state.get('staged', {})
+        staged = staged.get('files', {}) if staged.get('world') == key else {}
+        wanted = {name: entry for name, entry in manifest['dimensions'].items()
+                  if installed.get(name, {}).get('sha256') != entry['sha256']
+                  or not self._dest(entry['path']).is_file()}
+        staged = {name: entry for name, entry in staged.items()
+                  if name in wanted and wanted[name]['sha256'] == entry['sha256']}
+        todo = {name: entry for name, entry in wanted.items()
+                if staged.get(name, {}).get('sha256') != entry['sha256']}
+        TRACE.annotate(world=key, version=version, wanted=len(wanted), todo=len(todo))
+        summary = {'available': True, 'activated': activated, 'world': key, 'version': version}
+        if not wanted:
+            self._save_installed(key, version, validators)
+            logger.info(f"LODs of {key} are up to date (version {version})")
+            return {**summary, 'up_to_date': True}
+        if todo and defer and not stage and state.get('world') == key:
+            logger.info(f"LOD version {version} of {key} can wait: the installed LODs work until it is downloaded")
+            return {**summary, 'deferred': True}
+        
+        downloaded = 0
+        total = sum(entry['size'] for entry in todo.values())
+        if todo:
+            logger.info(f"LODs of {key} version {version}: {len(todo)} dimension(s), {total / 1024 ** 2:.0f} MB")
+        for name, entry in todo.items():
+            downloaded += self._assemble(name, entry, manifest_url, manifest['block_size'])
+            staged[name] = {'path': entry['path'], 'sha256': entry['sha256']}
+            # Recorded per dimension, so an interrupted run keeps what it finished
+            state = load_json(self.state_path, {})
+            state['staged'] = {'world': key, 'version': version, 'files': dict(staged)}
+            save_json(self.state_path, state)
+        self._clean_staging({entry['sha256'] for entry in wanted.values()})
+        
+        summary.update(downloaded_bytes=downloaded, dimensions=len(wanted))
+        if stage:
+            logger.info(f"Staged LOD version {version} of {key}; it goes live on the next launch")
+            return {**summary, 'staged': True}
+        summary['activated'] = self._activate_staged()
+        self._save_installed(key, version, validators)
+        return summary
+    
+    @traced('lod_index')
+    def check_index(self, state: dict) -> tuple[str, Optional[dict], dict]:
+        """Conditionally fetch lod/index.json
+        
+        Returns ('missing' | 'unchanged' | 'changed', world, validators):
+        'missing' when the host publishes no LODs, 'unchanged' on a 304 for
+        the validators recorded with the installed version, otherwise the
+        key, version and manifest path of the world to install.
+        """
+        headers = dict(METADATA_HEADERS)
+        if state.get('index_etag'):
+            headers['If-None-Match'] = state['index_etag']
+        if state.get('index_last_modified'):
+            headers['If-Modified-Since'] = state['index_last_modified']
+        with self.http.request('GET', self.index_url, headers) as resp:
+            TRACE.annotate(status=resp.status, conditional=len(headers) > len(METADATA_HEADERS))
+            validators = {'index_etag': resp.headers.get('etag'),
+                          'index_last_modified': resp.headers.get('last-modified')}
+            if resp.status == 404:
+                logger.debug(f"No LODs published at {self.index_url}")
+                return 'missing', None, {}
+            if resp.status == 304 and len(headers) > len(METADATA_HEADERS):
+                return 'unchanged', None, {}
+            if resp.status != 200:
+                raise SyncError(f"GET {self.index_url} returned HTTP {resp.status}")
+            try:
+                index = json.loads(resp.read().decode('utf-8'))
+            except ValueError as e:
+                raise SyncError(f"Malformed LOD index: {e}") from e
+        
+        key = index.get('default')
+        world = index.get('worlds', {}).get(key) if index.get('format') == LOD_FORMAT else None
+        if world is None:
+            logger.info("The LOD index names no world to install")
+            return 'missing', None, {}
+        return 'changed', {'key': key, 'version': world.get('version'), 'manifest': world['manifest']}, validators
+    
+    def fetch_manifest(self, world: dict) -> tuple[str, dict]:
+        """(URL, manifest) of the world the index names"""
+        manifest_url = urljoin(self.index_url, world['manifest'])
+        try:
+            manifest = json.loads(self.http.get_bytes(manifest_url).decode('utf-8'))
+        except ValueError as e:
+            raise SyncError(f"Malformed LOD manifest {manifest_url}: {e}") from e
+        if (manifest.get('format') != LOD_FORMAT or manifest.get('world') != world['key']
+                or manifest.get('compression') != 'zlib'):
+            raise SyncError(f"Unsupported LOD manifest {manifest_url}")
+        return manifest_url, manifest
+    
+    def _installed(self, state: dict) -> bool:
+        """Whether the databases recorded as installed are all still there"""
+        files = state.get('files')
+        return bool(files) and all(self._dest(entry['path']).is_file() for entry in files.values())
+    
+    def _save_installed(self, key: Optional[str], version: Optional[int], validators: dict):
+        """Record the installed world version and the index validators that go with it"""
+        state = load_json(self.state_path, {})
+        updates = {'world': key, 'version': version, **validators}
+        if all(state.get(k) == v for k, v in updates.items()):
+            return
+        state.update(updates)
+        save_json(self.state_path, state)
+    
+    def _dest(self, rel_path: str) -> Path:
+        """Resolve a database path from the manifest, refusing anything outside the minecraft dir"""
+        dest = (self.minecraft_dir / rel_path).resolve()
+        if not dest.is_relative_to(self.minecraft_dir.resolve()):
+            raise SyncError(f"Refusing to write outside instance: {rel_path}")
+        return dest
+    
+    def _part(self, sha256: str) -> Path:
+        return self.staging_dir / f'{sha256[:32]}.sqlite'
+    
+    @traced('lod_assemble')
+    def _assemble(self, name: str, entry: dict, manifest_url: str, block_size: int) -> int:
+        """Build one database in the staging directory; returns the bytes downloaded
+        
+        Blocks come from an interrupted earlier attempt at the same place,
+        from anywhere in the live database, or from the host, in that order.
+        """
+        part = self._part(entry['sha256'])
+        part.parent.mkdir(parents=True, exist_ok=True)
+        blocks = entry['blocks']
+        done = set()
+        if part.is_file():
+            for i, digest in enumerate(self._block_hashes(part, block_size)):
+                if i < len(blocks) and blocks[i] == digest:
+                    done.add(i)
+    
+        dest = self._dest(entry['path'])
+        local = {}
+        if dest.is_file():
+            for i, digest in enumerate(self._block_hashes(dest, block_size)):
+                local.setdefault(digest, i * block_size)
+    
+        write_lock = threading.Lock()
+        with open(part, 'r+b' if part.is_file() else 'w+b') as out:
+            missing = []
+            with open(dest, 'rb') if local else nullcontext() as src:
+                for i, digest in enumerate(blocks):
+                    if i in done:
+                        continue
+                    data = None
+                    if digest in local:
+                        src.seek(local[digest])
+                        data = src.read(block_size)
+                    # DH may have written to the live database since it was hashed
+                    if data is None or hashlib.sha256(data).hexdigest() != digest:
+                        missing.append(i)
+                        continue
+                    out.seek(i * block_size)
+                    out.write(data)
+            reused = len(blocks) - len(missing)
+    
+            def fetch(i: int) -> int:
+                if self.cancelled.is_set():
+                    raise SyncError("LOD download cancelled")
+                digest = blocks[i]
+                packed = self.http.get_bytes(urljoin(manifest_url, f'blocks/{digest[:2]}/{digest}'))
+                try:
+                    data = zlib.decompress(packed)
+                except zlib.error as e:
+                    raise SyncError(f"LOD block {digest[:16]} is corrupt: {e}") from e
+                if hashlib.sha256(data).hexdigest() != digest:
+                    raise SyncError(f"LOD block {digest[:16]} does not match its hash")
+                with write_lock:
+                    out.seek(i * block_size)
+                    out.write(data)
+                return len(packed)
+    
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                downloaded = sum(pool.map(fetch, missing))
+            out.truncate(entry['size'])
+            out.flush()
+            os.fsync(out.fileno())
+    
+        logger.info(f"LODs of {name}: {reused}/{len(blocks)} blocks reused, {len(missing)} downloaded "
+                    f"({downloaded / 1024 ** 2:.1f} MB)")
+        TRACE.annotate(dimension=name, blocks=len(blocks), reused=reused, downloaded=len(missing))
+        return downloaded
+    
+    @staticmethod
+    def _block_hashes(path: Path, block_size: int):
+        """SHA-256 of each block of a file"""
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(block_size)
+                if not data:
                     return
-                
-                # Success!
-                self.created_instance_path = instance_path
-                self.root.after(0, self.show_success_screen)
-                
-            except PermissionError as e:
-                logger.error(f"Permission error: {e}")
-                error_msg = self.t('error_permission').format(path=str(e))
-                self.root.after(0, lambda: self.show_error(error_msg))
-            except Exception as e:
-                logger.exception("Installation failed")
-                error_msg = f"{self.t('error')}: {str(e)}"
-                self.root.after(0, lambda: self.show_error(error_msg))
+                yield hashlib.sha256(data).hexdigest()
+    
+    def _activate_staged(self) -> Optional[str]:
+        """Replace the live databases with the staged ones; only while the game is not running"""
+        state = load_json(self.state_path, {})
+        staged = state.get('staged')
+        if not staged:
+            return None
+        installed = state.get('files', {}) if state.get('world') == staged['world'] else {}
+        for name, entry in staged['files'].items():
+            part = self._part(entry['sha256'])
+            if not part.is_file():
+                continue  # Made live by an interrupted earlier run
+            dest = self._dest(entry['path'])
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            for suffix in LOD_SIDECARS:
+                dest.with_name(dest.name + suffix).unlink(missing_ok=True)
+            os.replace(part, dest)
+            installed[name] = entry
+        state.update({'world': staged['world'], 'version': staged['version'], 'files': installed})
+        state.pop('staged')
+        save_json(self.state_path, state)
+        logger.info(f"LOD version {staged['version']} of {staged['world']} is live")
+        return f"{staged['world']}/v{staged['version']}"
+    
+    def _clean_staging(self, keep: set[str]):
+        """Remove databases staged for versions that are no longer wanted"""
+        names = {self._part(sha256).name for sha256 in keep}
+        for path in self.staging_dir.glob('*.sqlite'):
+            if path.name not in names:
+                path.unlink(missing_ok=True)
+
+
+def lan_address() -> str:
+    """This machine's address on its default route (no packets are sent)"""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect(('192.0.2.1', 9))
+            return sock.getsockname()[0]
+    except OSError:
+        return socket.gethostname()
+
+
+class LanCache:
+    """Caching proxy so a room full of installs downloads the pack only once
+    
+    Every pack file is served by the hash the upstream pack pins for it
+    (LAN_OBJECT_PATH), after being verified into a content store. Clients
+    pointed at this cache's pack.toml get a compiled manifest whose URLs
+    lead here; clients that find it by UDP discovery keep reading pack
+    metadata upstream and only take files from it. pack.toml is
+    revalidated upstream every LAN_PACK_TTL seconds; index.toml and the
+    metafiles are passed through for packwiz-installer. Hashes the pack
+    does not pin are refused, so this is not an open proxy.
+    """
+    
+    SIDES = ('client', 'server')
+    MAX_METADATA_BYTES = 4 * 1024 * 1024  # Larger pass-through responses are not kept in memory
+    
+    def __init__(self, pack_url: str, cache_dir: Path, port: int = LAN_PORT, bind: str = '',
+                 workers: int = SYNC_WORKERS, mirrors: tuple = MIRRORS, prefetch: bool = True):
+        self.pack_url = pack_url
+        self.cache_dir = Path(cache_dir)
+        self.port = port
+        self.bind = bind
+        self.prefetch = prefetch
+        self.store = ContentStore(self.cache_dir / 'store')
+        self.http = HttpClient(pool_size=workers)
+        self.syncs = {side: PackSync(self.cache_dir, pack_url, side, workers, http=self.http,
+                                     store=self.store, mirrors=mirrors)
+                      for side in self.SIDES}
+        # Both sides fetch from the same origins, so they learn (and save) one set of stats
+        self.scheduler = self.syncs['client'].scheduler
+        for sync in self.syncs.values():
+            sync.scheduler = self.scheduler
+        self.state_path = self.cache_dir / LAN_STATE_FILE
+        self.pack_data: Optional[bytes] = None
+        self.pack: dict = {}
+        self.validators: dict = {}
+        self.index_hash: Optional[str] = None
+        self.files: dict[str, list[PackFile]] = {}
+        self.objects: dict[tuple[str, str], PackFile] = {}  # (hash format, hash) -> file
+        self.paths: dict[str, PackFile] = {}  # Path relative to pack.toml -> raw pack file
+        self._metadata: dict[str, bytes] = {}  # Pass-through responses for the current index
+        self._checked = 0.0
+        self._lock = threading.Lock()  # Held while the served pack is swapped
+        self._refresh_lock = threading.Lock()  # One upstream revalidation at a time
+        self._fetch_lock = threading.Lock()
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._load_state()
+    
+    def _apply(self, pack_data: bytes, validators: dict, files: dict[str, list[PackFile]]):
+        """Switch to a new pack.toml and the files it resolves to"""
+        self.pack_data = pack_data
+        self.pack = parse_toml(pack_data.decode('utf-8'))
+        self.validators = validators
+        index_hash = self.pack.get('index', {}).get('hash', '').lower()
+        if index_hash != self.index_hash:
+            self._metadata = {}
+        self.index_hash = index_hash
+        self.files = files
         
-        Thread(target=install_worker, daemon=True).start()
+        base = urljoin(self.pack_url, '.')
+        self.objects = {}
+        self.paths = {}
+        for pack_file in (f for side_files in files.values() for f in side_files):
+            self.objects[(pack_file.hash_format.lower(), pack_file.hash)] = pack_file
+            if pack_file.url.startswith(base):
+                self.paths[unquote(pack_file.url[len(base):])] = pack_file
     
+    def _load_state(self):
+        """Resume from the last resolved pack, so the cache also works with the uplink down"""
+        state = load_json(self.state_path, {})
+        if state.get('pack_url') != self.pack_url:
+            return
+        try:
+            files = {side: [PackFile(**f) for f in state['files'][side]] for side in self.SIDES}
+            self._apply(state['pack'].encode('utf-8'), state.get('validators', {}), files)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {LAN_STATE_FILE}: {e}")
+    
+    def _save_state(self):
+        save_json(self.state_path, {
+            'pack_url': self.pack_url,
+            'pack': self.pack_data.decode('utf-8'),
+            'validators': self.validators,
+            'files': {side: [asdict(f) for f in files] for side, files in self.files.items()},
+        })
+    
+    def _resolve(self, pack: dict) -> dict[str, list[PackFile]]:
+        """Files of every side: the compiled manifests, or index.toml and the metafiles read once"""
+        files = {side: self.syncs[side].fetch_manifest(pack) for side in self.SIDES}
+        if any(side_files is None for side_files in files.values()):
+            sync = self.syncs[self.SIDES[0]]
+            index_url, index = sync.fetch_index(pack)
+            entries = sync.resolve_entries(index_url, index)
+            files = {side: PackSync.select_side(entries, side) for side in self.SIDES}
+        return files
+    
+    def refresh(self, force: bool = False) -> bool:
+        """Revalidate pack.toml upstream (at most every LAN_PACK_TTL seconds)
+        
+        Returns whether the index changed. Upstream requests run outside the
+        lock that guards the served pack; while one refresh is running,
+        other callers keep serving the current pack instead of waiting. With
+        the upstream unreachable the last known pack keeps being served;
+        SyncError is only raised when there is none.
+        """
+        if not self._refresh_lock.acquire(blocking=self.pack_data is None):
+            return False
+        revalidated = False
+        try:
+            if not force and time.monotonic() - self._checked < LAN_PACK_TTL:
+                return False
+            self._checked = time.monotonic()
+            revalidated = True
+            
+            headers = dict(METADATA_HEADERS)
+            if self.pack_data is not None and self.validators.get('etag'):
+                headers['If-None-Match'] = self.validators['etag']
+            if self.pack_data is not None and self.validators.get('last_modified'):
+                headers['If-Modified-Since'] = self.validators['last_modified']
+            try:
+                with self.http.request('GET', self.pack_url, headers) as resp:
+                    if resp.status == 304:
+                        return False
+                    if resp.status != 200:
+                        raise SyncError(f"GET {self.pack_url} returned HTTP {resp.status}")
+                    data = resp.read()
+                    validators = {'etag': resp.headers.get('etag'),
+                                  'last_modified': resp.headers.get('last-modified')}
+                pack = parse_toml(data.decode('utf-8'))
+                changed = pack.get('index', {}).get('hash', '').lower() != self.index_hash
+                files = self._resolve(pack) if changed else self.files
+            except (SyncError, OSError, ValueError) as e:
+                if self.pack_data is None:
+                    raise SyncError(f"Cannot load {self.pack_url}: {e}") from e
+                logger.warning(f"Upstream unavailable, serving the cached pack: {e}")
+                return False
+            
+            with self._lock:
+                self._apply(data, validators, files)
+            self._save_state()
+        finally:
+            if revalidated:
+                self.scheduler.save()
+            self._refresh_lock.release()
+        
+        if changed:
+            logger.info(f"Pack {self.pack.get('version', '?')}: {len(self.objects)} files")
+            self.store.evict()
+            if self.prefetch:
+                self.warm()
+        return changed
+    
+    def warm(self):
+        """Fetch every pack file in the background, before the first client asks"""
+        futures = [self.fetch(pack_file) for pack_file in list(self.objects.values())]
+        
+        def report():
+            wait(futures)
+            failed = sum(1 for future in futures if future.exception() is not None)
+            logger.info(f"Cache ready: {len(futures) - failed}/{len(futures)} files"
+                        + (f" ({failed} failed, clients will fetch those upstream)" if failed else ''))
+            self.scheduler.save()
+        
+        Thread(target=report, daemon=True).start()
+    
+    def fetch(self, pack_file: PackFile) -> Future:
+        """Stored path of a pack file, downloading it once however many clients ask"""
+        key = (pack_file.hash_format.lower(), pack_file.hash)
+        with self._fetch_lock:
+            future = self._inflight.get(key)
+            if future is None:
+                path = self.store.path_for(*key)
+                if path.exists():
+                    future = Future()
+                    future.set_result(path)
+                    return future
+                future = self._inflight[key] = self._pool.submit(self._fetch_object, pack_file, key)
+        return future
+    
+    def _fetch_object(self, pack_file: PackFile, key: tuple[str, str]) -> Path:
+        try:
+            part_path = self.store.partial_path(*key)
+            with TRACE.span('lan_fetch', path=pack_file.path):
+                size = self.syncs['client'].fetch_with_retries(pack_file, part_path)
+            path = self.store.commit(part_path, *key)
+            logger.info(f"Cached {pack_file.path} ({size} bytes)")
+            return path
+        except (SyncError, OSError) as e:
+            logger.error(f"Failed to cache {pack_file.path}: {e}")
+            raise
+        finally:
+            with self._fetch_lock:
+                self._inflight.pop(key, None)
+    
+    def manifest(self, side: str) -> bytes:
+        """Compiled manifest for a side, with every URL pointing at this cache"""
+        files = [{
+            'path': f.path,
+            'url': LAN_OBJECT_PATH.format(hash_format=f.hash_format.lower(), hash=f.hash,
+                                          filename=quote(Path(f.path).name)),
+            'hash': f.hash,
+            'hash_format': f.hash_format,
+            'side': f.side,
+            'size': f.size,
+            'preserve': f.preserve,
+        } for f in sorted(self.files.get(side, []), key=lambda f: f.path)]
+        return json.dumps({
+            'format': PACK_MANIFEST_FORMAT,
+            'side': side,
+            'pack': {'name': self.pack.get('name'), 'version': self.pack.get('version')},
+            'index_hash': self.index_hash,
+            'files': files,
+        }, separators=(',', ':')).encode('utf-8')
+    
+    def handle(self, request: 'LanCacheHandler', head: bool):
+        """Route one request"""
+        rel_path = unquote(urlsplit(request.path).path).lstrip('/')
+        parts = rel_path.split('/')
+        if '..' in parts:
+            return request.send_error(404)
+        
+        object_prefix = LAN_OBJECT_PATH.strip('/').split('/')[0]
+        if parts[0] == object_prefix and len(parts) >= 3:
+            pack_file = self.objects.get((parts[1].lower(), parts[2].lower()))
+            if pack_file is None:
+                return request.send_error(404, 'Not a file of the current pack')
+            return self._send_object(request, pack_file, head)
+        
+        if rel_path == Path(urlsplit(self.pack_url).path).name:
+            try:
+                self.refresh()
+            except SyncError as e:
+                return request.send_error(502, str(e))
+            return self._send_bytes(request, self.pack_data, 'application/toml', head,
+                                    self.validators.get('etag'), self.validators.get('last_modified'))
+        
+        for side in self.SIDES:
+            name = PACK_MANIFEST.format(side=side)
+            if rel_path == name or (parts[-1] == name and len(parts) == 3 and parts[0] == 'v'):
+                try:
+                    self.refresh()
+                except SyncError as e:
+                    return request.send_error(502, str(e))
+                if len(parts) == 3 and not self.index_hash.startswith(parts[1]):
+                    return request.send_error(404)
+                return self._send_bytes(request, self.manifest(side), 'application/json', head,
+                                        f'"{self.index_hash[:16]}-{side}"')
+        
+        if rel_path in self.paths:
+            return self._send_object(request, self.paths[rel_path], head)
+        return self._pass_through(request, rel_path, head)
+    
+    def _pass_through(self, request: 'LanCacheHandler', rel_path: str, head: bool):
+        """index.toml, metafiles and anything else next to pack.toml, from upstream"""
+        data = self._metadata.get(rel_path)
+        if data is None:
+            url = urljoin(self.pack_url, quote(rel_path))
+            try:
+                with self.http.request('GET', url, METADATA_HEADERS) as resp:
+                    if resp.status != 200:
+                        return request.send_error(resp.status if resp.status == 404 else 502)
+                    data = resp.read()
+            except SyncError as e:
+                return request.send_error(502, str(e))
+            if len(data) <= self.MAX_METADATA_BYTES:
+                self._metadata[rel_path] = data
+        content_type = 'application/toml' if rel_path.endswith('.toml') else 'application/octet-stream'
+        self._send_bytes(request, data, content_type, head)
+    
+    def _send_bytes(self, request: 'LanCacheHandler', data: bytes, content_type: str, head: bool,
+                    etag: Optional[str] = None, last_modified: Optional[str] = None):
+        not_modified = ((etag and request.headers.get('If-None-Match') == etag)
+                        or (last_modified and request.headers.get('If-Modified-Since') == last_modified))
+        request.send_response(304 if not_modified else 200)
+        if etag:
+            request.send_header('ETag', etag)
+        if last_modified:
+            request.send_header('Last-Modified', last_modified)
+        request.send_header('Cache-Control', 'no-cache')
+        if not_modified:
+            request.send_header('Content-Length', '0')
+            return request.end_headers()
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        if not head:
+            request.wfile.write(data)
+    
+    def _send_object(self, request: 'LanCacheHandler', pack_file: PackFile, head: bool):
+        """Serve a verified file, or send the client upstream if it is not cached in time"""
+        future = self.fetch(pack_file)
+        done, _ = wait([future], timeout=LAN_WAIT)
+        if not done or future.exception() is not None:
+            # The fetch carries on in the background for the next client
+            request.send_response(307)
+            request.send_header('Location', pack_file.url)
+            request.send_header('Content-Length', '0')
+            return request.end_headers()
+        
+        path = future.result()
+        size = path.stat().st_size
+        etag = f'"{pack_file.hash[:32]}"'
+        start = 0
+        byte_range = request.headers.get('Range', '')
+        if byte_range.startswith('bytes=') and request.headers.get('If-Range', etag) == etag:
+            try:
+                start = int(byte_range[6:].split('-')[0])
+            except ValueError:
+                start = 0
+            if start >= size:
+                request.send_response(416)
+                request.send_header('Content-Range', f'bytes */{size}')
+                request.send_header('Content-Length', '0')
+                return request.end_headers()
+        
+        request.send_response(206 if start else 200)
+        request.send_header('Content-Type', 'application/octet-stream')
+        request.send_header('Content-Length', str(size - start))
+        request.send_header('ETag', etag)
+        request.send_header('Accept-Ranges', 'bytes')
+        request.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+        if start:
+            request.send_header('Content-Range', f'bytes {start}-{size - 1}/{size}')
+        request.end_headers()
+        if not head:
+            with open(path, 'rb') as f:
+                request.wfile.flush()
+                request.connection.sendfile(f, start, size - start)
+    
+    def answer_discovery(self):
+        """Reply to discovery broadcasts from syncing clients"""
+        reply = json.dumps({'pack_url': self.pack_url, 'port': self.port}).encode('utf-8')
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind((self.bind, LAN_DISCOVERY_PORT))
+                while True:
+                    data, address = sock.recvfrom(512)
+                    if data == LAN_PROBE:
+                        sock.sendto(reply, address)
+        except OSError as e:
+            logger.warning(f"LAN discovery disabled, clients must be given the pack URL: {e}")
+    
+    def serve(self, discovery: bool = True):
+        """Serve until interrupted"""
+        server = ThreadingHTTPServer((self.bind, self.port), LanCacheHandler)
+        server.cache = self
+        self.port = server.server_address[1]
+        if discovery:
+            Thread(target=self.answer_discovery, daemon=True).start()
+        logger.info(f"LAN cache for {self.pack_url}")
+        logger.info(f"Pack URL for this network: http://{lan_address()}:{self.port}/"
+                    f"{Path(urlsplit(self.pack_url).path).name}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            self.scheduler.save()
+
+
+class LanCacheHandler(BaseHTTPRequestHandler):
+    """HTTP front end of LanCache (keep-alive, so every response has a length)"""
+    
+    protocol_version = 'HTTP/1.1'
+    server_version = f'{PACK_NAME}-LanCache'
+    
+    def do_GET(self):
+        self._handle(head=False)
+    
+    def do_HEAD(self):
+        self._handle(head=True)
+    
+    def _handle(self, head: bool):
+        try:
+            self.server.cache.handle(self, head)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class InstanceProvisioner:
+    """Finds Prism Launcher and creates/configures the pack instance, without any UI"""
+    
+    def __init__(self, instance_name: str = PACK_NAME, min_memory: Optional[int] = None,
+                 max_memory: Optional[int] = None):
+        # Prism Launcher paths
+        self.prism_path: Optional[Path] = None
+        self.prism_instances_path: Optional[Path] = None
+        
+        # Pack configuration (memory left as None is sized for this machine)
+        self.instance_name = instance_name
+        self.min_memory = min_memory
+        self.max_memory = max_memory
+        self.jvm: Optional[JvmProfile] = None
+    
+    @traced('tune_jvm')
+    def jvm_profile(self) -> JvmProfile:
+        """Heap and GC settings for this machine, detected on first use"""
+        if self.jvm is None:
+            java_dirs = [self.prism_instances_path.parent / 'java'] if self.prism_instances_path else []
+            ram_mb = physical_memory_mb()
+            java_major = detect_java_major(java_dirs)
+            self.jvm = tune_jvm(ram_mb, os.cpu_count(), java_major,
+                                min_memory=self.min_memory, max_memory=self.max_memory)
+            TRACE.annotate(ram_mb=ram_mb, cores=os.cpu_count(), java=java_major, gc=self.jvm.gc,
+                           max_memory=self.jvm.max_memory)
+            logger.info(f"JVM: {self.jvm.min_memory}-{self.jvm.max_memory} MB heap, {self.jvm.reason}")
+        return self.jvm
+    
+    def use_prism_root(self, prism_root: Path):
+        """Target an explicit Prism data directory instead of searching for one"""
+        self.prism_instances_path = Path(prism_root) / 'instances'
+        self.prism_instances_path.mkdir(parents=True, exist_ok=True)
+    
+    @traced('find_prism')
     def find_prism_launcher(self) -> bool:
         """Find Prism Launcher installation"""
         logger.debug("Searching for Prism Launcher...")
         
-        search_paths = []
+        exe_path = self._load_cached_prism()
+        TRACE.annotate(cached=exe_path is not None)
+        if not exe_path:
+            exe_path = self._discover_prism()
+            if exe_path:
+                self._save_cached_prism(exe_path)
+        
+        if not exe_path:
+            logger.debug("Prism Launcher not found")
+            return False
         
-        # Windows registry check
-        if sys.platform == 'win32':
-            search_paths.extend(self._search_registry())
+        self.prism_path = exe_path
+        self.prism_instances_path = self._get_instances_path()
+        logger.info(f"Found Prism Launcher: {exe_path}")
+        logger.info(f"Instances path: {self.prism_instances_path}")
+        return True
+    
+    def _candidate_dirs(self) -> list[Path]:
+        """Well-known install locations, most likely first"""
+        search_paths = []
         
         # Environment-based paths
         appdata = os.getenv('APPDATA')  # %APPDATA% (Roaming)
@@ -429,20 +3061,75 @@ class InstallerApp:
             Path('/usr/share/prismlauncher'),
             Path('/opt/prismlauncher'),
         ])
+        return search_paths
+    
+    def _discover_prism(self) -> Optional[Path]:
+        """Probe all candidate locations concurrently and return the first executable found"""
+        pool = ThreadPoolExecutor(max_workers=PRISM_PROBE_WORKERS)
+        pending = set()
+        seen = set()
+        
+        def probe(directory: Path):
+            key = os.path.normcase(str(directory))
+            if key in seen:
+                return
+            seen.add(key)
+            pending.add(pool.submit(self._find_executable, directory))
         
-        # Check each path
-        for path in search_paths:
-            if path and path.exists():
-                exe_path = self._find_executable(path)
-                if exe_path:
-                    self.prism_path = exe_path
-                    self.prism_instances_path = self._get_instances_path()
-                    logger.info(f"Found Prism Launcher: {exe_path}")
-                    logger.info(f"Instances path: {self.prism_instances_path}")
-                    return True
+        # Registry lookups run alongside the filesystem probes
+        if sys.platform == 'win32':
+            pending.add(pool.submit(self._search_registry))
+        for directory in self._candidate_dirs():
+            probe(directory)
         
-        logger.debug("Prism Launcher not found")
-        return False
+        deadline = time.monotonic() + PRISM_PROBE_TIMEOUT
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    logger.warning("Prism Launcher search timed out")
+                    return None
+                for future in done:
+                    try:
+                        result = future.result()
+                    except OSError as e:
+                        logger.debug(f"Prism probe failed: {e}")
+                        continue
+                    if isinstance(result, list):
+                        for directory in result:
+                            probe(directory)
+                    elif result:
+                        return result
+            return None
+        finally:
+            # Remaining walks are abandoned; they only read directory listings
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _load_cached_prism(self) -> Optional[Path]:
+        """Return the previously discovered executable if it is still installed"""
+        cached = load_json(user_cache_dir() / PRISM_CACHE_FILE, {})
+        exe = cached.get('exe')
+        if not exe:
+            return None
+        exe_path = Path(exe)
+        try:
+            if exe_path.is_file():
+                logger.debug(f"Using cached Prism location: {exe_path}")
+                return exe_path
+        except OSError:
+            pass
+        logger.debug(f"Cached Prism location is gone: {exe_path}")
+        return None
+    
+    def _save_cached_prism(self, exe_path: Path):
+        """Remember where Prism was found so later runs skip the search"""
+        try:
+            cache_dir = user_cache_dir()
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            save_json(cache_dir / PRISM_CACHE_FILE, {'exe': str(exe_path)})
+        except OSError as e:
+            logger.debug(f"Could not cache Prism location: {e}")
     
     def _search_registry(self) -> list[Path]:
         """Search Windows registry for Prism installation"""
@@ -451,26 +3138,39 @@ class InstallerApp:
             import winreg
             registry_path = r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"
             
-            for hive in [winreg.HKEY_LOCAL_MACHINE, winreg.HKEY_CURRENT_USER]:
+            def install_location(key) -> Optional[Path]:
+                try:
+                    display_name = winreg.QueryValueEx(key, "DisplayName")[0]
+                    if "PrismLauncher" in display_name or "Prism Launcher" in display_name:
+                        install_loc = winreg.QueryValueEx(key, "InstallLocation")[0]
+                        if install_loc:
+                            return Path(install_loc)
+                except (FileNotFoundError, OSError):
+                    pass
+                return None
+            
+            for hive in [winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE]:
+                # The official installer registers under a fixed key name; try it before enumerating
+                try:
+                    with winreg.OpenKey(hive, registry_path + r"\PrismLauncher") as subkey:
+                        location = install_location(subkey)
+                        if location:
+                            paths.append(location)
+                            continue
+                except OSError:
+                    pass
+                
                 try:
                     key = winreg.OpenKey(hive, registry_path)
                     for i in range(winreg.QueryInfoKey(key)[0]):
                         try:
                             subkey_name = winreg.EnumKey(key, i)
-                            subkey = winreg.OpenKey(key, subkey_name)
-                            try:
-                                display_name = winreg.QueryValueEx(subkey, "DisplayName")[0]
-                                if "PrismLauncher" in display_name or "Prism Launcher" in display_name:
-                                    try:
-                                        install_loc = winreg.QueryValueEx(subkey, "InstallLocation")[0]
-                                        if install_loc:
-                                            paths.append(Path(install_loc))
-                                    except (FileNotFoundError, OSError):
-                                        pass
-                            except (FileNotFoundError, OSError):
-                                pass
-                            finally:
-                                subkey.Close()
+                            if 'prism' not in subkey_name.lower() and not subkey_name.startswith('{'):
+                                continue
+                            with winreg.OpenKey(key, subkey_name) as subkey:
+                                location = install_location(subkey)
+                                if location:
+                                    paths.append(location)
                         except Exception:
                             pass
                     key.Close()
@@ -488,22 +3188,26 @@ class InstallerApp:
         else:
             exe_names = ['prismlauncher', 'PrismLauncher']
         
+        if not directory.is_dir():
+            return None
+        
         # Check direct path
         for name in exe_names:
             exe_path = directory / name
-            if exe_path.exists():
+            if exe_path.is_file():
                 return exe_path
         
-        # Check subdirectories (limited depth)
+        # Check subdirectories (limited depth, skipping launcher data folders)
         for root, dirs, files in os.walk(str(directory)):
-            depth = len(Path(root).relative_to(directory).parts)
-            if depth > 3:
-                dirs.clear()
-                continue
-            
             for name in exe_names:
                 if name in files:
                     return Path(root) / name
+            
+            depth = len(Path(root).relative_to(directory).parts)
+            if depth >= PRISM_PROBE_DEPTH:
+                dirs.clear()
+            else:
+                dirs[:] = [d for d in dirs if d.lower() not in PRISM_SKIP_DIRS]
         
         return None
     
@@ -526,8 +3230,9 @@ class InstallerApp:
         instances_path.mkdir(parents=True, exist_ok=True)
         return instances_path
     
-    def create_instance(self) -> Optional[Path]:
-        """Create a new Prism Launcher instance"""
+    @traced('create_instance')
+    def create_instance(self, reuse_existing: bool = False) -> Optional[Path]:
+        """Create a new Prism Launcher instance (or refresh an existing one with reuse_existing)"""
         if not self.prism_instances_path:
             logger.error("No instances path available")
             return None
@@ -536,7 +3241,7 @@ class InstallerApp:
             # Find available instance name
             instance_dir = self.prism_instances_path / self.instance_name
             counter = 1
-            while instance_dir.exists():
+            while instance_dir.exists() and not reuse_existing:
                 instance_dir = self.prism_instances_path / f"{self.instance_name}-{counter}"
                 counter += 1
             
@@ -598,6 +3303,7 @@ class InstallerApp:
             # Create instance.cfg
             instance_cfg_path = instance_dir / 'instance.cfg'
             instance_name_display = instance_dir.name
+            jvm = self.jvm_profile()
             
             cfg_content = f"""[General]
 ConfigVersion=1.3
@@ -607,15 +3313,19 @@ InstanceType=OneSix
 OverrideCommands=true
 PreLaunchCommand={PRE_LAUNCH_CMD}
 OverrideMemory=true
-MinMemAlloc={MIN_MEMORY}
-MaxMemAlloc={MAX_MEMORY}
+MinMemAlloc={jvm.min_memory}
+MaxMemAlloc={jvm.max_memory}
+OverrideJavaArgs=true
+JvmArgs={jvm.jvm_args}
 OverrideJavaLocation=false
 """
             
-            with open(instance_cfg_path, 'w', encoding='utf-8') as f:
-                f.write(cfg_content)
-            
-            logger.info(f"Created instance.cfg at: {instance_cfg_path}")
+            # A reused instance keeps its settings; configure_instance() updates ours
+            if not instance_cfg_path.exists():
+                with open(instance_cfg_path, 'w', encoding='utf-8') as f:
+                    f.write(cfg_content)
+                
+                logger.info(f"Created instance.cfg at: {instance_cfg_path}")
             
             return instance_dir
             
@@ -625,99 +3335,763 @@ OverrideJavaLocation=false
             logger.exception("Error creating instance")
             return None
     
-    def copy_update_bat(self, instance_path: Path) -> bool:
-        """Copy update.bat to instance minecraft directory"""
-        minecraft_dir = instance_path / 'minecraft'
+    @traced('copy_update_bat')
+    def copy_update_bat(self, instance_path: Path) -> bool:
+        """Copy update.bat to instance minecraft directory"""
+        minecraft_dir = instance_path / 'minecraft'
+        
+        # Find update.bat in multiple locations
+        possible_paths = []
+        
+        # Next to script/executable
+        script_dir = Path(__file__).parent
+        possible_paths.append(script_dir / 'update.bat')
+        
+        # PyInstaller bundled resource
+        if getattr(sys, 'frozen', False):
+            base_path = Path(sys._MEIPASS)
+            possible_paths.append(base_path / 'update.bat')
+        
+        # Current working directory
+        possible_paths.append(Path.cwd() / 'update.bat')
+        
+        # Parent of script directory
+        possible_paths.append(script_dir.parent / 'update.bat')
+        
+        # Find existing update.bat
+        source_path = None
+        for path in possible_paths:
+            if path.exists() and path.is_file():
+                source_path = path
+                logger.debug(f"Found update.bat at: {source_path}")
+                break
+        
+        if not source_path:
+            logger.error("Could not find update.bat")
+            return False
+        
+        # Copy to destination
+        dest_path = minecraft_dir / 'update.bat'
+        try:
+            shutil.copy2(source_path, dest_path)
+            logger.info(f"Copied update.bat to {dest_path}")
+            return True
+        except PermissionError:
+            raise
+        except Exception as e:
+            logger.exception("Error copying update.bat")
+            return False
+    
+    @traced('copy_sync_engine')
+    def copy_sync_engine(self, instance_path: Path) -> bool:
+        """Copy the sync engine next to update.bat so it can sync the pack without Java
+        
+        The PyInstaller build bundles the engine as a separate console-mode
+        --onedir build (build.bat): the windowed --onefile installer would
+        unpack itself to %TEMP% on every launch and has no stdout. From
+        source, this script and jvm_tuning.py are copied.
+        """
+        minecraft_dir = instance_path / 'minecraft'
+        
+        try:
+            if getattr(sys, 'frozen', False):
+                source_path = Path(sys._MEIPASS) / SYNC_ENGINE_NAME
+                dest_path = minecraft_dir / SYNC_ENGINE_NAME
+                if not (source_path / f'{SYNC_ENGINE_NAME}.exe').is_file():
+                    logger.warning("This build has no bundled sync engine (update.bat will use packwiz-installer)")
+                    return False
+                shutil.rmtree(dest_path, ignore_errors=True)
+                shutil.copytree(source_path, dest_path)
+                # Older installers placed a copy of themselves here
+                (minecraft_dir / f'{SYNC_ENGINE_NAME}.exe').unlink(missing_ok=True)
+            else:
+                source_path = Path(__file__)
+                dest_path = minecraft_dir / f'{SYNC_ENGINE_NAME}.py'
+                shutil.copy2(source_path, dest_path)
+                # The modules it imports go next to it
+                shutil.copy2(jvm_tuning.__file__, minecraft_dir / Path(jvm_tuning.__file__).name)
+            logger.info(f"Copied sync engine to {dest_path}")
+            return True
+        except OSError:
+            logger.exception("Error copying sync engine (update.bat will use packwiz-installer)")
+            return False
+    
+    @traced('configure_instance')
+    def configure_instance(self, instance_path: Path) -> bool:
+        """Configure instance settings (pre-launch, memory, JVM arguments)"""
+        instance_cfg_path = instance_path / 'instance.cfg'
+        
+        if not instance_cfg_path.exists():
+            logger.error(f"Instance config not found: {instance_cfg_path}")
+            return False
+        
+        try:
+            # Read existing config
+            config_dict = {}
+            with open(instance_cfg_path, 'r', encoding='utf-8') as f:
+                current_section = None
+                for line in f:
+                    line = line.strip()
+                    if line.startswith('[') and line.endswith(']'):
+                        current_section = line[1:-1]
+                        continue
+                    if line and '=' in line and not line.startswith('#'):
+                        key, value = line.split('=', 1)
+                        config_dict[key.strip()] = value.strip()
+            
+            # Add/update settings
+            config_dict['OverrideCommands'] = 'true'
+            config_dict['PreLaunchCommand'] = PRE_LAUNCH_CMD
+            jvm = self.jvm_profile()
+            config_dict['OverrideMemory'] = 'true'
+            config_dict['MinMemAlloc'] = str(jvm.min_memory)
+            config_dict['MaxMemAlloc'] = str(jvm.max_memory)
+            config_dict['OverrideJavaArgs'] = 'true'
+            config_dict['JvmArgs'] = jvm.jvm_args
+            config_dict['OverrideJavaLocation'] = 'false'
+            
+            # Write back with section header
+            with open(instance_cfg_path, 'w', encoding='utf-8') as f:
+                f.write("[General]\n")
+                for key, value in config_dict.items():
+                    f.write(f"{key}={value}\n")
+            
+            logger.info(f"Configured instance: {instance_cfg_path}")
+            return True
+            
+        except PermissionError:
+            raise
+        except Exception as e:
+            logger.exception("Error configuring instance")
+            return False
+
+
+class InstallerApp(InstanceProvisioner):
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+        self.root.title(TRANSLATIONS['uk']['title'])
+        self.root.geometry('600x450')
+        self.root.resizable(False, False)
+        
+        # Center window on screen
+        self.root.update_idletasks()
+        width = self.root.winfo_width()
+        height = self.root.winfo_height()
+        x = (self.root.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.root.winfo_screenheight() // 2) - (height // 2)
+        self.root.geometry(f'+{x}+{y}')
+        
+        # Language (default: Ukrainian)
+        self.current_lang = 'uk'
+        
+        # Created instance path (for success screen)
+        self.created_instance_path: Optional[Path] = None
+        
+        # Whether the mods were downloaded during install (for success screen)
+        self.mods_prefetched = False
+        
+        # Setup UI
+        self.setup_ui()
+        
+        logger.info("Installer initialized")
+    
+    def setup_ui(self):
+        """Setup the user interface"""
+        # Main container
+        self.main_frame = ttk.Frame(self.root, padding="20")
+        self.main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Header with language toggle
+        header_frame = ttk.Frame(self.main_frame)
+        header_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        self.title_label = ttk.Label(header_frame, text=self.t('title'), font=('Segoe UI', 18, 'bold'))
+        self.title_label.pack(side=tk.LEFT)
+        
+        self.lang_button = ttk.Button(header_frame, text=self.t('language_toggle'), 
+                                command=self.toggle_language, width=15)
+        self.lang_button.pack(side=tk.RIGHT)
+        
+        # Content frame (changes based on state)
+        self.content_frame = ttk.Frame(self.main_frame)
+        self.content_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Show welcome screen initially
+        self.show_welcome_screen()
+    
+    def t(self, key: str) -> str:
+        """Get translation for current language"""
+        return TRANSLATIONS[self.current_lang].get(key, key)
+    
+    def toggle_language(self):
+        """Toggle between Ukrainian and English"""
+        self.current_lang = 'en' if self.current_lang == 'uk' else 'uk'
+        self.update_ui_text()
+    
+    def update_ui_text(self):
+        """Update all UI text when language changes"""
+        self.root.title(self.t('title'))
+        self.title_label.config(text=self.t('title'))
+        self.lang_button.config(text=self.t('language_toggle'))
+        
+        # Update button texts if they exist
+        for widget in self.content_frame.winfo_children():
+            if isinstance(widget, ttk.Button):
+                # Update known buttons by their current text patterns
+                widget.update()
+    
+    def clear_content(self):
+        """Clear content frame"""
+        for widget in self.content_frame.winfo_children():
+            widget.destroy()
+    
+    def show_welcome_screen(self):
+        """Show welcome screen"""
+        self.clear_content()
+        
+        # Welcome message
+        welcome_label = ttk.Label(self.content_frame, text=self.t('welcome'), 
+                                 font=('Segoe UI', 14, 'bold'))
+        welcome_label.pack(pady=(40, 10))
+        
+        desc_label = ttk.Label(self.content_frame, text=self.t('welcome_desc'),
+                              justify=tk.CENTER, wraplength=500, font=('Segoe UI', 10))
+        desc_label.pack(pady=(0, 40))
+        
+        # Start button
+        start_btn = ttk.Button(self.content_frame, text=self.t('start_installation'), 
+                              command=self.start_installation, width=25)
+        start_btn.pack(pady=20)
+    
+    def show_prism_not_found_screen(self):
+        """Show Prism Launcher not found screen with download instructions"""
+        self.clear_content()
+        
+        # Warning icon (using emoji)
+        icon_label = ttk.Label(self.content_frame, text="⚠️", font=('Segoe UI', 48))
+        icon_label.pack(pady=(20, 10))
+        
+        # Title
+        title_label = ttk.Label(self.content_frame, text=self.t('prism_not_found'),
+                               font=('Segoe UI', 14, 'bold'))
+        title_label.pack(pady=(0, 10))
+        
+        # Description
+        desc_label = ttk.Label(self.content_frame, text=self.t('prism_not_found_desc'),
+                              justify=tk.CENTER, wraplength=500, font=('Segoe UI', 10))
+        desc_label.pack(pady=(0, 30))
+        
+        # Buttons frame
+        btn_frame = ttk.Frame(self.content_frame)
+        btn_frame.pack(pady=20)
+        
+        # Download button (primary)
+        download_btn = ttk.Button(btn_frame, text=self.t('download_prism'),
+                                 command=self.open_prism_download, width=20)
+        download_btn.pack(side=tk.LEFT, padx=10)
+        
+        # Check again button
+        check_btn = ttk.Button(btn_frame, text=self.t('check_again'),
+                              command=self.check_prism_again, width=20)
+        check_btn.pack(side=tk.LEFT, padx=10)
+    
+    def show_progress_screen(self, message: str, determinate: bool = False):
+        """Show progress screen with spinner (or a download progress bar)"""
+        self.clear_content()
         
-        # Find update.bat in multiple locations
-        possible_paths = []
+        # Spacer
+        ttk.Frame(self.content_frame).pack(pady=50)
         
-        # Next to script/executable
-        script_dir = Path(__file__).parent
-        possible_paths.append(script_dir / 'update.bat')
+        # Status message
+        self.status_label = ttk.Label(self.content_frame, text=message,
+                                      font=('Segoe UI', 12))
+        self.status_label.pack(pady=20)
         
-        # PyInstaller bundled resource
-        if getattr(sys, 'frozen', False):
-            base_path = Path(sys._MEIPASS)
-            possible_paths.append(base_path / 'update.bat')
+        if determinate:
+            # Progress bar (bytes downloaded) with size, speed and ETA underneath
+            self.progress = ttk.Progressbar(self.content_frame, mode='determinate',
+                                            length=400, maximum=1000)
+            self.progress.pack(pady=(20, 5))
+            self.progress_detail = ttk.Label(self.content_frame, text='', font=('Segoe UI', 9))
+            self.progress_detail.pack()
+        else:
+            # Progress bar (indeterminate)
+            self.progress = ttk.Progressbar(self.content_frame, mode='indeterminate', length=400)
+            self.progress.pack(pady=20)
+            self.progress.start(10)
+    
+    def update_status(self, message: str):
+        """Update status message"""
+        if hasattr(self, 'status_label'):
+            self.status_label.config(text=message)
+        self.root.update_idletasks()
+    
+    def update_download_progress(self, snapshot: dict):
+        """Show a SyncProgress snapshot on the determinate progress bar"""
+        if not hasattr(self, 'progress_detail') or not self.progress_detail.winfo_exists():
+            return
+        self.progress['value'] = snapshot['fraction'] * 1000
         
-        # Current working directory
-        possible_paths.append(Path.cwd() / 'update.bat')
+        eta = snapshot['eta_seconds']
+        eta_text = f"{int(eta) // 60}:{int(eta) % 60:02d}" if eta is not None else '–'
+        self.progress_detail.config(text=self.t('download_progress').format(
+            done=snapshot['done_bytes'] / 1024 / 1024,
+            total=snapshot['total_bytes'] / 1024 / 1024,
+            speed=snapshot['bytes_per_second'] / 1024 / 1024,
+            eta=eta_text,
+        ))
+    
+    def show_success_screen(self):
+        """Show success screen"""
+        self.clear_content()
         
-        # Parent of script directory
-        possible_paths.append(script_dir.parent / 'update.bat')
+        # Success icon
+        icon_label = ttk.Label(self.content_frame, text="✅", font=('Segoe UI', 48))
+        icon_label.pack(pady=(30, 10))
         
-        # Find existing update.bat
-        source_path = None
-        for path in possible_paths:
-            if path.exists() and path.is_file():
-                source_path = path
-                logger.debug(f"Found update.bat at: {source_path}")
-                break
+        # Title
+        title_label = ttk.Label(self.content_frame, text=self.t('success'),
+                               font=('Segoe UI', 14, 'bold'))
+        title_label.pack(pady=(0, 10))
         
-        if not source_path:
-            logger.error("Could not find update.bat")
-            return False
+        # Description
+        desc_key = 'success_desc' if self.mods_prefetched else 'success_desc_deferred'
+        desc_label = ttk.Label(self.content_frame, text=self.t(desc_key),
+                              justify=tk.CENTER, wraplength=500, font=('Segoe UI', 10))
+        desc_label.pack(pady=(0, 20))
         
-        # Copy to destination
-        dest_path = minecraft_dir / 'update.bat'
-        try:
-            shutil.copy2(source_path, dest_path)
-            logger.info(f"Copied update.bat to {dest_path}")
-            return True
-        except PermissionError:
-            raise
-        except Exception as e:
-            logger.exception("Error copying update.bat")
-            return False
+        # Instance path
+        if self.created_instance_path:
+            path_frame = ttk.Frame(self.content_frame)
+            path_frame.pack(pady=10)
+            
+            path_label = ttk.Label(path_frame, text=self.t('instance_path'),
+                                  font=('Segoe UI', 9))
+            path_label.pack(side=tk.LEFT)
+            
+            path_value = ttk.Label(path_frame, text=str(self.created_instance_path),
+                                  font=('Segoe UI', 9, 'italic'))
+            path_value.pack(side=tk.LEFT, padx=5)
+        
+        # Buttons
+        btn_frame = ttk.Frame(self.content_frame)
+        btn_frame.pack(pady=30)
+        
+        # Launch Prism button
+        if self.prism_path:
+            launch_btn = ttk.Button(btn_frame, text=self.t('launch_prism'),
+                                   command=self.launch_prism, width=20)
+            launch_btn.pack(side=tk.LEFT, padx=10)
+        
+        # Close button
+        close_btn = ttk.Button(btn_frame, text=self.t('close'),
+                              command=self.root.quit, width=15)
+        close_btn.pack(side=tk.LEFT, padx=10)
     
-    def configure_instance(self, instance_path: Path) -> bool:
-        """Configure instance settings (pre-launch, memory)"""
-        instance_cfg_path = instance_path / 'instance.cfg'
+    def show_error(self, message: str):
+        """Show error dialog and reset to welcome screen"""
+        if hasattr(self, 'progress'):
+            self.progress.stop()
+        messagebox.showerror(self.t('error'), message)
+        self.show_welcome_screen()
+    
+    def open_prism_download(self):
+        """Open Prism Launcher download page in browser"""
+        logger.info(f"Opening download page: {PRISM_DOWNLOAD_URL}")
+        webbrowser.open(PRISM_DOWNLOAD_URL)
+    
+    def check_prism_again(self):
+        """Re-check for Prism Launcher after user installs it"""
+        self.show_progress_screen(self.t('checking_prism'))
         
-        if not instance_cfg_path.exists():
-            logger.error(f"Instance config not found: {instance_cfg_path}")
-            return False
+        def check_worker():
+            if self.find_prism_launcher():
+                self.root.after(0, self.continue_installation)
+            else:
+                self.root.after(0, self.show_prism_not_found_screen)
         
-        try:
-            # Read existing config
-            config_dict = {}
-            with open(instance_cfg_path, 'r', encoding='utf-8') as f:
-                current_section = None
-                for line in f:
-                    line = line.strip()
-                    if line.startswith('[') and line.endswith(']'):
-                        current_section = line[1:-1]
-                        continue
-                    if line and '=' in line and not line.startswith('#'):
-                        key, value = line.split('=', 1)
-                        config_dict[key.strip()] = value.strip()
-            
-            # Add/update settings
-            config_dict['OverrideCommands'] = 'true'
-            config_dict['PreLaunchCommand'] = PRE_LAUNCH_CMD
-            config_dict['OverrideMemory'] = 'true'
-            config_dict['MinMemAlloc'] = str(MIN_MEMORY)
-            config_dict['MaxMemAlloc'] = str(MAX_MEMORY)
-            config_dict['OverrideJavaLocation'] = 'false'
+        Thread(target=check_worker, daemon=True).start()
+    
+    def launch_prism(self):
+        """Launch Prism Launcher"""
+        if self.prism_path and self.prism_path.exists():
+            try:
+                import subprocess
+                subprocess.Popen([str(self.prism_path)], start_new_session=True)
+                logger.info(f"Launched Prism Launcher: {self.prism_path}")
+            except Exception as e:
+                logger.error(f"Failed to launch Prism: {e}")
+    
+    def start_installation(self):
+        """Start the installation process"""
+        self.show_progress_screen(self.t('checking_prism'))
+        
+        def install_worker():
+            # Step 1: Check for Prism Launcher
+            if not self.find_prism_launcher():
+                self.root.after(0, self.show_prism_not_found_screen)
+                return
             
-            # Write back with section header
-            with open(instance_cfg_path, 'w', encoding='utf-8') as f:
-                f.write("[General]\n")
-                for key, value in config_dict.items():
-                    f.write(f"{key}={value}\n")
+            self.root.after(0, self.continue_installation)
+        
+        Thread(target=install_worker, daemon=True).start()
+    
+    def continue_installation(self):
+        """Continue installation after Prism is found"""
+        self.show_progress_screen(self.t('prism_found'))
+        
+        def install_worker():
+            sync = prefetch = None
             
-            logger.info(f"Configured instance: {instance_cfg_path}")
-            return True
+            def fail(message: str):
+                # Stop the background download before the error screen, so nothing keeps writing
+                if prefetch is not None:
+                    sync.cancel()
+                    prefetch.join()
+                self.root.after(0, lambda: self.show_error(message))
             
-        except PermissionError:
-            raise
+            try:
+                # Step 2: Create instance
+                self.root.after(0, lambda: self.update_status(self.t('creating_instance')))
+                instance_path = self.create_instance()
+                if not instance_path:
+                    fail(self.t('error_instance_create'))
+                    return
+                
+                # Download the pack in the background while the rest is set up
+                self.root.after(0, lambda: self.show_progress_screen(self.t('copying_files'), determinate=True))
+                def on_progress(snapshot):
+                    self.root.after(0, lambda: self.update_download_progress(snapshot))
+                
+                sync = PackSync(instance_path / 'minecraft', store=ContentStore(), on_progress=on_progress,
+                                lan='auto', tier='auto')
+                prefetch = Thread(target=self.prefetch_pack, args=(sync,), daemon=True)
+                prefetch.start()
+                
+                # Step 3: Copy update.bat
+                self.root.after(0, lambda: self.update_status(self.t('copying_files')))
+                if not self.copy_update_bat(instance_path):
+                    fail(self.t('error_file_copy'))
+                    return
+                
+                # Step 3b: Copy the pack sync engine (optional, update.bat falls back to packwiz)
+                self.copy_sync_engine(instance_path)
+                
+                # Step 4: Configure instance
+                self.root.after(0, lambda: self.update_status(self.t('configuring')))
+                if not self.configure_instance(instance_path):
+                    fail(self.t('error_config'))
+                    return
+                
+                # Step 5: Wait for the mods (on failure, the first launch downloads them)
+                self.root.after(0, lambda: self.update_status(self.t('downloading_mods')))
+                prefetch.join()
+                
+                # Success!
+                self.created_instance_path = instance_path
+                self.root.after(0, self.show_success_screen)
+                
+            except PermissionError as e:
+                logger.error(f"Permission error: {e}")
+                fail(self.t('error_permission').format(path=str(e)))
+            except Exception as e:
+                logger.exception("Installation failed")
+                fail(f"{self.t('error')}: {str(e)}")
+        
+        Thread(target=install_worker, daemon=True).start()
+    
+    def prefetch_pack(self, sync: PackSync):
+        """Download all client files into the new instance (the sync reports progress to the UI)"""
+        try:
+            summary = sync.run(force=True)
+            self.mods_prefetched = True
+            logger.info(f"Prefetched pack: {summary}")
         except Exception as e:
-            logger.exception("Error configuring instance")
-            return False
+            logger.warning(f"Prefetch failed, mods will be downloaded on first launch: {e}")
+
+
+def sync_main(argv: list[str]) -> int:
+    """Headless pack sync used by the update scripts"""
+    parser = argparse.ArgumentParser(prog=f'{SYNC_ENGINE_NAME} sync',
+                                     description='Synchronise a minecraft directory with the DHH pack')
+    parser.add_argument('minecraft_dir', nargs='?', default='.', help='Instance minecraft directory')
+    parser.add_argument('--pack-url', default=PACK_URL, help='URL of pack.toml')
+    parser.add_argument('--side', choices=['client', 'server'], default='client')
+    parser.add_argument('--workers', type=int, default=SYNC_WORKERS, help='Parallel downloads')
+    parser.add_argument('--force', action='store_true', help='Skip the "nothing changed" fast path')
+    parser.add_argument('--defer', action='store_true',
+                        help='Download updates the server does not require in the background and '
+                             'switch to them on the next launch')
+    parser.add_argument('--stage', action='store_true',
+                        help='Only download and stage the update as a generation (run by --defer)')
+    parser.add_argument('--store', type=Path, default=None,
+                        help='Shared content store directory (default: per-user cache)')
+    parser.add_argument('--no-store', action='store_true', help='Do not use the shared content store')
+    parser.add_argument('--mirror', action='append', dest='mirrors', metavar='TEMPLATE',
+                        help='Extra origin for jars, e.g. https://host/{path} (repeatable; '
+                             'replaces the built-in mirrors)')
+    parser.add_argument('--no-mirrors', action='store_true', help='Only use the URLs from the metafiles')
+    parser.add_argument('--per-host', type=int, default=PER_HOST_CONNECTIONS,
+                        help='Concurrent connections per origin host')
+    parser.add_argument('--limit-rate', type=int, default=None, metavar='KBPS',
+                        help='Global download bandwidth cap in KB/s')
+    parser.add_argument('--lan', default=os.getenv('DHH_LAN', 'auto'), metavar='URL',
+                        help='LAN cache to take files from, or "auto" to discover one (default: $DHH_LAN or auto)')
+    parser.add_argument('--no-lan', action='store_true', help='Do not look for a LAN cache')
+    parser.add_argument('--tier', choices=('auto',) + TIERS, default=os.getenv('DHH_TIER') or 'auto',
+                        help='Distant Horizons/shader tier, or "auto" to detect it (default: $DHH_TIER or auto)')
+    parser.add_argument('--no-tier', action='store_true', help='Leave the pack configs exactly as shipped')
+    parser.add_argument('--no-lod', action='store_true',
+                        help="Do not install the server's pre-built Distant Horizons LODs")
+    parser.add_argument('--trace', type=Path, default=None,
+                        help=f'JSON-lines span trace (default: {TRACE_FILE} in the minecraft directory)')
+    parser.add_argument('--no-trace', action='store_true', help='Do not write a trace')
+    parser.add_argument('--profile', type=Path, default=None,
+                        help='Write a sampled folded-stack profile of all threads to this file')
+    args = parser.parse_args(argv)
+    
+    mirrors = () if args.no_mirrors else tuple(args.mirrors or MIRRORS)
+    rate_limit = args.limit_rate * 1024 if args.limit_rate else None
+    trace_path = None if args.no_trace else args.trace or Path(args.minecraft_dir) / TRACE_FILE
+    
+    try:
+        with diagnostics(trace_path, args.profile):
+            store = None if args.no_store else ContentStore(args.store)
+            summary = PackSync(Path(args.minecraft_dir), args.pack_url, args.side, args.workers,
+                               store=store, mirrors=mirrors, per_host=args.per_host,
+                               rate_limit=rate_limit, lan=None if args.no_lan else args.lan,
+                               tier=None if args.no_tier else args.tier,
+                               lods=not args.no_lod).run(args.force, args.defer, args.stage)
+    except SyncError as e:
+        logger.error(f"Sync failed: {e}")
+        # Live files are only switched once everything is staged, so an installed pack is intact
+        installed = load_json(Path(args.minecraft_dir) / UPDATE_STATE_FILE, {}).get('index_hash')
+        return SYNC_EXIT_KEPT if installed else 1
+    
+    if not args.stage:
+        # The update scripts used to start PowerShell/python3 on every launch just to write these
+        state_path = Path(args.minecraft_dir) / UPDATE_STATE_FILE
+        state = load_json(state_path, {})
+        now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        state.setdefault('install_date', now)
+        state.update(first_launch=False, last_update=now)
+        save_json(state_path, state)
+    logger.info(f"Sync complete: {summary}")
+    return 0
+
+
+def rollback_main(argv: list[str]) -> int:
+    """Switch an instance back to an earlier pack version kept on disk"""
+    parser = argparse.ArgumentParser(prog=f'{SYNC_ENGINE_NAME} rollback',
+                                     description='Make an earlier pack generation live again (no downloads)')
+    parser.add_argument('minecraft_dir', nargs='?', default='.', help='Instance minecraft directory')
+    parser.add_argument('--to', default=None, metavar='GENERATION',
+                        help='Generation id to switch to (default: the one before the live one)')
+    parser.add_argument('--list', action='store_true', help='List the kept generations and exit')
+    parser.add_argument('--no-tier', action='store_true', help='Do not re-apply the hardware tier to configs')
+    args = parser.parse_args(argv)
+    
+    sync = PackSync(Path(args.minecraft_dir), tier=None if args.no_tier else 'auto')
+    if args.list:
+        for entry in sync.generation_list():
+            print(f"{'*' if entry['live'] else ' '} {entry['generation']}  {entry.get('pack_version') or '?':<12} "
+                  f"{entry.get('created', '')}")
+        return 0
+    try:
+        summary = sync.rollback(args.to)
+    except (SyncError, OSError) as e:
+        logger.error(f"Rollback failed: {e}")
+        return 1
+    logger.info(f"Rolled back to {summary['pack_version']} (generation {summary['generation']}); "
+                f"run a forced sync to return to the latest version")
+    return 0
+
+
+def serve_main(argv: list[str]) -> int:
+    """LAN cache for group installs"""
+    parser = argparse.ArgumentParser(prog=f'{SYNC_ENGINE_NAME} serve',
+                                     description='Share one download of the DHH pack with every install on this network')
+    parser.add_argument('--pack-url', default=PACK_URL, help='Upstream URL of pack.toml')
+    parser.add_argument('--port', type=int, default=LAN_PORT, help='HTTP port')
+    parser.add_argument('--bind', default='', help='Address to listen on (default: all)')
+    parser.add_argument('--cache-dir', type=Path, default=None,
+                        help='Where cached files are kept (default: per-user cache)')
+    parser.add_argument('--workers', type=int, default=SYNC_WORKERS, help='Parallel upstream downloads')
+    parser.add_argument('--no-prefetch', action='store_true',
+                        help='Only download files when a client first asks for them')
+    parser.add_argument('--no-discovery', action='store_true', help='Do not answer discovery broadcasts')
+    parser.add_argument('--no-mirrors', action='store_true', help='Only use the URLs from the metafiles')
+    args = parser.parse_args(argv)
+    
+    cache = LanCache(args.pack_url, args.cache_dir or user_cache_dir() / 'lan-cache', args.port, args.bind,
+                     args.workers, () if args.no_mirrors else MIRRORS, not args.no_prefetch)
+    try:
+        changed = cache.refresh(force=True)
+    except SyncError as e:
+        logger.error(str(e))
+        return 1
+    if not changed and cache.prefetch:
+        cache.warm()
+    
+    try:
+        cache.serve(discovery=not args.no_discovery)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        logger.error(f"Cannot listen on port {cache.port}: {e}")
+        return 1
+    return 0
+
+
+def load_provision_manifest(path: Path) -> list[dict]:
+    """Read a provisioning manifest: a JSON list of instances, or {"defaults": {...}, "instances": [...]}"""
+    data = load_json(path, None)
+    if data is None:
+        raise ValueError(f"Cannot read manifest {path}")
+    defaults = {}
+    if isinstance(data, dict):
+        defaults = data.get('defaults', {})
+        data = data.get('instances')
+    if not isinstance(data, list) or not all(isinstance(e, dict) for e in data):
+        raise ValueError("Manifest must contain a list of instance objects")
+    
+    entries = []
+    for i, entry in enumerate(data):
+        entry = {**defaults, **entry}
+        unknown = set(entry) - {'name', 'memory', 'min_memory', 'prism_root', 'tier'}
+        if unknown:
+            raise ValueError(f"Instance {i}: unknown keys {', '.join(sorted(unknown))}")
+        if entry.get('tier', 'auto') not in ('auto', 'off') + TIERS:
+            raise ValueError(f"Instance {i}: tier must be auto, off or one of {', '.join(TIERS)}")
+        if not entry.get('name'):
+            raise ValueError(f"Instance {i}: missing name")
+        entries.append(entry)
+    return entries
+
+
+def provision_instance(entry: dict, reuse_existing: bool = False, sync: bool = False,
+                       pack_url: str = PACK_URL, http: Optional[HttpClient] = None,
+                       store: Optional[ContentStore] = None) -> dict:
+    """Create and configure one instance; returns a JSON-serialisable result"""
+    started = time.monotonic()
+    result = {'name': entry['name'], 'ok': False, 'instance_path': None, 'error': None}
+    memory = {key: int(entry[key]) if entry.get(key) is not None else None for key in ('min_memory', 'memory')}
+    provisioner = InstanceProvisioner(entry['name'], memory['min_memory'], memory['memory'])
+    try:
+        if entry.get('prism_root'):
+            provisioner.use_prism_root(Path(entry['prism_root']).expanduser())
+        else:
+            provisioner.prism_instances_path = provisioner._get_instances_path()
+        
+        instance_path = provisioner.create_instance(reuse_existing)
+        if not instance_path:
+            raise RuntimeError("Could not create instance")
+        result['instance_path'] = str(instance_path)
+        
+        if not provisioner.copy_update_bat(instance_path):
+            raise RuntimeError("Could not copy update.bat")
+        provisioner.copy_sync_engine(instance_path)
+        if not provisioner.configure_instance(instance_path):
+            raise RuntimeError("Could not configure instance.cfg")
+        jvm = provisioner.jvm_profile()
+        result['jvm'] = {'min_memory': jvm.min_memory, 'max_memory': jvm.max_memory, 'gc': jvm.gc}
+        
+        if sync:
+            tier = entry.get('tier', 'auto')
+            result['sync'] = PackSync(instance_path / 'minecraft', pack_url, http=http, store=store,
+                                      lan='auto', tier=None if tier == 'off' else tier).run()
+        result['ok'] = True
+    except (OSError, RuntimeError, SyncError) as e:
+        logger.error(f"Provisioning {entry['name']} failed: {e}")
+        result['error'] = str(e)
+    
+    result['seconds'] = round(time.monotonic() - started, 3)
+    return result
+
+
+def provision_main(argv: list[str]) -> int:
+    """Create instances without the GUI, one JSON result line per instance"""
+    parser = argparse.ArgumentParser(prog='installer provision',
+                                     description='Create DHH instances in Prism Launcher without the GUI')
+    parser.add_argument('manifest', nargs='?', type=Path,
+                        help='JSON manifest of instances (name, memory, min_memory, prism_root)')
+    parser.add_argument('--name', help='Single instance name (instead of a manifest)')
+    parser.add_argument('--memory', type=int, help='Max memory in MB (default: sized from installed RAM)')
+    parser.add_argument('--prism-root', help='Prism data directory containing instances/ (default: detected)')
+    parser.add_argument('--tier', choices=('auto', 'off') + TIERS, default=None,
+                        help='Hardware tier applied with --sync (default: auto; off leaves configs as shipped)')
+    parser.add_argument('--reuse', action='store_true',
+                        help='Update instances that already exist instead of creating NAME-1, NAME-2, ...')
+    parser.add_argument('--sync', action='store_true',
+                        help='Also download the pack into each instance (shares one store and connection pool)')
+    parser.add_argument('--pack-url', default=PACK_URL, help='URL of pack.toml (with --sync)')
+    parser.add_argument('--output', default='-',
+                        help='Write results here instead of stdout (needed for the windowed .exe)')
+    parser.add_argument('--trace', type=Path, default=None, help='Write a JSON-lines span trace')
+    parser.add_argument('--profile', type=Path, default=None,
+                        help='Write a sampled folded-stack profile of all threads to this file')
+    args = parser.parse_args(argv)
+    
+    if (args.manifest is None) == (args.name is None):
+        parser.error('give either a manifest or --name')
+    try:
+        if args.manifest:
+            entries = load_provision_manifest(args.manifest)
+        else:
+            entries = [{k: v for k, v in (('name', args.name), ('memory', args.memory),
+                                          ('prism_root', args.prism_root), ('tier', args.tier)) if v is not None}]
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    
+    if args.output == '-' and sys.stdout is None:
+        logger.error("No console to write results to (windowed build); pass --output FILE")
+        return 2
+    
+    http = HttpClient() if args.sync else None
+    store = ContentStore() if args.sync else None
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    failed = 0
+    try:
+        with diagnostics(args.trace, args.profile):
+            for entry in entries:
+                with TRACE.span('provision', instance=entry['name']) as span:
+                    result = provision_instance(entry, args.reuse, args.sync, args.pack_url, http, store)
+                    span['ok'] = result['ok']
+                failed += not result['ok']
+                out.write(json.dumps(result) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    logger.info(f"Provisioned {len(entries) - failed}/{len(entries)} instances")
+    return 1 if failed else 0
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'sync':
+        setup_logging()
+        sys.exit(sync_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        setup_logging(log_file=None, level=logging.INFO)
+        sys.exit(rollback_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        setup_logging(log_file=None, level=logging.INFO)
+        sys.exit(serve_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'provision':
+        # stdout carries the results, so logs only go to stderr
+        setup_logging(log_file=None, level=logging.INFO)
+        sys.exit(provision_main(sys.argv[2:]))
+    
+    setup_logging()
+    try:
+        import_gui()
+    except ImportError:
+        # The dhh-sync build leaves tkinter out
+        logger.error(f"No GUI in this build; usage: {SYNC_ENGINE_NAME} sync|rollback|serve|provision ...")
+        sys.exit(2)
     root = tk.Tk()
     
     # Set app icon if available (optional)
@@ -728,7 +4102,9 @@ def main():
         pass
     
     app = InstallerApp(root)
-    root.mainloop()
+    # DHH_TRACE= (empty) disables the trace; DHH_PROFILE=FILE samples the GUI session
+    with diagnostics(os.getenv('DHH_TRACE', INSTALLER_TRACE_FILE), os.getenv('DHH_PROFILE')):
+        root.mainloop()
 
 
 if __name__ == '__main__':
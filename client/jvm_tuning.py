@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH JVM Tuning
+Heap size and GC flags for the pack on a given machine.
+
+Shared by the client installer (Prism instance settings) and
+server/deploy_modpack.py (user_jvm_args.txt), so both apply the same
+rules. On the server, copy it next to deploy_modpack.py.
+"""
+
+import os
+import re
+import sys
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Optional, Union
+
+MIN_MEMORY = 4096  # 4GB in MB, used when physical RAM cannot be detected
+MAX_MEMORY = 8192  # 8GB in MB, used when physical RAM cannot be detected
+MINECRAFT_JAVA = 21  # Minecraft 1.21.1 needs Java 21+, so Prism runs at least this
+ZGC_MIN_CORES = 8  # Generational ZGC needs spare cores for its concurrent threads
+ZGC_MIN_RAM = 24 * 1024  # ...and headroom beyond the heap (MB of physical RAM)
+# G1 set from docs/server-setup.md; pause target and region size are filled in by tune_jvm()
+G1_FLAGS = (
+    '-XX:+UseG1GC', '-XX:+ParallelRefProcEnabled', '-XX:MaxGCPauseMillis={pause}',
+    '-XX:+UnlockExperimentalVMOptions', '-XX:+DisableExplicitGC', '-XX:G1NewSizePercent=30',
+    '-XX:G1MaxNewSizePercent=40', '-XX:G1HeapRegionSize={region}M', '-XX:G1ReservePercent=20',
+    '-XX:G1HeapWastePercent=5', '-XX:G1MixedGCCountTarget=4', '-XX:InitiatingHeapOccupancyPercent=15',
+    '-XX:G1MixedGCLiveThresholdPercent=90', '-XX:G1RSetUpdatingPauseTimePercent=5', '-XX:SurvivorRatio=32',
+    '-XX:+PerfDisableSharedMem', '-XX:MaxTenuringThreshold=1',
+)
+
+
+def physical_memory_mb() -> Optional[int]:
+    """Installed RAM in MB, or None if it cannot be determined"""
+    if sys.platform == 'win32':
+        import ctypes
+        
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong)] + [
+                (name, ctypes.c_ulonglong) for name in ('ullTotalPhys', 'ullAvailPhys', 'ullTotalPageFile',
+                                                        'ullAvailPageFile', 'ullTotalVirtual', 'ullAvailVirtual',
+                                                        'ullAvailExtendedVirtual')]
+        
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys // 2 ** 20
+        return None
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2 ** 20
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def java_major_version(java: Union[Path, str] = 'java') -> Optional[int]:
+    """Feature version of a Java executable (8, 17, 21, ...), from `java -version`"""
+    import subprocess
+    try:
+        result = subprocess.run([str(java), '-version'], capture_output=True, text=True, timeout=10,
+                                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', result.stderr + result.stdout)
+    if not match:
+        return None
+    major = int(match.group(1))
+    return int(match.group(2) or 0) if major == 1 else major
+
+
+@dataclass
+class JvmProfile:
+    """Heap size and GC flags chosen for a machine"""
+    min_memory: int  # MB
+    max_memory: int  # MB
+    gc: str  # 'g1' or 'zgc'
+    args: list[str]
+    reason: str
+    
+    @property
+    def jvm_args(self) -> str:
+        return ' '.join(self.args)
+
+
+def tune_jvm(ram_mb: Optional[int], cores: Optional[int], java_major: Optional[int], server: bool = False,
+             min_memory: Optional[int] = None, max_memory: Optional[int] = None) -> JvmProfile:
+    """Pick heap size and GC for the pack on this hardware
+    
+    Shaders and Distant Horizons keep a lot outside the Java heap (GPU
+    driver, LOD buffers), so a client heap gets at most half the RAM and
+    leaves 4 GB to the rest; too large a heap also lengthens G1 pauses.
+    Generational ZGC is used where Java 21+, enough cores and RAM allow
+    it; otherwise the tuned G1 set. Servers pin -Xms to -Xmx and pre-touch.
+    Explicit memory values override the detected ones.
+    """
+    java = java_major if java_major and java_major >= MINECRAFT_JAVA else MINECRAFT_JAVA
+    cores = cores or 4
+    use_zgc = java >= 21 and cores >= ZGC_MIN_CORES and (ram_mb or 0) >= ZGC_MIN_RAM
+    
+    if max_memory is None:
+        if ram_mb is None:
+            max_memory = MAX_MEMORY
+        elif server:
+            max_memory = max(2048, min(min(ram_mb * 3 // 4, ram_mb - 2048), 16384))
+        else:
+            max_memory = max(3072, min(min(ram_mb // 2, ram_mb - 4096), 12288 if use_zgc else 10240))
+        max_memory -= max_memory % 512
+    if min_memory is None:
+        min_memory = max_memory if server else max(1024, max_memory // 2)
+    min_memory = min(min_memory, max_memory)
+    
+    if use_zgc:
+        args = ['-XX:+UseZGC']
+        if java < 23:  # Generational by default from Java 23
+            args.append('-XX:+ZGenerational')
+        args += ['-XX:+DisableExplicitGC', '-XX:+PerfDisableSharedMem']
+        reason = f"generational ZGC ({cores} cores, {ram_mb} MB RAM, Java {java})"
+    else:
+        args = [flag.format(pause=200 if server else 100, region=16 if max_memory >= 12288 else 8)
+                for flag in G1_FLAGS]
+        reason = f"G1 ({cores} cores, {ram_mb or 'unknown'} MB RAM, Java {java})"
+    if server:
+        args.append('-XX:+AlwaysPreTouch')
+    return JvmProfile(min_memory, max_memory, 'zgc' if use_zgc else 'g1', args, reason)
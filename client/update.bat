@@ -10,6 +10,10 @@ cd /d "%~dp0"
 :: State file for tracking updates
 set "STATE_FILE=update-state.json"
 
+:: Pack location (set DHH_PACK_URL to use a LAN cache, e.g. http://192.168.1.10:8780/pack.toml)
+set "PACK_URL=https://dhh.dobrovolskyi.xyz/pack.toml"
+if defined DHH_PACK_URL set "PACK_URL=%DHH_PACK_URL%"
+
 :: Determine Java executable
 if "%~1"=="" (
     set "JAVA_CMD=java"
@@ -45,7 +49,24 @@ if not exist "%STATE_FILE%" (
     echo Previous installation found
 )
 
-:: 1. Download bootstrapper if not present
+:: 1. Sync with the native engine if the installer placed it here (no JVM, parallel downloads)
+:: --defer: updates the server does not require download in the background while the game runs
+if exist "dhh-sync\dhh-sync.exe" (
+    echo Syncing pack with dhh-sync...
+    "dhh-sync\dhh-sync.exe" sync . --pack-url "%PACK_URL%" --defer && goto :synced
+    if errorlevel 75 if not errorlevel 76 goto :kept
+    echo dhh-sync failed - falling back to packwiz-installer
+)
+if exist "dhh-sync.py" (
+    where python >nul 2>nul && (
+        echo Syncing pack with dhh-sync...
+        python dhh-sync.py sync . --pack-url "%PACK_URL%" --defer && goto :synced
+        if errorlevel 75 if not errorlevel 76 goto :kept
+        echo dhh-sync failed - falling back to packwiz-installer
+    )
+)
+
+:: Download bootstrapper if not present (fallback only)
 if not exist "packwiz-installer-bootstrap.jar" (
     echo Downloading packwiz-installer-bootstrap...
     powershell -Command "[Net.ServicePointManager]::SecurityProtocol = [Net.SecurityProtocolType]::Tls12; Invoke-WebRequest -Uri 'https://github.com/packwiz/packwiz-installer-bootstrap/releases/latest/download/packwiz-installer-bootstrap.jar' -OutFile 'packwiz-installer-bootstrap.jar'"
@@ -55,7 +76,7 @@ if not exist "packwiz-installer-bootstrap.jar" (
 :: Currently no custom mods configured
 
 :: 3. Run the installer
-"%JAVA_CMD%" -jar packwiz-installer-bootstrap.jar https://dhh.dobrovolskyi.xyz/pack.toml
+"%JAVA_CMD%" -jar packwiz-installer-bootstrap.jar "%PACK_URL%"
 
 :: Check for errors
 if %errorlevel% neq 0 (
@@ -68,7 +89,17 @@ if %errorlevel% neq 0 (
     exit /b %errorlevel%
 )
 
-:: Update state file with last update time
+:: Update state file with last update time (dhh-sync records it itself)
 powershell -Command "$sf='%STATE_FILE%'; if (Test-Path $sf) { $s=Get-Content $sf|ConvertFrom-Json } else { $s=@{first_launch=$false;install_date=(Get-Date -Format 'yyyy-MM-ddTHH:mm:ss')+'Z'} }; $s.first_launch=$false; $s.last_update=(Get-Date -Format 'yyyy-MM-ddTHH:mm:ss')+'Z'; $s|ConvertTo-Json|Out-File -FilePath $sf -Encoding UTF8"
 
-echo Update complete!
\ No newline at end of file
+echo Update complete!
+exit /b 0
+
+:synced
+echo Update complete!
+exit /b 0
+
+:kept
+:: dhh-sync stages updates, so after a failed one the previous pack version is still complete
+echo Update failed - launching the previous pack version
+exit /b 0
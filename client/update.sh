@@ -10,6 +10,9 @@ cd "$(dirname "$0")"
 # State file for tracking updates
 STATE_FILE="update-state.json"
 
+# Pack location (set DHH_PACK_URL to use a LAN cache, e.g. http://192.168.1.10:8780/pack.toml)
+PACK_URL="${DHH_PACK_URL:-https://dhh.dobrovolskyi.xyz/pack.toml}"
+
 # Determine Java executable
 if [ -n "$1" ]; then
     JAVA_CMD="$1"
@@ -93,8 +96,26 @@ if [ "$FIRST_LAUNCH" = true ]; then
     fi
 fi
 
-# 1. Download bootstrapper if not present
-if [ ! -f "packwiz-installer-bootstrap.jar" ]; then
+# 1. Sync with the native engine if the installer placed it here (no JVM, parallel downloads).
+#    --defer: updates the server does not require download in the background while the game runs.
+SYNC_OK=false
+if [ -f "dhh-sync.py" ] && command -v python3 &> /dev/null; then
+    echo "Syncing pack with dhh-sync..."
+    SYNC_EXIT_CODE=0
+    python3 dhh-sync.py sync . --pack-url "$PACK_URL" --defer || SYNC_EXIT_CODE=$?
+    if [ $SYNC_EXIT_CODE -eq 0 ]; then
+        SYNC_OK=true
+    elif [ $SYNC_EXIT_CODE -eq 75 ]; then
+        # dhh-sync stages updates, so after a failed one the previous pack version is still complete
+        echo "Update failed - launching the previous pack version"
+        exit 0
+    else
+        echo "dhh-sync failed - falling back to packwiz-installer"
+    fi
+fi
+
+# Download bootstrapper if not present (fallback only)
+if [ "$SYNC_OK" = false ] && [ ! -f "packwiz-installer-bootstrap.jar" ]; then
     echo "Downloading packwiz-installer-bootstrap..."
     curl -LO https://github.com/packwiz/packwiz-installer-bootstrap/releases/latest/download/packwiz-installer-bootstrap.jar
 fi
@@ -116,11 +137,17 @@ if [ -d "mods" ]; then
     done
 fi
 
-# 3. Run the installer
-"$JAVA_CMD" -jar packwiz-installer-bootstrap.jar https://dhh.dobrovolskyi.xyz/pack.toml
+# 3. Run packwiz-installer unless dhh-sync already brought the pack up to date
+UPDATE_EXIT_CODE=0
+if [ "$SYNC_OK" = false ]; then
+    "$JAVA_CMD" -jar packwiz-installer-bootstrap.jar "$PACK_URL" || UPDATE_EXIT_CODE=$?
+fi
 
-# Update state file with last update time
-UPDATE_EXIT_CODE=$?
+# Update state file with last update time (dhh-sync records it itself)
+if [ "$SYNC_OK" = true ]; then
+    echo "Update complete!"
+    exit 0
+fi
 if [ $UPDATE_EXIT_CODE -eq 0 ]; then
     echo "Updating state file..."
     if command -v python3 &> /dev/null; then
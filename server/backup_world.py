@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH World Backup
+Incremental, deduplicated backups of the world directory.
+
+Region files are not copied whole. The header of every .mca is compared
+with the one recorded in the previous snapshot, and only chunks whose
+location or save time changed are read. Other files (level.dat, playerdata,
+the Distant Horizons database, ...) are split into 4 MiB blocks, which are
+skipped if size and mtime are unchanged. Chunks and blocks are stored once,
+keyed by SHA-256, in append-only pack files; blocks are compressed on all
+cores. A snapshot is a list of paths and references in catalog.sqlite, so
+restoring any snapshot is a full restore and pruning old ones frees only
+data no remaining snapshot uses.
+
+    python3 backup_world.py backup --world world --repo backups/world --prune
+    python3 backup_world.py list --repo backups/world
+    python3 backup_world.py restore --repo backups/world --snapshot latest --to world-restored
+    python3 backup_world.py prune --repo backups/world --keep-daily 7 --keep-weekly 4
+
+The server may keep running if saving is paused for the duration
+(save-off, save-all flush ... save-on); --rcon does that itself. Copy
+region.py next to this script.
+"""
+
+import os
+import sys
+import zlib
+import time
+import socket
+import struct
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+from typing import Optional
+from fnmatch import fnmatch
+from datetime import datetime
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from region import EXTERNAL, HEADER_SIZE, REGION_DIRS, RegionError, RegionWriter, Slot, \
+    human, is_region, read_chunks, read_header
+
+WORKERS = min(8, os.cpu_count() or 4)
+BLOCK_SIZE = 4 * 1024 * 1024
+CATALOG = 'catalog.sqlite'
+PACKS_DIR = 'packs'
+LOCK_FILE = 'lock'
+SKIP_FILES = ('session.lock',)  # Held open by the server; content is meaningless
+RETRIES = 3  # Re-reads of a region whose header changed while it was read
+REPACK_RATIO = 0.5  # Rewrite a pack once less than this share of it is still referenced
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+MC_COMPRESSED = (1, 2, 4)  # gzip, zlib, lz4 chunk payloads are stored as they are
+SLOT = struct.Struct('>IBI32s')  # offset, sectors, timestamp, digest of one region slot
+DIGEST_SIZE = 32
+NO_DIGEST = bytes(DIGEST_SIZE)
+RCON_TIMEOUT = 120  # save-all flush on a large world takes a while
+RCON_AUTH, RCON_COMMAND = 3, 2
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS objects (
+    hash BLOB PRIMARY KEY, pack TEXT NOT NULL, offset INTEGER NOT NULL,
+    length INTEGER NOT NULL, codec TEXT NOT NULL, size INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS maps (hash BLOB PRIMARY KEY, data BLOB NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS packs (name TEXT PRIMARY KEY, size INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY, created REAL NOT NULL, label TEXT, files INTEGER, bytes INTEGER,
+    stored INTEGER, seconds REAL);
+CREATE TABLE IF NOT EXISTS entries (
+    snapshot INTEGER NOT NULL, path TEXT NOT NULL, kind TEXT NOT NULL, map BLOB NOT NULL,
+    size INTEGER NOT NULL, mtime INTEGER NOT NULL, PRIMARY KEY (snapshot, path)) WITHOUT ROWID;
+'''
+
+
+class BackupError(Exception):
+    """Raised when a backup, restore or prune cannot complete"""
+
+
+def log(message: str):
+    """Real-time progress output (cron mails it, loop.sh shows it)"""
+    print(message, flush=True)
+
+
+def compress(data: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        packed, codec = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), 'zstd'
+    else:
+        packed, codec = zlib.compress(data, ZLIB_LEVEL), 'zlib'
+    return (codec, packed) if len(packed) < len(data) else ('raw', data)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == 'raw':
+        return data
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise BackupError('Objects are zstd-compressed; install the zstandard module')
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise BackupError(f"Unknown codec {codec}")
+
+
+def encode_region(slots: list[Slot], digests: list[bytes]) -> bytes:
+    return b''.join(SLOT.pack(s.offset, s.sectors, s.timestamp, d) for s, d in zip(slots, digests))
+
+
+def decode_region(data: bytes) -> list[tuple[Slot, bytes]]:
+    return [(Slot(offset, sectors, ts), digest) for offset, sectors, ts, digest in SLOT.iter_unpack(data)]
+
+
+def decode_blocks(data: bytes) -> list[bytes]:
+    return [data[i:i + DIGEST_SIZE] for i in range(0, len(data), DIGEST_SIZE)]
+
+
+class PackWriter:
+    """Appends new objects to one pack file; shared by all workers of a run"""
+
+    def __init__(self, path: Path, known: set):
+        self.path = path
+        self.f = open(path, 'xb')  # Never clobber a pack another run wrote
+        self.known = known
+        self.rows = []
+        self.size = 0
+        self._lock = threading.Lock()
+
+    def store(self, data: bytes, precompressed: bool = False) -> tuple[bytes, int]:
+        """(digest, bytes written) of data; compresses outside the lock, skips known objects"""
+        digest = hashlib.sha256(data).digest()
+        if digest in self.known:
+            return digest, 0
+        codec, packed = ('raw', data) if precompressed else compress(data)
+        with self._lock:
+            if digest in self.known:
+                return digest, 0
+            self.rows.append((digest, self.path.name, self.write(packed), len(packed), codec, len(data)))
+            self.known.add(digest)
+        return digest, len(packed)
+
+    def write(self, packed: bytes) -> int:
+        """Append stored bytes as they are; returns their offset"""
+        offset = self.size
+        self.f.write(packed)
+        self.size += len(packed)
+        return offset
+
+    def close(self) -> bool:
+        """Flush to disk; an empty pack is removed. Returns whether the pack was kept"""
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        if not self.size:
+            self.path.unlink(missing_ok=True)
+        return self.size > 0
+
+
+class ObjectReader:
+    """Reads and checks objects; keeps the pack files it touched open"""
+
+    def __init__(self, packs_dir: Path, locations: dict):
+        self.packs_dir = packs_dir
+        self.locations = locations
+        self.files = {}
+
+    def read(self, digest: bytes) -> bytes:
+        try:
+            pack, offset, length, codec = self.locations[digest]
+        except KeyError:
+            raise BackupError(f"Object {digest.hex()[:16]} is missing from the catalog") from None
+        f = self.files.get(pack)
+        if f is None:
+            f = self.files[pack] = open(self.packs_dir / pack, 'rb')
+        f.seek(offset)
+        data = decompress(codec, f.read(length))
+        if hashlib.sha256(data).digest() != digest:
+            raise BackupError(f"Object {digest.hex()[:16]} in {pack} is corrupt")
+        return data
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+class Repository:
+    """Pack files plus the catalog that says which snapshot needs which object"""
+
+    def __init__(self, root: Path, create: bool = False):
+        self.root = root
+        self.packs_dir = root / PACKS_DIR
+        if not create and not (root / CATALOG).exists():
+            raise BackupError(f"No backup repository at {root}")
+        self.packs_dir.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(root / CATALOG)
+        self.db.executescript(SCHEMA)
+
+    @contextmanager
+    def lock(self):
+        """One writer per repository; a lock left by a dead process is taken over"""
+        path = self.root / LOCK_FILE
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    pid = int(path.read_text())
+                    if os.name == 'posix':
+                        os.kill(pid, 0)
+                except (ValueError, OSError):
+                    path.unlink(missing_ok=True)
+                    continue
+                raise BackupError(f"Another backup or prune is running (pid {pid}); "
+                                  f"remove {path} if it is not") from None
+        else:
+            raise BackupError(f"Cannot take {path}")
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            self._remove_orphans()
+            yield
+        finally:
+            path.unlink(missing_ok=True)
+
+    def _remove_orphans(self):
+        """Packs an interrupted run wrote but never recorded"""
+        known = {name for name, in self.db.execute('SELECT name FROM packs')}
+        for path in self.packs_dir.glob('*.pack'):
+            if path.name not in known:
+                log(f"🧹 Removing unrecorded pack {path.name}")
+                path.unlink()
+
+    def new_pack(self, known: set) -> PackWriter:
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.urandom(4).hex()}.pack"
+        return PackWriter(self.packs_dir / name, known)
+
+    def snapshots(self) -> list[tuple]:
+        """(id, created, label, files, bytes, stored, seconds), newest first"""
+        return self.db.execute('SELECT id, created, label, files, bytes, stored, seconds FROM snapshots '
+                               'ORDER BY id DESC').fetchall()
+
+    def resolve(self, spec: str) -> tuple:
+        """A snapshot by id, 'latest', or the newest taken at or before an ISO date/time"""
+        snapshots = self.snapshots()
+        if not snapshots:
+            raise BackupError('The repository has no snapshots')
+        if spec == 'latest':
+            return snapshots[0]
+        if spec.isdigit():
+            for snapshot in snapshots:
+                if snapshot[0] == int(spec):
+                    return snapshot
+            raise BackupError(f"No snapshot {spec}")
+        try:
+            at = datetime.fromisoformat(spec).timestamp()
+        except ValueError:
+            raise BackupError(f"Not a snapshot id, 'latest' or a date: {spec}") from None
+        for snapshot in snapshots:
+            if snapshot[1] <= at:
+                return snapshot
+        raise BackupError(f"No snapshot at or before {spec}")
+
+    def entries(self, snapshot_id: int) -> dict[str, tuple]:
+        """{path: (kind, map hash, size, mtime)}"""
+        rows = self.db.execute('SELECT path, kind, map, size, mtime FROM entries WHERE snapshot = ?', (snapshot_id,))
+        return {path: rest for path, *rest in rows}
+
+    def load_map(self, digest: bytes) -> bytes:
+        row = self.db.execute('SELECT data FROM maps WHERE hash = ?', (digest,)).fetchone()
+        if row is None:
+            raise BackupError(f"Map {digest.hex()[:16]} is missing from the catalog")
+        return zlib.decompress(row[0])
+
+    def locations(self) -> dict[bytes, tuple]:
+        return {digest: rest for digest, *rest in self.db.execute(
+            'SELECT hash, pack, offset, length, codec FROM objects')}
+
+
+def bounded(pool: ThreadPoolExecutor, fn, items, limit: int):
+    """pool.map that keeps at most `limit` tasks in flight, in order"""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, *item))
+        if len(pending) >= limit:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def world_files(world: Path) -> list[str]:
+    files = []
+    for dirpath, dirnames, filenames in os.walk(world):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name not in SKIP_FILES:
+                files.append((Path(dirpath) / name).relative_to(world).as_posix())
+    return files
+
+
+def scan_file(path: Path, previous, writer: PackWriter) -> tuple:
+    """(kind, map, size, mtime, stored bytes, changed units) of a plain file"""
+    stat = path.stat()
+    if previous and previous['kind'] == 'file' and previous['size'] == stat.st_size \
+            and previous['mtime'] == stat.st_mtime_ns:
+        return 'file', previous['data'], stat.st_size, stat.st_mtime_ns, 0, 0
+    digests, stored, changed = [], 0, 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+            digest, written = writer.store(block)
+            digests.append(digest)
+            stored += written
+            changed += written > 0
+    return 'file', b''.join(digests), stat.st_size, stat.st_mtime_ns, stored, changed
+
+
+def scan_region(path: Path, previous, writer: PackWriter) -> tuple:
+    """(kind, map, size, mtime, stored bytes, changed chunks) of a region file"""
+    known = decode_region(previous['data']) if previous and previous['kind'] == 'region' else None
+    # A save in the middle of the read shows up as a changed header or a torn chunk
+    for attempt in range(RETRIES):
+        stat = path.stat()
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(HEADER_SIZE)
+                slots = read_header(header)
+                changed = [i for i, slot in enumerate(slots)
+                           if slot.offset and (known is None or known[i][0] != slot)]
+                payloads = dict(read_chunks(f, slots, changed))
+                f.seek(0)
+                if f.read(HEADER_SIZE) == header:
+                    break
+            error = RegionError('the header kept changing while it was read (is saving paused?)')
+        except RegionError as e:
+            error = e
+        if attempt + 1 == RETRIES:
+            raise error
+
+    digests, stored = [], 0
+    for index, slot in enumerate(slots):
+        if not slot.offset:
+            digests.append(NO_DIGEST)
+        elif index in payloads:
+            payload = payloads[index]
+            kind = payload[0]
+            digest, written = writer.store(payload, precompressed=bool(kind & EXTERNAL) or kind in MC_COMPRESSED)
+            digests.append(digest)
+            stored += written
+        else:
+            digests.append(known[index][1])
+    return 'region', encode_region(slots, digests), stat.st_size, stat.st_mtime_ns, stored, len(changed)
+
+
+def backup(world: Path, repo_dir: Path, workers: int, label: Optional[str]) -> int:
+    if not (world / 'level.dat').is_file():
+        raise BackupError(f"{world} is not a world directory (no level.dat)")
+    repo = Repository(repo_dir, create=True)
+    with repo.lock():
+        snapshots = repo.snapshots()
+        previous = repo.entries(snapshots[0][0]) if snapshots else {}
+        known = {digest for digest, in repo.db.execute('SELECT hash FROM objects')}
+        files = world_files(world)
+        mode = f"incremental on #{snapshots[0][0]}" if snapshots else 'full'
+        log(f"💾 Backing up {len(files)} files of {world} ({mode}, {workers} workers, "
+            f"{'zstd' if zstandard else 'zlib'})")
+
+        started = time.monotonic()
+        writer = repo.new_pack(known)
+
+        def tasks():
+            for rel_path in files:
+                old = previous.get(rel_path)
+                info = {'kind': old[0], 'size': old[2], 'mtime': old[3], 'data': repo.load_map(old[1])} if old else None
+                yield rel_path, info
+
+        def scan(rel_path, old):
+            path = world / rel_path
+            try:
+                # The game leaves empty region files behind; those are stored as they are
+                if is_region(path) and path.parent.name in REGION_DIRS and path.stat().st_size >= HEADER_SIZE:
+                    try:
+                        return rel_path, scan_region(path, old, writer)
+                    except RegionError as e:
+                        log(f"⚠️  {rel_path}: {e}; storing it as a plain file")
+                return rel_path, scan_file(path, old, writer)
+            except FileNotFoundError:
+                log(f"⚠️  {rel_path} disappeared during the backup")
+                return rel_path, None
+
+        results = []
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for rel_path, result in bounded(pool, scan, tasks(), workers * 2):
+                    if result is not None:
+                        results.append((rel_path, result))
+        finally:
+            kept = writer.close()
+
+        total = sum(r[2] for _, r in results)
+        stored = sum(r[4] for _, r in results)
+        chunks = sum(r[5] for _, r in results if r[0] == 'region')
+        seconds = time.monotonic() - started
+        with repo.db:
+            if kept:
+                repo.db.executemany('INSERT OR IGNORE INTO objects VALUES (?, ?, ?, ?, ?, ?)', writer.rows)
+                repo.db.execute('INSERT INTO packs VALUES (?, ?)', (writer.path.name, writer.size))
+            snapshot_id = repo.db.execute(
+                'INSERT INTO snapshots (created, label, files, bytes, stored, seconds) VALUES (?, ?, ?, ?, ?, ?)',
+                (time.time(), label, len(results), total, stored, round(seconds, 2))).lastrowid
+            for rel_path, (kind, data, size, mtime, _, _) in results:
+                digest = hashlib.sha256(data).digest()
+                repo.db.execute('INSERT OR IGNORE INTO maps VALUES (?, ?)', (digest, zlib.compress(data)))
+                repo.db.execute('INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                                (snapshot_id, rel_path, kind, digest, size, mtime))
+
+    regions = sum(1 for _, r in results if r[0] == 'region')
+    log(f"✅ Snapshot #{snapshot_id}: {len(results)} files ({regions} regions, {chunks} chunks changed), "
+        f"{human(total)}, {human(stored)} new in {seconds:.1f}s")
+    return snapshot_id
+
+
+def restore(repo_dir: Path, spec: str, target: Path, patterns: list[str], workers: int, force: bool) -> int:
+    repo = Repository(repo_dir)
+    snapshot = repo.resolve(spec)
+    entries = {path: entry for path, entry in repo.entries(snapshot[0]).items()
+               if not patterns or any(fnmatch(path, p) for p in patterns)}
+    if not entries:
+        raise BackupError(f"Nothing in snapshot #{snapshot[0]} matches {' '.join(patterns)}")
+    if target.exists() and any(target.iterdir()) and not force:
+        raise BackupError(f"{target} is not empty (pass --force to overwrite matching files)")
+    created = datetime.fromtimestamp(snapshot[1]).strftime('%Y-%m-%d %H:%M')
+    log(f"♻️  Restoring {len(entries)} files of snapshot #{snapshot[0]} ({created}) to {target}")
+    locations = repo.locations()
+    maps = {path: repo.load_map(entry[1]) for path, entry in entries.items()}
+
+    def write(rel_path):
+        kind, _, size, mtime = entries[rel_path]
+        dest = target / rel_path
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + '.restoring')
+        reader = ObjectReader(repo.packs_dir, locations)
+        try:
+            with open(tmp, 'wb') as f:
+                if kind == 'region':
+                    region = RegionWriter(f)
+                    for index, (slot, digest) in enumerate(decode_region(maps[rel_path])):
+                        if slot.offset:
+                            region.add(index, slot.timestamp, reader.read(digest))
+                    region.close()
+                else:
+                    for digest in decode_blocks(maps[rel_path]):
+                        f.write(reader.read(digest))
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        finally:
+            reader.close()
+        os.replace(tmp, dest)
+        os.utime(dest, ns=(mtime, mtime))
+        return size
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        total = sum(pool.map(write, sorted(entries)))
+    log(f"✅ Restored {human(total)} in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+def select_keep(snapshots: list[tuple], keep_last: int, keep_daily: int, keep_weekly: int) -> set[int]:
+    """Ids to keep: the newest keep_last, plus the newest of each of the last N days and weeks"""
+    keep = {s[0] for s in snapshots[:max(1, keep_last)]}
+    for fmt, count in (('%Y-%m-%d', keep_daily), ('%G-W%V', keep_weekly)):
+        buckets = set()
+        for snapshot in snapshots:
+            bucket = time.strftime(fmt, time.localtime(snapshot[1]))
+            if bucket in buckets:
+                continue
+            if len(buckets) >= count:
+                break
+            buckets.add(bucket)
+            keep.add(snapshot[0])
+    return keep
+
+
+def prune(repo_dir: Path, keep_last: int, keep_daily: int, keep_weekly: int, dry_run: bool) -> int:
+    repo = Repository(repo_dir)
+    with repo.lock():
+        snapshots = repo.snapshots()
+        keep = select_keep(snapshots, keep_last, keep_daily, keep_weekly)
+        doomed = [s for s in snapshots if s[0] not in keep]
+        for snapshot in doomed:
+            created = datetime.fromtimestamp(snapshot[1]).strftime('%Y-%m-%d %H:%M')
+            log(f"🗑️  {'Would remove' if dry_run else 'Removing'} snapshot #{snapshot[0]} ({created})")
+        if dry_run:
+            log(f"✅ {len(keep)} snapshots kept, {len(doomed)} to remove")
+            return 0
+
+        with repo.db:
+            repo.db.executemany('DELETE FROM snapshots WHERE id = ?', [(s[0],) for s in doomed])
+            repo.db.executemany('DELETE FROM entries WHERE snapshot = ?', [(s[0],) for s in doomed])
+
+        # Everything the remaining snapshots reference, through their maps
+        live = set()
+        used_maps = set()
+        for kind, digest in repo.db.execute('SELECT DISTINCT kind, map FROM entries'):
+            if digest in used_maps:
+                continue
+            used_maps.add(digest)
+            data = repo.load_map(digest)
+            if kind == 'region':
+                live.update(d for slot, d in decode_region(data) if slot.offset)
+            else:
+                live.update(decode_blocks(data))
+
+        objects = repo.db.execute('SELECT hash, pack, offset, length, codec, size FROM objects').fetchall()
+        packs = dict(repo.db.execute('SELECT name, size FROM packs'))
+        live_bytes = dict.fromkeys(packs, 0)
+        for digest, pack, _, length, _, _ in objects:
+            if digest in live:
+                live_bytes[pack] += length
+        empty = [name for name, used in live_bytes.items() if not used]
+        sparse = [name for name, used in live_bytes.items() if used and used < packs[name] * REPACK_RATIO]
+
+        # Sparse packs: copy their live objects into a new pack, then drop the old ones
+        writer = repo.new_pack(set())
+        moved = []
+        try:
+            for name in sparse:
+                with open(repo.packs_dir / name, 'rb') as f:
+                    for digest, pack, offset, length, codec, size in objects:
+                        if pack == name and digest in live:
+                            f.seek(offset)
+                            moved.append((writer.path.name, writer.write(f.read(length)), digest))
+        finally:
+            kept = writer.close()
+
+        with repo.db:
+            repo.db.executemany('DELETE FROM maps WHERE hash = ?',
+                                [(d,) for d, in repo.db.execute('SELECT hash FROM maps') if d not in used_maps])
+            repo.db.executemany('DELETE FROM objects WHERE hash = ?', [(o[0],) for o in objects if o[0] not in live])
+            repo.db.executemany('UPDATE objects SET pack = ?, offset = ? WHERE hash = ?', moved)
+            if kept:
+                repo.db.execute('INSERT INTO packs VALUES (?, ?)', (writer.path.name, writer.size))
+            repo.db.executemany('DELETE FROM packs WHERE name = ?', [(n,) for n in empty + sparse])
+        for name in empty + sparse:
+            (repo.packs_dir / name).unlink(missing_ok=True)
+        repo.db.execute('VACUUM')
+
+        freed = sum(packs[n] for n in empty + sparse) - (writer.size if kept else 0)
+        log(f"✅ {len(keep)} snapshots kept, {len(doomed)} removed; {len(empty)} packs deleted, "
+            f"{len(sparse)} repacked, {human(freed)} freed")
+    return 0
+
+
+def verify(repo_dir: Path, workers: int) -> int:
+    """Read back every object and compare it with its hash"""
+    repo = Repository(repo_dir)
+    locations = repo.locations()
+    by_pack = {}
+    for digest, (pack, offset, _, _) in locations.items():
+        by_pack.setdefault(pack, []).append((offset, digest))
+
+    def check(pack):
+        reader = ObjectReader(repo.packs_dir, locations)
+        bad = []
+        try:
+            for _, digest in sorted(by_pack[pack]):
+                try:
+                    reader.read(digest)
+                except (BackupError, OSError, zlib.error) as e:
+                    bad.append(f"{pack}: {e}")
+        finally:
+            reader.close()
+        return bad
+
+    log(f"🔎 Verifying {len(locations)} objects in {len(by_pack)} packs")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        problems = [p for bad in pool.map(check, sorted(by_pack)) for p in bad]
+    for problem in problems[:20]:
+        log(f"❌ {problem}")
+    log(f"{'❌' if problems else '✅'} {len(locations) - len(problems)}/{len(locations)} objects intact")
+    return 1 if problems else 0
+
+
+def list_snapshots(repo_dir: Path) -> int:
+    repo = Repository(repo_dir)
+    for snapshot_id, created, label, files, total, stored, seconds in repo.snapshots():
+        when = datetime.fromtimestamp(created).strftime('%Y-%m-%d %H:%M')
+        log(f"#{snapshot_id:<5} {when}  {files:>6} files  {human(total):>9}  +{human(stored):>9}  "
+            f"{seconds:>6.1f}s  {label or ''}")
+    packs = sum(size for size, in repo.db.execute('SELECT size FROM packs'))
+    log(f"📦 {human(packs)} in {repo.packs_dir}")
+    return 0
+
+
+class Rcon:
+    """Minimal RCON client, enough to pause and resume saving"""
+
+    def __init__(self, address: str, password: str):
+        host, _, port = address.rpartition(':')
+        self.sock = socket.create_connection((host or 'localhost', int(port or 25575)), timeout=RCON_TIMEOUT)
+        self.request_id = 0
+        if self._send(RCON_AUTH, password)[0] == -1:
+            raise BackupError('RCON authentication failed (check rcon.password)')
+
+    def _send(self, kind: int, body: str) -> tuple[int, str]:
+        self.request_id += 1
+        payload = struct.pack('<ii', self.request_id, kind) + body.encode('utf-8') + b'\0\0'
+        self.sock.sendall(struct.pack('<i', len(payload)) + payload)
+        length, = struct.unpack('<i', self._read(4))
+        data = self._read(length)
+        response_id, = struct.unpack_from('<i', data)
+        return response_id, data[8:-2].decode('utf-8', 'replace')
+
+    def _read(self, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise BackupError('RCON connection closed')
+            data += chunk
+        return data
+
+    def command(self, command: str) -> str:
+        return self._send(RCON_COMMAND, command)[1]
+
+    def close(self):
+        self.sock.close()
+
+
+@contextmanager
+def saving_paused(address: Optional[str]):
+    """save-off and a flushed save-all for the duration, if an RCON address is given"""
+    if not address:
+        yield
+        return
+    password = os.environ.get('RCON_PASSWORD', '')
+    try:
+        rcon = Rcon(address, password)
+    except OSError as e:
+        raise BackupError(f"Cannot reach RCON at {address}: {e}") from e
+    try:
+        rcon.command('save-off')
+        log(f"⏸️  save-off; {rcon.command('save-all flush').strip() or 'save-all flush'}")
+        yield
+    finally:
+        try:
+            rcon.command('save-on')
+            log('▶️  save-on')
+        except (OSError, BackupError) as e:
+            log(f"⚠️  Could not re-enable saving, run save-on in the console: {e}")
+        rcon.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Incremental, deduplicated world backups')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('backup', help='Take a snapshot of the world')
+    run.add_argument('--world', type=Path, default=Path('world'), help='World directory (contains level.dat)')
+    run.add_argument('--label', default=None, help='Note stored with the snapshot')
+    run.add_argument('--rcon', default=None, metavar='HOST:PORT',
+                     help='Pause saving through RCON while backing up (password in $RCON_PASSWORD)')
+    run.add_argument('--prune', action='store_true', help='Apply the retention policy afterwards')
+
+    restore_cmd = commands.add_parser('restore', help='Write a snapshot to a directory')
+    restore_cmd.add_argument('--snapshot', default='latest', help="Id, 'latest', or a date/time like 2026-10-01T04:00")
+    restore_cmd.add_argument('--to', type=Path, required=True, help='Target directory (stop the server first)')
+    restore_cmd.add_argument('--only', nargs='*', default=[], metavar='GLOB',
+                             help='Restore only matching paths, e.g. region/r.0.0.mca "playerdata/*"')
+    restore_cmd.add_argument('--force', action='store_true', help='Write into a non-empty directory')
+
+    prune_cmd = commands.add_parser('prune', help='Apply the retention policy and free unused data')
+    prune_cmd.add_argument('--dry-run', action='store_true', help='Only show which snapshots would go')
+    commands.add_parser('list', help='Show snapshots')
+    commands.add_parser('verify', help='Read back every stored object and check its hash')
+
+    for sub in commands.choices.values():
+        sub.add_argument('--repo', type=Path, default=Path('backups/world'), help='Backup repository directory')
+        sub.add_argument('--workers', type=int, default=WORKERS, help='Parallel readers/compressors')
+    for sub in (run, prune_cmd):
+        sub.add_argument('--keep-last', type=int, default=1, help='Newest snapshots always kept')
+        sub.add_argument('--keep-daily', type=int, default=7, help='Days to keep one snapshot of')
+        sub.add_argument('--keep-weekly', type=int, default=4, help='Weeks to keep one snapshot of')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'backup':
+            with saving_paused(args.rcon):
+                backup(args.world, args.repo, args.workers, args.label)
+            if args.prune:
+                return prune(args.repo, args.keep_last, args.keep_daily, args.keep_weekly, False)
+            return 0
+        if args.command == 'restore':
+            return restore(args.repo, args.snapshot, args.to, args.only, args.workers, args.force)
+        if args.command == 'prune':
+            return prune(args.repo, args.keep_last, args.keep_daily, args.keep_weekly, args.dry_run)
+        if args.command == 'verify':
+            return verify(args.repo, args.workers)
+        return list_snapshots(args.repo)
+    except (BackupError, OSError, sqlite3.Error) as e:
+        log(f"❌ {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
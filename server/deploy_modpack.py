@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH Modpack Server Deployer
+Installs the server-side mods of the packwiz pack before loop.sh starts NeoForge.
+
+Mods with side = "client" are skipped. Everything else is staged in a
+separate directory (unchanged jars are hardlinked, new ones downloaded
+in parallel) and then swapped with mods/ in one rename, so a crash can
+never leave a half-populated mods/ behind.
+"""
+
+import os
+import sys
+import ctypes
+import shutil
+import json
+import hashlib
+import argparse
+import urllib.request
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urljoin, quote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+# Shared with the client installer; copy client/jvm_tuning.py next to this script
+try:
+    from jvm_tuning import java_major_version, physical_memory_mb, tune_jvm
+except ImportError:
+    sys.path.append(str(Path(__file__).resolve().parent.parent / 'client'))  # Run from a repo checkout
+    from jvm_tuning import java_major_version, physical_memory_mb, tune_jvm
+
+PACK_URL = "https://dhh.dobrovolskyi.xyz/pack.toml"
+WORKERS = 8
+TIMEOUT = 30
+CHUNK_SIZE = 1024 * 1024
+USER_AGENT = "DHH-Server-Deployer"
+MANIFEST_NAME = "manifest-server.json"  # Compiled by tools/compile_manifest.py
+MANIFEST_FORMAT = 1
+SNAPSHOT_DIR = "v/{id}/"  # Immutable copies written by tools/publish.py
+JVM_ARGS_FILE = "user_jvm_args.txt"  # Read by NeoForge's run.sh
+JVM_ARGS_HEADER = "# Managed by deploy_modpack.py - remove this line to keep your own flags"
+
+
+class DeployError(Exception):
+    """Raised when the deploy cannot complete"""
+
+
+def log(message: str):
+    """Real-time progress output (loop.sh pipes this to the console)"""
+    print(message, flush=True)
+
+
+def fetch(url: str) -> bytes:
+    """Download a small file fully into memory"""
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    try:
+        with urllib.request.urlopen(request, timeout=TIMEOUT) as resp:
+            return resp.read()
+    except OSError as e:
+        raise DeployError(f"GET {url} failed: {e}") from e
+
+
+def check_hash(data: bytes, hash_format: str, expected: str, what: str):
+    """Verify in-memory data against a packwiz hash"""
+    if hashlib.new(hash_format, data).hexdigest() != expected.lower():
+        raise DeployError(f"Hash mismatch for {what}")
+
+
+def hash_file(path: Path, hash_format: str) -> str:
+    """Hash a file on disk"""
+    hasher = hashlib.new(hash_format)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def manifest_mods(pack_url: str, pack: dict) -> Optional[dict]:
+    """Server mods from the compiled manifest, or None if it is missing or stale"""
+    snapshot = SNAPSHOT_DIR.format(id=pack['index']['hash'].lower()[:16])
+    manifest = None
+    # Raw files have URLs relative to the manifest, so remember which copy was read
+    for url in (urljoin(pack_url, snapshot + MANIFEST_NAME), urljoin(pack_url, MANIFEST_NAME)):
+        try:
+            manifest = json.loads(fetch(url))
+            break
+        except (DeployError, ValueError):
+            continue
+    if manifest is None:
+        return None
+    if (manifest.get('format') != MANIFEST_FORMAT or manifest.get('side') != 'server'
+            or manifest.get('index_hash') != pack['index']['hash'].lower()):
+        log("⚠️  manifest-server.json is stale, reading metafiles instead")
+        return None
+
+    mods = {}
+    for f in manifest['files']:
+        if not f['path'].startswith('mods/') or '/' in f['path'][5:]:
+            continue
+        mods[f['path'][5:]] = {
+            'name': f['path'][5:],
+            'url': urljoin(url, f['url']),
+            'hash_format': f['hash_format'],
+            'hash': f['hash'].lower(),
+        }
+    log(f"🔎 {len(mods)} server mods (compiled manifest)")
+    return mods
+
+
+def resolve_server_mods(pack_url: str, workers: int) -> dict:
+    """Return {filename: download info} for every non-client mod in the pack"""
+    pack = tomllib.loads(fetch(pack_url).decode('utf-8'))
+    log(f"📦 Pack {pack.get('name')} {pack.get('version')} "
+        f"(Minecraft {pack['versions']['minecraft']}, NeoForge {pack['versions'].get('neoforge')})")
+
+    # One request instead of one per metafile when the host publishes a manifest
+    mods = manifest_mods(pack_url, pack)
+    if mods is not None:
+        return mods
+
+    index_info = pack['index']
+    index_url = urljoin(pack_url, quote(index_info['file']))
+    index_data = fetch(index_url)
+    check_hash(index_data, index_info.get('hash-format', 'sha256'), index_info['hash'], 'index.toml')
+    index = tomllib.loads(index_data.decode('utf-8'))
+    default_format = index.get('hash-format', 'sha256')
+
+    entries = [e for e in index.get('files', [])
+               if e.get('metafile') and e['file'].startswith('mods/')]
+
+    def resolve(entry):
+        url = urljoin(index_url, quote(entry['file']))
+        data = fetch(url)
+        check_hash(data, entry.get('hash-format', default_format), entry['hash'], entry['file'])
+        return tomllib.loads(data.decode('utf-8'))
+
+    mods = {}
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for meta in pool.map(resolve, entries):
+            if meta.get('side', 'both') == 'client':
+                skipped += 1
+                continue
+            download = meta['download']
+            mods[meta['filename']] = {
+                'name': meta.get('name', meta['filename']),
+                'url': download['url'],
+                'hash_format': download.get('hash-format', 'sha512'),
+                'hash': download['hash'].lower(),
+            }
+
+    log(f"🔎 {len(mods)} server mods, {skipped} client-only mods skipped")
+    return mods
+
+
+def plan(mods: dict, mods_dir: Path, workers: int) -> tuple[list, list, list, list]:
+    """Diff the wanted mods against mods/: (keep, download, update, remove) filenames
+
+    update lists the jars in mods/ whose contents changed; they are part of
+    download, and not of remove.
+    """
+    existing = sorted(p.name for p in mods_dir.glob('*.jar') if p.is_file()) if mods_dir.is_dir() else []
+
+    def is_current(filename):
+        info = mods[filename]
+        return hash_file(mods_dir / filename, info['hash_format']) == info['hash']
+
+    candidates = [f for f in existing if f in mods]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        current = dict(zip(candidates, pool.map(is_current, candidates)))
+
+    keep = [f for f in candidates if current[f]]
+    download = sorted(f for f in mods if not current.get(f))
+    update = [f for f in candidates if not current[f]]
+    remove = [f for f in existing if f not in mods]
+    return keep, download, update, remove
+
+
+def other_entries(mods_dir: Path) -> list:
+    """Names in mods/ that are not jars (mod configs, libraries in subdirectories); carried over as they are"""
+    if not mods_dir.is_dir():
+        return []
+    return sorted(p.name for p in mods_dir.iterdir() if not (p.name.endswith('.jar') and p.is_file()))
+
+
+def link_or_copy(src: Path, dest: Path):
+    """Hardlink src to dest, copying when the filesystem cannot link"""
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def download(info: dict, dest: Path) -> int:
+    """Stream a jar to dest, verifying its hash inline"""
+    hasher = hashlib.new(info['hash_format'])
+    tmp_path = dest.with_name(dest.name + '.part')
+    size = 0
+    request = urllib.request.Request(info['url'], headers={'User-Agent': USER_AGENT})
+    try:
+        with urllib.request.urlopen(request, timeout=TIMEOUT) as resp, open(tmp_path, 'wb') as f:
+            for chunk in iter(lambda: resp.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except OSError as e:
+        tmp_path.unlink(missing_ok=True)
+        raise DeployError(f"Download of {dest.name} failed: {e}") from e
+
+    if hasher.hexdigest() != info['hash']:
+        tmp_path.unlink(missing_ok=True)
+        raise DeployError(f"Hash mismatch for {dest.name}")
+    os.replace(tmp_path, dest)
+    return size
+
+
+def exchange(a: Path, b: Path):
+    """Atomically swap two directories (renameat2 RENAME_EXCHANGE on Linux)"""
+    if sys.platform.startswith('linux'):
+        libc = ctypes.CDLL(None, use_errno=True)
+        renameat2 = getattr(libc, 'renameat2', None)
+        if renameat2 is not None:
+            AT_FDCWD, RENAME_EXCHANGE = -100, 2
+            if renameat2(AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE) == 0:
+                return
+
+    # Fallback: two renames; recover_interrupted_swap() repairs a crash in between
+    old = a.with_name(a.name + '.old')
+    os.rename(a, old)
+    os.rename(b, a)
+    os.rename(old, b)
+
+
+def recover_interrupted_swap(mods_dir: Path):
+    """Restore mods/ if a previous fallback swap died between its renames"""
+    old = mods_dir.with_name(mods_dir.name + '.old')
+    if not old.is_dir():
+        return
+    if mods_dir.exists():
+        # The new mods/ was already in place; only the old copy is left over
+        shutil.rmtree(old)
+    else:
+        log("⚠️  Restoring mods/ from an interrupted deploy")
+        os.rename(old, mods_dir)
+
+
+def deploy(server_dir: Path, pack_url: str, workers: int, dry_run: bool) -> int:
+    mods_dir = server_dir / 'mods'
+    staging_dir = server_dir / 'mods.staging'
+    recover_interrupted_swap(mods_dir)
+
+    mods = resolve_server_mods(pack_url, workers)
+    keep, to_download, to_update, to_remove = plan(mods, mods_dir, workers)
+    others = other_entries(mods_dir)
+
+    if dry_run:
+        for filename in to_download:
+            log(f"  {'~' if filename in to_update else '+'} {filename}")
+        for filename in to_remove:
+            log(f"  - {filename}")
+        for name in others:
+            log(f"  = {name} (not a jar, kept)")
+        log(f"📝 Dry run: {len(keep)} unchanged, {len(to_download)} to download ({len(to_update)} updated), "
+            f"{len(to_remove)} to remove, {len(others)} other entries kept")
+        return 0
+
+    if not to_download and not to_remove:
+        log(f"✅ {len(keep)} mods already up to date")
+        return 0
+
+    # Stage the complete new mods/ next to the live one
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir()
+    for filename in keep:
+        link_or_copy(mods_dir / filename, staging_dir / filename)
+    # Only jars are managed; everything else in mods/ moves over unchanged
+    for name in others:
+        src = mods_dir / name
+        if src.is_dir() and not src.is_symlink():
+            shutil.copytree(src, staging_dir / name, symlinks=True, copy_function=link_or_copy)
+        elif src.is_symlink():
+            os.symlink(os.readlink(src), staging_dir / name)
+        else:
+            link_or_copy(src, staging_dir / name)
+
+    total = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(download, mods[f], staging_dir / f): f for f in to_download}
+        for done, future in enumerate(as_completed(futures), 1):
+            filename = futures[future]
+            try:
+                size = future.result()
+                total += size
+                log(f"  [{done}/{len(futures)}] ⬇️  {filename} ({size / 1024 / 1024:.1f} MB)")
+            except DeployError as e:
+                failed.append(filename)
+                log(f"  [{done}/{len(futures)}] ❌ {e}")
+
+    if failed:
+        shutil.rmtree(staging_dir)
+        raise DeployError(f"{len(failed)} mod(s) failed to download; live mods/ left untouched")
+
+    # Swap staging in; the previous mods/ ends up in staging_dir and is discarded
+    if mods_dir.exists():
+        exchange(mods_dir, staging_dir)
+        shutil.rmtree(staging_dir)
+    else:
+        os.rename(staging_dir, mods_dir)
+
+    for filename in to_remove:
+        log(f"  🗑️  {filename}")
+    log(f"✅ Deployed: {len(keep)} unchanged, {len(to_download)} downloaded "
+        f"({len(to_update)} updated, {total / 1024 / 1024:.1f} MB), {len(to_remove)} removed"
+        + (f", {len(others)} other entries kept" if others else ''))
+    return 0
+
+
+def server_jvm_args(memory: Optional[int] = None) -> tuple[list[str], str]:
+    """Heap and GC flags for this machine, from tune_jvm(): -Xms = -Xmx, pre-touched; ZGC on big hosts"""
+    profile = tune_jvm(physical_memory_mb(), os.cpu_count(), java_major_version(), server=True, max_memory=memory)
+    args = [f'-Xms{profile.min_memory}M', f'-Xmx{profile.max_memory}M'] + profile.args
+    return args, f"{profile.max_memory} MB heap, {profile.reason}"
+
+
+def write_jvm_args(server_dir: Path, memory: Optional[int], dry_run: bool):
+    """Keep user_jvm_args.txt tuned for this host, unless the admin took it over"""
+    path = server_dir / JVM_ARGS_FILE
+    try:
+        current = path.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        current = None
+    if current is not None and not current.startswith(JVM_ARGS_HEADER):
+        log(f"⏭️  {JVM_ARGS_FILE} is hand-written, leaving it alone")
+        return
+
+    args, reason = server_jvm_args(memory)
+    content = JVM_ARGS_HEADER + '\n' + '\n'.join(args) + '\n'
+    if content == current:
+        return
+    if dry_run:
+        log(f"📝 Dry run: would write {JVM_ARGS_FILE}: {reason}")
+        return
+    path.write_text(content, encoding='utf-8')
+    log(f"☕ {JVM_ARGS_FILE}: {reason}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Deploy the server-side mods of the DHH pack')
+    parser.add_argument('--pack-url', default=PACK_URL, help='URL of pack.toml')
+    parser.add_argument('--server-dir', type=Path, default=Path(__file__).resolve().parent,
+                        help='Server directory containing mods/ (default: next to this script)')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Parallel downloads')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would change and exit')
+    parser.add_argument('--memory', type=int, default=None,
+                        help='Server heap in MB (default: sized from installed RAM)')
+    parser.add_argument('--no-jvm-args', action='store_true', help=f'Do not manage {JVM_ARGS_FILE}')
+    args = parser.parse_args()
+
+    try:
+        if not args.no_jvm_args:
+            write_jvm_args(args.server_dir, args.memory, args.dry_run)
+        return deploy(args.server_dir, args.pack_url, args.workers, args.dry_run)
+    except DeployError as e:
+        log(f"❌ {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH LOD Exporter
+Publishes the server's Distant Horizons data for clients to download before they join.
+
+A new player otherwise pulls every LOD within maxSyncOnLoadRequestDistance
+from the running server at playerBandwidthLimit (500 KB/s), for a long
+time. This takes a consistent copy of each dimension's
+DistantHorizons.sqlite (SQLite's online backup, so the server may keep
+running). Each copy is split into fixed-size blocks. Blocks are
+compressed and stored once under their SHA-256, and a manifest per
+version lists them in order. The backup copies pages where they are, so
+a database that only changed in a few places keeps most of its blocks.
+The installer then fetches only the blocks it does not already have.
+
+Layout of the output (upload it next to pack.toml as lod/):
+
+  index.json                         the only mutable file: latest version per world key
+  <world key>/v<N>.json              immutable manifest: blocks of every dimension's database
+  <world key>/blocks/<ab>/<hash>     zlib-compressed block, named by the hash of its content
+
+The world key is the level name plus a hash of the seed, so a reset
+world gets a new key rather than a new version of the old one.
+
+    python3 export_lods.py --world world --out lod
+    rsync -a --delete lod/ host:/srv/dhh/lod/
+
+Set serverKey in config/DistantHorizons.toml (or pass --server-key), so
+clients keep their LODs in a folder this tool can name. Copy region.py
+next to this script.
+"""
+
+import os
+import re
+import sys
+import json
+import gzip
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import tempfile
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+from region import RegionError, human, read_tags
+
+WORKERS = min(8, os.cpu_count() or 4)
+BLOCK_SIZE = 1024 * 1024  # Small enough that a changed area costs little, large enough to keep files few
+ZLIB_LEVEL = 6
+KEEP_VERSIONS = 3  # A client mid-update still finds the blocks of the version it started on
+INDEX_FILE = 'index.json'
+FORMAT = 1
+DATABASE = 'data/DistantHorizons.sqlite'  # Below each dimension directory
+DH_CONFIG = 'config/DistantHorizons.toml'
+# Where the client keeps the LODs of a server, relative to .minecraft. DH names the dimension
+# folder after the level key with ':' replaced; check one client after it joined once.
+CLIENT_PATH = 'Distant_Horizons_server_data/{server_key}/{dimension}/DistantHorizons.sqlite'
+
+
+class ExportError(Exception):
+    """Raised when the LODs cannot be exported"""
+
+
+def log(message: str):
+    """Real-time progress output"""
+    print(message, flush=True)
+
+
+def load_json(path: Path, default=None):
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return default
+
+
+def save_json(path: Path, data):
+    """Write a JSON file atomically"""
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(data, indent=2) + '\n', encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def databases(world: Path) -> dict[str, Path]:
+    """{dimension id: DistantHorizons.sqlite} of every dimension DH has data for"""
+    found = {'minecraft:overworld': world / DATABASE, 'minecraft:the_nether': world / 'DIM-1' / DATABASE,
+             'minecraft:the_end': world / 'DIM1' / DATABASE}
+    for path in sorted((world / 'dimensions').glob(f'*/*/{DATABASE}')):
+        dimension_dir = path.parent.parent
+        found[f'{dimension_dir.parent.name}:{dimension_dir.name}'] = path
+    return {name: path for name, path in found.items() if path.is_file()}
+
+
+def world_key(world: Path) -> str:
+    """<level name>-<seed hash>: stable across restarts, different for a regenerated world"""
+    try:
+        tags = read_tags(gzip.decompress((world / 'level.dat').read_bytes()), {'LevelName', 'seed'})
+    except (OSError, EOFError, RegionError) as e:
+        raise ExportError(f"Cannot read level.dat ({e}); pass --world-key") from e
+    if 'seed' not in tags:
+        raise ExportError("level.dat has no WorldGenSettings seed; pass --world-key")
+    name = re.sub(r'[^a-z0-9]+', '-', str(tags.get('LevelName', world.name)).lower()).strip('-') or 'world'
+    return f"{name}-{hashlib.sha256(str(tags['seed']).encode()).hexdigest()[:12]}"
+
+
+def server_key(server: Path) -> str:
+    try:
+        with open(server / DH_CONFIG, 'rb') as f:
+            return str(tomllib.load(f).get('server', {}).get('serverKey', ''))
+    except (OSError, tomllib.TOMLDecodeError):
+        return ''
+
+
+def snapshot(source: Path, dest: Path):
+    """Consistent copy of a database that the server may be writing to
+
+    The backup API copies page by page into the same positions, without
+    the rebuild a VACUUM INTO would do, so blocks stay where they were.
+    """
+    src = sqlite3.connect(f'file:{source}?mode=ro', uri=True, timeout=60)
+    dst = sqlite3.connect(dest)
+    try:
+        src.backup(dst)
+    except sqlite3.Error as e:
+        raise ExportError(f"Cannot copy {source}: {e}") from e
+    finally:
+        dst.close()
+        src.close()
+
+
+class BlockStore:
+    """Content-addressed, compressed blocks of one world key"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, digest: str, data: bytes) -> int:
+        """Store a block unless it is already there; returns the bytes written"""
+        path = self.path(digest)
+        if path.exists():
+            return 0
+        packed = zlib.compress(data, ZLIB_LEVEL)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'.{digest}.{os.getpid()}.tmp')
+        tmp.write_bytes(packed)
+        os.replace(tmp, path)
+        return len(packed)
+
+    def collect(self, keep: set[str]) -> tuple[int, int]:
+        """Remove blocks no kept manifest lists; returns (blocks, bytes) removed"""
+        removed = freed = 0
+        for path in self.root.glob('*/*'):
+            if path.name in keep:
+                continue
+            freed += path.stat().st_size
+            path.unlink()
+            removed += 1
+        return removed, freed
+
+
+def split(path: Path, block_size: int, store: BlockStore, pool: ThreadPoolExecutor, workers: int) -> dict:
+    """Store the blocks of a database copy; returns its manifest entry plus stored byte count"""
+    whole = hashlib.sha256()
+    blocks, seen, pending, stored = [], set(), deque(), 0
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            whole.update(data)
+            digest = hashlib.sha256(data).hexdigest()
+            if digest not in seen:
+                seen.add(digest)
+                pending.append(pool.submit(store.put, digest, data))
+            blocks.append(digest)
+            while len(pending) > 2 * workers:  # Bounded, so a large database is never all in memory
+                stored += pending.popleft().result()
+    stored += sum(future.result() for future in pending)
+    return {'size': path.stat().st_size, 'sha256': whole.hexdigest(), 'blocks': blocks, 'stored': stored}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Export Distant Horizons LODs as incremental static bundles')
+    parser.add_argument('--world', type=Path, default=Path('world'), help='World directory (contains level.dat)')
+    parser.add_argument('--server-dir', type=Path, default=None,
+                        help=f'Server directory with {DH_CONFIG} (default: parent of --world)')
+    parser.add_argument('--out', type=Path, default=Path('lod'), help='Output directory, served as <pack URL>/lod/')
+    parser.add_argument('--world-key', default=None, help='Key clients know this world by (default: from level.dat)')
+    parser.add_argument('--server-key', default=None,
+                        help='DH serverKey the clients use as folder name (default: from the server config)')
+    parser.add_argument('--client-path', default=CLIENT_PATH, metavar='TEMPLATE',
+                        help='Database path on the client, relative to .minecraft ({server_key}, {dimension})')
+    parser.add_argument('--dimension', action='append', default=None,
+                        help='Only these dimensions, e.g. minecraft:overworld (repeatable)')
+    parser.add_argument('--default', action='store_true',
+                        help='Make this world the one clients install (automatic for the first world exported)')
+    parser.add_argument('--block-size', type=int, default=BLOCK_SIZE, help='Bytes per block')
+    parser.add_argument('--keep', type=int, default=KEEP_VERSIONS, help='Versions to keep per world key')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Blocks compressed in parallel')
+    args = parser.parse_args()
+
+    if not (args.world / 'level.dat').is_file():
+        log(f"❌ {args.world} is not a world directory (no level.dat)")
+        return 1
+    server_dir = args.server_dir or args.world.resolve().parent
+    dh_key = args.server_key if args.server_key is not None else server_key(server_dir)
+    if not dh_key:
+        log(f"❌ serverKey is empty in {server_dir / DH_CONFIG}. Without it every client picks its own LOD folder; "
+            "set it (e.g. serverKey = \"dhh\") and restart the server, or pass --server-key")
+        return 1
+    try:
+        key = args.world_key or world_key(args.world)
+    except ExportError as e:
+        log(f"❌ {e}")
+        return 1
+
+    found = databases(args.world)
+    if args.dimension:
+        found = {name: path for name, path in found.items() if name in args.dimension}
+    if not found:
+        log(f"❌ No Distant Horizons database under {args.world}; let the server build LODs first")
+        return 1
+
+    world_dir = args.out / key
+    world_dir.mkdir(parents=True, exist_ok=True)
+    index = load_json(args.out / INDEX_FILE, {'format': FORMAT, 'default': None, 'worlds': {}})
+    latest = index['worlds'].get(key)
+    previous = load_json(args.out / latest['manifest'], {}) if latest else {}
+    store = BlockStore(world_dir / 'blocks')
+
+    log(f"🗺️  Exporting {len(found)} dimensions of {key} (serverKey {dh_key}, {human(args.block_size)} blocks)")
+    started = time.monotonic()
+    # Dimensions left out with --dimension keep their last export
+    dimensions = {name: entry for name, entry in previous.get('dimensions', {}).items() if name not in found}
+    stored = 0
+    with tempfile.TemporaryDirectory(dir=args.out, prefix='.export-') as tmp, \
+            ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for name, source in found.items():
+            copy = Path(tmp) / 'copy.sqlite'
+            try:
+                snapshot(source, copy)
+            except ExportError as e:
+                log(f"❌ {e}")
+                return 1
+            entry = split(copy, args.block_size, store, pool, args.workers)
+            copy.unlink()
+            stored += entry.pop('stored')
+            entry['path'] = args.client_path.format(server_key=dh_key, dimension=name.replace(':', '@@'))
+            dimensions[name] = entry
+            old = previous.get('dimensions', {}).get(name, {})
+            changed = sum(a != b for a, b in zip(entry['blocks'], old.get('blocks', [])))
+            changed += abs(len(entry['blocks']) - len(old.get('blocks', [])))
+            log(f"  {name}: {human(entry['size'])}, {len(entry['blocks'])} blocks, "
+                + (f"{changed} changed" if old else "new"))
+
+    if previous.get('block_size') == args.block_size and previous.get('dimensions') == dimensions:
+        log(f"✅ Unchanged since version {latest['version']} ({time.monotonic() - started:.1f}s)")
+        return 0
+
+    version = latest['version'] + 1 if latest else 1
+    manifest_name = f'v{version}.json'
+    save_json(world_dir / manifest_name, {
+        'format': FORMAT, 'world': key, 'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'block_size': args.block_size, 'compression': 'zlib', 'dimensions': dimensions,
+    })
+    index['worlds'][key] = {'version': version, 'manifest': f'{key}/{manifest_name}',
+                            'size': sum(d['size'] for d in dimensions.values())}
+    if args.default or not index.get('default'):
+        index['default'] = key
+    save_json(args.out / INDEX_FILE, index)
+
+    # Older manifests stay for clients that fetched the index just before this run
+    versions = sorted((int(p.stem[1:]) for p in world_dir.glob('v*.json') if p.stem[1:].isdigit()), reverse=True)
+    for old in versions[max(args.keep, 1):]:
+        (world_dir / f'v{old}.json').unlink()
+    referenced = set()
+    for manifest in world_dir.glob('v*.json'):
+        for entry in load_json(manifest, {}).get('dimensions', {}).values():
+            referenced.update(entry['blocks'])
+    removed, freed = store.collect(referenced)
+
+    unique = {digest for entry in dimensions.values() for digest in entry['blocks']}
+    log(f"✅ Version {version} of {key}: {human(sum(d['size'] for d in dimensions.values()))} in "
+        f"{len(unique)} blocks, {human(stored)} new, {removed} old blocks ({human(freed)}) removed "
+        f"in {time.monotonic() - started:.1f}s")
+    if index['default'] != key:
+        log(f"ℹ️  Clients install {index['default']}; pass --default to switch them to {key}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH Region Pruner
+Reports how much of the world players actually used, and removes the rest.
+
+`/chunky radius 5000` generates tens of thousands of chunks that nobody
+ever visits. They bloat backups, disk and Distant Horizons processing. The
+game counts, per chunk, the ticks a player spent nearby (InhabitedTime).
+This reads every region with memory-mapped I/O on all cores and reports
+per-region size, free space and the InhabitedTime distribution. With
+--apply it drops chunks below a threshold outside protected areas;
+removed chunks regenerate from the seed when a player reaches them. The
+matching entities/ and poi/ data goes too. Regions are rewritten chunk
+by chunk into a compact temporary file that replaces the original.
+
+    python3 prune_regions.py --world world                       # dry run: report only
+    python3 prune_regions.py --world world --min-inhabited 120 --protect-radius 2048 --report prune.json
+    python3 prune_regions.py --world world --apply               # server stopped, backup taken
+
+Stop the server first; the tool refuses to run while session.lock is held.
+Copy region.py next to this script.
+"""
+
+import os
+import sys
+import json
+import gzip
+import mmap
+import time
+import argparse
+from pathlib import Path
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+
+from region import EXTERNAL, HEADER_SIZE, SECTOR, RegionError, RegionWriter, chunk_coords, \
+    chunk_payload, decompress_chunk, external_path, human, read_header, read_tags, region_coords
+
+WORKERS = os.cpu_count() or 4
+TICKS_PER_SECOND = 20
+MIN_INHABITED = 60  # Seconds; below this a chunk counts as unvisited
+PROTECT_RADIUS = 1024  # Blocks around the overworld spawn that are never pruned
+# InhabitedTime buckets for the report: (label, upper bound in ticks)
+BUCKETS = (('0', 1), ('<1m', 1200), ('<10m', 12_000), ('<1h', 72_000), ('<10h', 720_000), ('>=10h', None))
+SIBLING_DIRS = ('entities', 'poi')  # Same chunk grid as region/, pruned along with it
+CHUNK_TAGS = {'InhabitedTime', 'Status'}
+
+
+def log(message: str):
+    """Real-time progress output"""
+    print(message, flush=True)
+
+
+def dimensions(world: Path) -> dict[str, Path]:
+    """{dimension id: directory containing region/}"""
+    found = {'minecraft:overworld': world, 'minecraft:the_nether': world / 'DIM-1',
+             'minecraft:the_end': world / 'DIM1'}
+    for region_dir in sorted((world / 'dimensions').glob('*/*/region')):
+        found[f'{region_dir.parent.parent.name}:{region_dir.parent.name}'] = region_dir.parent
+    return {name: path for name, path in found.items() if (path / 'region').is_dir()}
+
+
+def server_running(world: Path) -> bool:
+    """Whether the server holds session.lock (POSIX record locks, as Java's FileLock uses)"""
+    lock = world / 'session.lock'
+    if os.name != 'posix' or not lock.exists():
+        return False
+    import fcntl
+    with open(lock, 'rb+') as f:
+        try:
+            fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return True
+        fcntl.lockf(f, fcntl.LOCK_UN)
+    return False
+
+
+def spawn_point(world: Path) -> Optional[tuple[int, int]]:
+    """Overworld spawn from level.dat, or None if it cannot be read"""
+    try:
+        tags = read_tags(gzip.decompress((world / 'level.dat').read_bytes()), {'SpawnX', 'SpawnZ'})
+    except (OSError, EOFError, RegionError) as e:
+        log(f"⚠️  Cannot read the spawn point from level.dat: {e}")
+        return None
+    if 'SpawnX' not in tags or 'SpawnZ' not in tags:
+        log("⚠️  level.dat has no SpawnX/SpawnZ")
+        return None
+    return tags['SpawnX'], tags['SpawnZ']
+
+
+def parse_point(value: str) -> tuple[int, int]:
+    try:
+        x, z = (int(v) for v in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected x,z in blocks, got {value}") from None
+    return x, z
+
+
+def parse_box(value: str) -> tuple[int, int, int, int]:
+    try:
+        x1, z1, x2, z2 = (int(v) for v in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected x1,z1,x2,z2 in blocks, got {value}") from None
+    return min(x1, x2), min(z1, z2), max(x1, x2), max(z1, z2)
+
+
+def protected(chunk_x: int, chunk_z: int, options: dict) -> bool:
+    """Whether any block of the chunk lies in a protected box or within the spawn radius"""
+    x1, z1 = chunk_x * 16, chunk_z * 16
+    x2, z2 = x1 + 15, z1 + 15
+    for bx1, bz1, bx2, bz2 in options['boxes']:
+        if x1 <= bx2 and bx1 <= x2 and z1 <= bz2 and bz1 <= z2:
+            return True
+    spawn = options['spawn']
+    if spawn is not None:
+        # Distance from the spawn to the nearest block of the chunk
+        dx = max(x1 - spawn[0], 0, spawn[0] - x2)
+        dz = max(z1 - spawn[1], 0, spawn[1] - z2)
+        return dx * dx + dz * dz <= options['radius'] ** 2
+    return False
+
+
+def rewrite(path: Path, drop: set[int]) -> int:
+    """Write the region without the dropped chunks; returns the bytes saved"""
+    old_size = path.stat().st_size
+    if old_size < HEADER_SIZE:
+        return 0
+    tmp = path.with_name(path.name + '.pruning')
+    with open(path, 'rb') as src, mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        slots = read_header(data[:HEADER_SIZE])
+        keep = sorted((i for i, slot in enumerate(slots) if slot.offset and i not in drop),
+                      key=lambda i: slots[i].offset)
+        externals = []
+        for index in drop:
+            start = slots[index].offset * SECTOR
+            if not slots[index].offset:
+                continue
+            if slots[index].offset < 2 or start + 5 > len(data):
+                raise RegionError(f"Chunk at sector {slots[index].offset} is outside the file")
+            if data[start + 4] & EXTERNAL:
+                externals.append(external_path(path, index))
+        if keep:
+            try:
+                with open(tmp, 'wb') as out:
+                    writer = RegionWriter(out)
+                    for index in keep:
+                        writer.add(index, slots[index].timestamp, chunk_payload(data, slots[index]))
+                    writer.close()
+                    out.flush()
+                    os.fsync(out.fileno())
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+    if keep:
+        os.replace(tmp, path)
+    else:
+        path.unlink()
+    for mcc in externals:
+        mcc.unlink(missing_ok=True)
+    return old_size - (path.stat().st_size if keep else 0)
+
+
+def scan_region(task: tuple) -> dict:
+    """Analyze (and with apply, prune) one region of the chunk grid; runs in a worker process"""
+    dimension, dim_dir, name, options = task
+    path = Path(dim_dir) / 'region' / name
+    region_x, region_z = region_coords(path)
+    result = {'dimension': dimension, 'region': name, 'size': path.stat().st_size, 'chunks': 0,
+              'free_bytes': 0, 'inhabited': {label: 0 for label, _ in BUCKETS}, 'not_full': 0,
+              'protected': 0, 'unreadable': 0, 'prunable': 0, 'prunable_bytes': 0}
+    if result['size'] < HEADER_SIZE:
+        return result  # The game leaves empty region files behind
+    threshold = options['min_inhabited'] * TICKS_PER_SECOND
+    drop = set()
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            slots = read_header(data[:HEADER_SIZE])
+            used = 0
+            for index, slot in enumerate(slots):
+                if not slot.offset:
+                    continue
+                result['chunks'] += 1
+                used += slot.sectors
+                try:
+                    nbt = decompress_chunk(chunk_payload(data, slot), external_path(path, index))
+                    tags = read_tags(nbt, CHUNK_TAGS)
+                except RegionError:
+                    result['unreadable'] += 1  # Never pruned: the game may still make sense of it
+                    continue
+                inhabited = tags.get('InhabitedTime', 0)
+                result['inhabited'][next(label for label, bound in BUCKETS if bound is None or inhabited < bound)] += 1
+                result['not_full'] += tags.get('Status', 'minecraft:full').rpartition(':')[2] != 'full'
+                if inhabited >= threshold:
+                    continue
+                chunk_x, chunk_z = chunk_coords(region_x, region_z, index)
+                if protected(chunk_x, chunk_z, options['protect'][dimension]):
+                    result['protected'] += 1
+                    continue
+                drop.add(index)
+                result['prunable_bytes'] += slot.sectors * SECTOR
+            result['free_bytes'] = max(result['size'] - HEADER_SIZE - used * SECTOR, 0)
+    except (RegionError, OSError, ValueError) as e:
+        result['error'] = str(e)
+        return result
+    result['prunable'] = len(drop)
+
+    wasted = result['free_bytes'] > result['size'] * options['compact']
+    if options['apply'] and (drop or wasted):
+        result['saved_bytes'] = 0
+        done = []
+        for directory in ('region',) + SIBLING_DIRS:
+            target = Path(dim_dir) / directory / name
+            if directory != 'region' and not target.exists():
+                continue
+            try:
+                result['saved_bytes'] += rewrite(target, drop)
+            except (RegionError, OSError, ValueError) as e:
+                # Each file is replaced in one rename, so only the ones listed in done changed
+                kept = f"{', '.join(d + '/' for d in done)} already rewritten" if done else "region left as it was"
+                result['error'] = f"rewrite of {directory}/ failed, {kept}: {e}"
+                break
+            done.append(directory)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Report chunk usage per region and prune unvisited chunks')
+    parser.add_argument('--world', type=Path, default=Path('world'), help='World directory (contains level.dat)')
+    parser.add_argument('--min-inhabited', type=float, default=MIN_INHABITED,
+                        help='Seconds players must have spent near a chunk to keep it')
+    parser.add_argument('--protect', type=parse_box, action='append', default=[], metavar='X1,Z1,X2,Z2',
+                        help='Block area never pruned, in every dimension (repeatable)')
+    parser.add_argument('--protect-radius', type=int, default=PROTECT_RADIUS,
+                        help='Blocks around the overworld spawn never pruned (0 to disable)')
+    parser.add_argument('--spawn', type=parse_point, default=None, metavar='X,Z',
+                        help='Overworld spawn in blocks (default: read from level.dat)')
+    parser.add_argument('--dimension', action='append', default=None,
+                        help='Only these dimensions, e.g. minecraft:overworld (repeatable)')
+    parser.add_argument('--compact', type=float, default=0.25,
+                        help='With --apply, also rewrite regions whose free space exceeds this share of the file')
+    parser.add_argument('--apply', action='store_true', help='Rewrite regions (default: report only)')
+    parser.add_argument('--report', type=Path, default=None, help='Write the per-region JSON report here')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Regions processed in parallel')
+    args = parser.parse_args()
+
+    if not (args.world / 'level.dat').is_file():
+        log(f"❌ {args.world} is not a world directory (no level.dat)")
+        return 1
+    if args.apply and server_running(args.world):
+        log("❌ The server is running (session.lock is held); stop it before pruning")
+        return 1
+
+    found = dimensions(args.world)
+    if args.dimension:
+        missing = set(args.dimension) - found.keys()
+        if missing:
+            log(f"❌ No region data for {', '.join(sorted(missing))} (found {', '.join(found)})")
+            return 1
+        found = {name: path for name, path in found.items() if name in args.dimension}
+    spawn = None
+    if args.protect_radius > 0:
+        spawn = args.spawn or spawn_point(args.world)
+        if spawn is None and args.apply:
+            # Guessing would centre the protection on the wrong place and prune around the real spawn
+            log("❌ Spawn protection needs the spawn point; pass --spawn X,Z (or --protect-radius 0)")
+            return 1
+        if spawn is None:
+            log("⚠️  Reporting with the spawn assumed at 0, 0; pass --spawn X,Z for an accurate report")
+            spawn = (0, 0)
+    protect = {name: {'boxes': args.protect, 'spawn': spawn if name == 'minecraft:overworld' else None,
+                      'radius': args.protect_radius} for name in found}
+    options = {'min_inhabited': args.min_inhabited, 'protect': protect, 'apply': args.apply,
+               'compact': args.compact}
+    tasks = [(name, str(path), region.name, options) for name, path in found.items()
+             for region in sorted((path / 'region').glob('r.*.*.mca')) if region_coords(region)]
+
+    log(f"🔎 {'Pruning' if args.apply else 'Scanning'} {len(tasks)} regions in {len(found)} dimensions "
+        f"(keep >= {args.min_inhabited:g}s inhabited"
+        + (f", {args.protect_radius} blocks around spawn {spawn[0]}, {spawn[1]}" if spawn else '')
+        + f", {len(args.protect)} protected areas, {args.workers} workers)")
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(scan_region, tasks, chunksize=4))
+
+    summary = {}
+    for name in found:
+        rows = [r for r in results if r['dimension'] == name]
+        totals = {key: sum(r[key] for r in rows) for key in
+                  ('size', 'chunks', 'free_bytes', 'protected', 'unreadable', 'prunable', 'prunable_bytes')}
+        totals['regions'] = len(rows)
+        totals['inhabited'] = {label: sum(r['inhabited'][label] for r in rows) for label, _ in BUCKETS}
+        if args.apply:
+            totals['saved_bytes'] = sum(r.get('saved_bytes', 0) for r in rows)
+        summary[name] = totals
+        share = totals['prunable'] / totals['chunks'] if totals['chunks'] else 0
+        log(f"🗺️  {name}: {totals['regions']} regions, {human(totals['size'])}, {totals['chunks']} chunks "
+            f"({', '.join(f'{k} {v}' for k, v in totals['inhabited'].items() if v)}); "
+            f"{totals['prunable']} unvisited ({share:.0%}, {human(totals['prunable_bytes'])}), "
+            f"{totals['protected']} protected")
+    for result in results:
+        if 'error' in result:
+            log(f"⚠️  {result['dimension']} {result['region']}: {result['error']}")
+    largest = sorted(results, key=lambda r: -r['size'])[:5]
+    log("📦 Largest: " + ', '.join(
+        f"{'' if r['dimension'] == 'minecraft:overworld' else r['dimension'].partition(':')[2] + '/'}{r['region']} "
+        f"{human(r['size'])} ({r['prunable']}/{r['chunks']} unvisited)" for r in largest))
+
+    if args.report:
+        report = {'world': str(args.world), 'scanned_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                  'min_inhabited': args.min_inhabited, 'applied': args.apply, 'spawn': spawn,
+                  'summary': summary, 'regions': results}
+        args.report.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+
+    seconds = time.monotonic() - started
+    if args.apply:
+        saved = sum(r.get('saved_bytes', 0) for r in results)
+        log(f"✅ Pruned {sum(r['prunable'] for r in results)} chunks, {human(saved)} freed in {seconds:.1f}s")
+    else:
+        log(f"✅ Dry run in {seconds:.1f}s: {human(sum(r['prunable_bytes'] for r in results))} of unvisited "
+            "chunks; pass --apply to remove them (take a backup first)")
+    return 1 if any('error' in r for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Anvil region files (.mca), shared by the world tools next to deploy_modpack.py.
+
+A region holds 32x32 chunks. The first 4 KiB sector holds one location per
+chunk (3-byte sector offset, 1-byte sector count), the second the last
+save time of each chunk. Every chunk is stored as a 4-byte length, a
+compression byte and the compressed NBT, padded to whole sectors. A chunk
+too large for 255 sectors has only its compression byte (with bit 128
+set) in the region, and its data in c.<x>.<z>.mcc next to it.
+
+Only the few NBT tags the tools need are decoded; everything else is
+skipped without building objects.
+"""
+
+import re
+import gzip
+import zlib
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+SECTOR = 4096
+CHUNKS = 1024
+HEADER_SIZE = 2 * SECTOR
+MAX_SECTORS = 255
+EXTERNAL = 0x80  # Compression byte flag: data lives in a .mcc file
+REGION_NAME = re.compile(r'^r\.(-?\d+)\.(-?\d+)\.mca$')
+REGION_DIRS = ('region', 'entities', 'poi')
+COMPRESSION = {1: 'gzip', 2: 'zlib', 3: 'none', 4: 'lz4'}
+
+TAG_END, TAG_STRING, TAG_LIST, TAG_COMPOUND = 0, 8, 9, 10
+TAG_FIXED = {1: 1, 2: 2, 3: 4, 4: 8, 5: 4, 6: 8}  # byte, short, int, long, float, double
+TAG_NUMBER = {1: '>b', 2: '>h', 3: '>i', 4: '>q', 5: '>f', 6: '>d'}
+TAG_ARRAY = {7: 1, 11: 4, 12: 8}  # byte, int and long arrays: element size
+WRAPPERS = ('Level', 'Data', 'WorldGenSettings')  # Pre-1.18 chunks and level.dat keep their tags one level down
+
+
+class RegionError(Exception):
+    """A region file is truncated or its header points outside the file"""
+
+
+class Slot(NamedTuple):
+    offset: int  # In sectors; 0 means the chunk was never generated
+    sectors: int
+    timestamp: int  # Seconds since the epoch, as written by the game
+
+
+def is_region(path: Path) -> bool:
+    return REGION_NAME.match(path.name) is not None
+
+
+def region_coords(path: Path) -> Optional[tuple[int, int]]:
+    match = REGION_NAME.match(path.name)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def chunk_coords(region_x: int, region_z: int, index: int) -> tuple[int, int]:
+    return region_x * 32 + index % 32, region_z * 32 + index // 32
+
+
+def human(size: int) -> str:
+    """A byte count for log lines"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def external_path(region_path: Path, index: int) -> Path:
+    """c.<x>.<z>.mcc holding the data of an oversized chunk"""
+    x, z = chunk_coords(*region_coords(region_path), index)
+    return region_path.with_name(f'c.{x}.{z}.mcc')
+
+
+def read_header(data: bytes) -> list[Slot]:
+    """The 1024 slots of a region, from its first two sectors"""
+    if len(data) < HEADER_SIZE:
+        raise RegionError(f"Header is {len(data)} bytes, expected {HEADER_SIZE}")
+    locations = struct.unpack_from('>1024I', data, 0)
+    timestamps = struct.unpack_from('>1024I', data, SECTOR)
+    return [Slot(loc >> 8, loc & 0xFF, ts) for loc, ts in zip(locations, timestamps)]
+
+
+def chunk_payload(data, slot: Slot) -> bytes:
+    """Compression byte plus compressed data of one chunk (data: bytes or mmap of the region)"""
+    start = slot.offset * SECTOR
+    if slot.offset < 2 or start + 5 > len(data):
+        raise RegionError(f"Chunk at sector {slot.offset} is outside the file")
+    length, = struct.unpack_from('>I', data, start)
+    if length < 1 or length > slot.sectors * SECTOR - 4 or start + 4 + length > len(data):
+        raise RegionError(f"Chunk at sector {slot.offset} has a bad length ({length})")
+    return bytes(data[start + 4:start + 4 + length])
+
+
+def read_chunks(f: BinaryIO, slots: list[Slot], indices) -> Iterator[tuple[int, bytes]]:
+    """(index, payload) of the given slots, read in file order"""
+    size = f.seek(0, 2)
+    for index in sorted(indices, key=lambda i: slots[i].offset):
+        slot = slots[index]
+        start = slot.offset * SECTOR
+        if slot.offset < 2 or start + 5 > size:
+            raise RegionError(f"Chunk {index} at sector {slot.offset} is outside the file")
+        f.seek(start)
+        length, = struct.unpack('>I', f.read(4))
+        if length < 1 or length > slot.sectors * SECTOR - 4:
+            raise RegionError(f"Chunk {index} has a bad length ({length})")
+        payload = f.read(length)
+        if len(payload) != length:
+            raise RegionError(f"Chunk {index} is truncated")
+        yield index, payload
+
+
+def decompress_chunk(payload: bytes, external: Optional[Path] = None) -> bytes:
+    """Uncompressed NBT of a chunk payload (compression byte + data)"""
+    kind, data = payload[0], payload[1:]
+    if kind & EXTERNAL:
+        if external is None:
+            raise RegionError('Chunk is stored in a .mcc file')
+        try:
+            data = external.read_bytes()
+        except OSError as e:
+            raise RegionError(f"Cannot read {external.name}: {e}") from e
+        kind &= ~EXTERNAL
+    try:
+        if kind == 1:
+            return gzip.decompress(data)
+        if kind == 2:
+            return zlib.decompress(data)
+    except (OSError, EOFError, zlib.error) as e:
+        raise RegionError(f"Cannot decompress chunk: {e}") from e
+    if kind == 3:
+        return data
+    raise RegionError(f"Unsupported chunk compression {COMPRESSION.get(kind, kind)}")
+
+
+def _skip(data: bytes, pos: int, tag: int) -> int:
+    """Position after the payload of a tag"""
+    if tag in TAG_FIXED:
+        return pos + TAG_FIXED[tag]
+    if tag in TAG_ARRAY:
+        count, = struct.unpack_from('>i', data, pos)
+        return pos + 4 + count * TAG_ARRAY[tag]
+    if tag == TAG_STRING:
+        length, = struct.unpack_from('>H', data, pos)
+        return pos + 2 + length
+    if tag == TAG_LIST:
+        item, count = data[pos], struct.unpack_from('>i', data, pos + 1)[0]
+        pos += 5
+        if item in TAG_FIXED:
+            return pos + max(count, 0) * TAG_FIXED[item]
+        for _ in range(count):
+            pos = _skip(data, pos, item)
+        return pos
+    if tag == TAG_COMPOUND:
+        while True:
+            child = data[pos]
+            if child == TAG_END:
+                return pos + 1
+            length, = struct.unpack_from('>H', data, pos + 1)
+            pos = _skip(data, pos + 3 + length, child)
+    raise RegionError(f"Bad NBT tag type {tag}")
+
+
+def read_tags(data: bytes, names: set[str], pos: Optional[int] = None) -> dict:
+    """Number and string tags of the root compound (or its Level/Data wrapper) named in `names`"""
+    found = {}
+    try:
+        if pos is None:
+            if data[0] != TAG_COMPOUND:
+                raise RegionError('NBT root is not a compound')
+            pos = 3 + struct.unpack_from('>H', data, 1)[0]
+        while len(found) < len(names):
+            tag = data[pos]
+            if tag == TAG_END:
+                break
+            length, = struct.unpack_from('>H', data, pos + 1)
+            name = data[pos + 3:pos + 3 + length].decode('utf-8', 'replace')
+            pos += 3 + length
+            if name in names and tag in TAG_NUMBER:
+                found[name], = struct.unpack_from(TAG_NUMBER[tag], data, pos)
+            elif name in names and tag == TAG_STRING:
+                size, = struct.unpack_from('>H', data, pos)
+                found[name] = data[pos + 2:pos + 2 + size].decode('utf-8', 'replace')
+            elif name in WRAPPERS and tag == TAG_COMPOUND:
+                found.update(read_tags(data, names - found.keys(), pos))
+            pos = _skip(data, pos, tag)
+    except (IndexError, struct.error) as e:
+        raise RegionError(f"Truncated NBT: {e}") from e
+    return found
+
+
+class RegionWriter:
+    """Writes a compact region file chunk by chunk; the header is filled in on close()"""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.slots = [Slot(0, 0, 0)] * CHUNKS
+        self.next_sector = 2
+        f.write(bytes(HEADER_SIZE))
+
+    def add(self, index: int, timestamp: int, payload: bytes):
+        record = struct.pack('>I', len(payload)) + payload
+        sectors = -(-len(record) // SECTOR)
+        if sectors > MAX_SECTORS:
+            raise RegionError(f"Chunk {index} needs {sectors} sectors; it should be in a .mcc file")
+        self.f.write(record + bytes(sectors * SECTOR - len(record)))
+        self.slots[index] = Slot(self.next_sector, sectors, timestamp)
+        self.next_sector += sectors
+
+    def close(self):
+        self.f.seek(0)
+        self.f.write(struct.pack('>1024I', *((s.offset << 8) | s.sectors for s in self.slots)))
+        self.f.write(struct.pack('>1024I', *(s.timestamp for s in self.slots)))
+        self.f.seek(0, 2)
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH Mod Analyzer
+Measures what every installed mod costs at startup and compares it with an earlier run.
+
+When a launch gets slower after `packwiz update --all`, there is rarely one
+obvious culprit. This reads the installed jars (size, class count, mixin
+configs, bundled jar-in-jars, classes shipped by more than one jar) and, given
+a NeoForge latest.log or debug.log, splits startup into phases and attributes
+log time to the mod whose logger was active. Reports can be saved and
+compared, so the mods worth dropping or replacing stand out:
+
+    python tools/analyze_mods.py --mods <instance>/minecraft/mods --log <instance>/minecraft/logs/debug.log \\
+        --report mods-1.4.json
+    python tools/analyze_mods.py --mods ... --log ... --baseline mods-1.4.json   # after the bump
+
+Log attribution is approximate: the time between two lines of one thread is
+charged to whoever logged the first of them. debug.log has millisecond
+timestamps and full logger names, so prefer it over latest.log.
+"""
+
+import io
+import re
+import sys
+import json
+import time
+import zipfile
+import argparse
+from pathlib import Path
+from typing import Optional
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+WORKERS = 8
+NESTED_DEPTH = 3  # Jar-in-jar levels to follow
+TOP = 10  # Rows per ranking in the console summary
+MOD_DESCRIPTORS = ('META-INF/neoforge.mods.toml', 'META-INF/mods.toml')
+FABRIC_DESCRIPTOR = 'fabric.mod.json'  # Fabric mods loaded through Sinytra Connector
+JARJAR_METADATA = 'META-INF/jarjar/metadata.json'
+NESTED_DIRS = ('META-INF/jarjar/', 'META-INF/jars/')
+IGNORED_CLASSES = ('module-info.class', 'package-info.class')
+
+# [14:03:22] or [14Oct2025 14:03:22.123], then [thread/LEVEL] [logger/marker]: message
+LOG_LINE = re.compile(r'^\[(?:\d{2}[A-Za-z]{3}\d{4} )?(\d{2}):(\d{2}):(\d{2})(?:\.(\d{3}))?\] '
+                      r'\[(.+?)/([A-Z]+)\](?: \[([^\]/]*)(?:/[^\]]*)?\])?: (.*)$')
+# First message of each startup phase, in launch order; a launch only hits some of them
+PHASES = [
+    ('mixin', re.compile(r'SpongePowered MIXIN Subsystem')),
+    ('game', re.compile(r"Launching target '")),
+    ('window', re.compile(r'Backend library: LWJGL')),
+    ('server_start', re.compile(r'Starting minecraft server version')),
+    ('resources', re.compile(r'Reloading ResourceManager')),
+    ('world', re.compile(r'Preparing (level|start region)')),
+]
+READY = re.compile(r'Sound engine started|Done \([\d.,]+s\)! For help')
+# Loggers that belong to the game and loader rather than to a mod
+BUILTIN_OWNERS = {
+    'net.minecraft': 'minecraft', 'com.mojang': 'minecraft', 'minecraft': 'minecraft',
+    'net.neoforged': 'neoforge', 'cpw.mods': 'neoforge', 'neoforge': 'neoforge', 'fml': 'neoforge',
+    'org.spongepowered': 'mixin', 'mixin': 'mixin',
+}
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def abbreviate(name: str) -> str:
+    """Logger name as latest.log prints it (%c{2.}: packages cut to two letters)"""
+    parts = name.split('.')
+    return '.'.join([p[:2] for p in parts[:-1]] + parts[-1:])
+
+
+def read_metafiles(pack_dir: Path) -> dict[str, dict]:
+    """{jar filename: metafile info}, so jars are reported under their stable pack name"""
+    metafiles = {}
+    for path in sorted((pack_dir / 'mods').glob('*.pw.toml')):
+        try:
+            meta = tomllib.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            log(f"⚠️  Skipping {path.name}: {e}")
+            continue
+        if 'filename' in meta:
+            metafiles[meta['filename']] = {'key': path.name[:-len('.pw.toml')], 'name': meta.get('name'),
+                                           'side': meta.get('side', 'both')}
+    return metafiles
+
+
+def read_manifest(zf: zipfile.ZipFile) -> dict[str, str]:
+    try:
+        text = zf.read('META-INF/MANIFEST.MF').decode('utf-8', 'replace')
+    except KeyError:
+        return {}
+    # Long values continue on lines that start with a single space
+    text = re.sub(r'\r?\n ', '', text)
+    return dict(line.split(': ', 1) for line in text.splitlines() if ': ' in line)
+
+
+def read_jar(zf: zipfile.ZipFile, prefix: str = '', depth: int = 0) -> tuple[dict, list[str], dict[str, list[str]]]:
+    """(summary, own classes, {nested jar path: classes}) of one jar, following jar-in-jars"""
+    names = [n for n in zf.namelist() if not n.endswith('/')]
+    classes = [n for n in names if n.endswith('.class') and not n.startswith('META-INF/')
+               and not n.endswith(IGNORED_CLASSES)]
+    manifest = read_manifest(zf)
+    info = {'mod_ids': [], 'version': None, 'classes': len(classes), 'resources': len(names) - len(classes)}
+
+    mixin_names = [c.strip() for c in manifest.get('MixinConfigs', '').split(',') if c.strip()]
+    nested_versions = {}
+    for descriptor in MOD_DESCRIPTORS:
+        try:
+            meta = tomllib.loads(zf.read(descriptor).decode('utf-8', 'replace'))
+        except KeyError:
+            continue
+        except ValueError as e:
+            info['error'] = f"{descriptor}: {e}"
+            break
+        for mod in meta.get('mods', []):
+            info['mod_ids'].append(mod.get('modId'))
+            version = str(mod.get('version', ''))
+            info['version'] = info['version'] or (manifest.get('Implementation-Version') if '$' in version
+                                                  else version) or None
+        mixin_names += [m['config'] for m in meta.get('mixins', []) if 'config' in m]
+        break
+    else:
+        try:
+            meta = json.loads(zf.read(FABRIC_DESCRIPTOR))
+            info['mod_ids'].append(meta.get('id'))
+            info['version'] = meta.get('version')
+            mixin_names += [m if isinstance(m, str) else m.get('config') for m in meta.get('mixins', [])]
+        except KeyError:
+            pass
+        except ValueError as e:
+            info['error'] = f"{FABRIC_DESCRIPTOR}: {e}"
+    if not info['version']:
+        info['version'] = manifest.get('Implementation-Version')
+
+    info['mixin_configs'] = []
+    for config in dict.fromkeys(filter(None, mixin_names)):
+        try:
+            data = json.loads(zf.read(config))
+            count = sum(len(data.get(k) or []) for k in ('mixins', 'client', 'server'))
+        except (KeyError, ValueError, TypeError, AttributeError):
+            count = None
+        info['mixin_configs'].append({'config': config, 'mixins': count})
+    info['mixins'] = sum(c['mixins'] or 0 for c in info['mixin_configs'])
+
+    try:
+        for jar in json.loads(zf.read(JARJAR_METADATA)).get('jars', []):
+            nested_versions[jar.get('path')] = (jar.get('version') or {}).get('artifactVersion')
+    except (KeyError, ValueError, AttributeError):
+        pass
+
+    info['nested'] = []
+    nested_classes = {}
+    if depth < NESTED_DEPTH:
+        for name in names:
+            if not (name.endswith('.jar') and name.startswith(NESTED_DIRS)):
+                continue
+            path = f'{prefix}{name}'
+            try:
+                with zipfile.ZipFile(io.BytesIO(zf.read(name))) as inner:
+                    sub, sub_classes, deeper = read_jar(inner, f'{path}!/', depth + 1)
+            except (zipfile.BadZipFile, OSError) as e:
+                info['nested'].append({'path': path, 'error': str(e)})
+                continue
+            info['nested'].append({'path': path, 'mod_ids': sub['mod_ids'],
+                                   'version': nested_versions.get(name) or sub['version'],
+                                   'classes': sub['classes'], 'mixins': sub['mixins']})
+            info['nested'] += sub['nested']
+            nested_classes[path] = sub_classes
+            nested_classes.update(deeper)
+    return info, classes, nested_classes
+
+
+def scan_jar(path: Path, metafiles: dict) -> tuple[dict, list[str], dict[str, list[str]]]:
+    meta = metafiles.get(path.name, {})
+    entry = {'key': meta.get('key') or path.stem, 'file': path.name, 'name': meta.get('name'),
+             'side': meta.get('side'), 'size': path.stat().st_size}
+    try:
+        with zipfile.ZipFile(path) as zf:
+            info, classes, nested = read_jar(zf)
+    except (zipfile.BadZipFile, OSError) as e:
+        return {**entry, 'error': str(e)}, [], {}
+    if not meta and info['mod_ids']:
+        entry['key'] = info['mod_ids'][0]
+    entry.update(info)
+    entry['nested_classes'] = sum(len(c) for c in nested.values())
+    return entry, classes, nested
+
+
+def find_duplicates(entries: list[dict], own: dict, nested: dict) -> list[dict]:
+    """Groups of classes shipped by more than one jar
+
+    A conflict is a class in two top-level jars: only one copy is loaded, and
+    which one is not up to the pack. Copies inside jar-in-jars are resolved by
+    the loader (highest version wins) and are reported for their weight only.
+    """
+    providers = defaultdict(list)
+    for entry in entries:
+        for name in own.get(entry['key'], []):
+            providers[name].append(entry['key'])
+        for path, classes in nested.get(entry['key'], {}).items():
+            for name in classes:
+                providers[name].append(f"{entry['key']}!/{path}")
+
+    groups = defaultdict(list)
+    for name, owners in providers.items():
+        if len(owners) > 1:
+            groups[tuple(sorted(owners))].append(name)
+    duplicates = []
+    for owners, names in groups.items():
+        top_level = [o for o in owners if '!/' not in o]
+        duplicates.append({'owners': list(owners), 'classes': len(names), 'example': min(names),
+                           'conflict': len(set(top_level)) > 1})
+    duplicates.sort(key=lambda d: (not d['conflict'], -d['classes']))
+
+    conflicts = defaultdict(int)
+    for group in duplicates:
+        if group['conflict']:
+            for owner in set(group['owners']):
+                if '!/' not in owner:
+                    conflicts[owner] += group['classes']
+    for entry in entries:
+        entry['duplicate_classes'] = conflicts.get(entry['key'], 0)
+    return duplicates
+
+
+class OwnerIndex:
+    """Maps a logger name (mod id, full or abbreviated class name) to the mod that owns it"""
+
+    def __init__(self, entries: list[dict], own: dict, nested: dict):
+        self.names = {}
+        for entry in entries:
+            for name in (entry['key'], entry.get('name'), *entry.get('mod_ids', [])):
+                if name:
+                    self.names.setdefault(name.lower(), entry['key'])
+        # Own classes take precedence over libraries that several mods bundle
+        self.packages = [self._packages({e['key']: own.get(e['key'], []) for e in entries}),
+                         self._packages({e['key']: [c for classes in nested.get(e['key'], {}).values()
+                                                    for c in classes] for e in entries})]
+        self._cache = {}
+
+    @staticmethod
+    def _packages(classes_by_key: dict[str, list[str]]) -> dict[str, set]:
+        packages = defaultdict(set)
+        for key, classes in classes_by_key.items():
+            for package in {c.rpartition('/')[0].replace('/', '.') for c in classes}:
+                packages[package].add(key)
+                packages[abbreviate(package + '.x')[:-2]].add(key)
+        return packages
+
+    def owner(self, logger: str) -> str:
+        if logger not in self._cache:
+            self._cache[logger] = self._resolve(logger)
+        return self._cache[logger]
+
+    def _resolve(self, logger: str) -> str:
+        if not logger:
+            return 'other'
+        for prefix, owner in BUILTIN_OWNERS.items():
+            if logger == prefix or logger.startswith(prefix + '.'):
+                return owner
+            if '.' in prefix and logger.startswith(abbreviate(prefix + '.x')[:-1]):
+                return owner
+        if logger.lower() in self.names:
+            return self.names[logger.lower()]
+        parts = logger.split('.')
+        for packages in self.packages:
+            for end in range(len(parts), 1, -1):
+                owners = packages.get('.'.join(parts[:end]))
+                if owners:
+                    if len(owners) == 1:
+                        return next(iter(owners))
+                    break
+        return 'other'
+
+
+def parse_log(path: Path, index: OwnerIndex) -> dict:
+    """Startup phases and per-owner time from one NeoForge log"""
+    events = []
+    day = 0.0
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = LOG_LINE.match(line.rstrip('\r\n'))
+            if not match:
+                continue  # Stack traces and wrapped messages
+            hours, minutes, seconds, millis, thread, level, logger, message = match.groups()
+            at = int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(millis or 0) / 1000 + day
+            if events and at < events[-1][0] - 43200:
+                day += 86400  # Launched before midnight
+                at += 86400
+            events.append((at, thread, level, logger or '', message))
+            if READY.search(message):
+                break
+    if not events:
+        return {'lines': 0, 'phases': {}, 'owners': {}}
+
+    phases = [('launch', events[0][0])]
+    next_phase = 0
+    phase_of = []
+    for at, _, _, _, message in events:
+        for i in range(next_phase, len(PHASES)):
+            if PHASES[i][1].search(message):
+                phases.append((PHASES[i][0], at))
+                next_phase = i + 1
+                break
+        phase_of.append(phases[-1][0])
+    end = events[-1][0]
+    durations = {name: round((phases[i + 1][1] if i + 1 < len(phases) else end) - start, 3)
+                 for i, (name, start) in enumerate(phases)}
+
+    owners = defaultdict(lambda: {'seconds': 0.0, 'lines': 0, 'warnings': 0, 'errors': 0,
+                                  'phases': defaultdict(float)})
+    previous = {}  # thread: index of its last event
+    for i, (at, thread, level, logger, _) in enumerate(events):
+        stats = owners[index.owner(logger)]
+        stats['lines'] += 1
+        stats['warnings'] += level == 'WARN'
+        stats['errors'] += level in ('ERROR', 'FATAL')
+        if thread in previous:
+            j = previous[thread]
+            gap = at - events[j][0]
+            charged = owners[index.owner(events[j][3])]
+            charged['seconds'] += gap
+            charged['phases'][phase_of[j]] += gap
+        previous[thread] = i
+
+    return {
+        'file': str(path),
+        'lines': len(events),
+        'ready': bool(READY.search(events[-1][4])),
+        'startup_seconds': round(end - events[0][0], 3),
+        'phases': durations,
+        'owners': {owner: {**stats, 'seconds': round(stats['seconds'], 3),
+                           'phases': {p: round(s, 3) for p, s in stats['phases'].items() if s >= 0.001}}
+                   for owner, stats in sorted(owners.items(), key=lambda o: -o[1]['seconds'])},
+    }
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Per-mod and per-phase deltas against an earlier report"""
+    old = {m['key']: m for m in baseline.get('mods', [])}
+    new = {m['key']: m for m in report['mods']}
+    changed = []
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        change = {'key': key}
+        if before.get('version') != after.get('version'):
+            change['from'] = before.get('version')
+            change['to'] = after.get('version')
+        for field in ('size', 'classes', 'mixins', 'nested_classes', 'load_seconds'):
+            if isinstance(before.get(field), (int, float)) and isinstance(after.get(field), (int, float)):
+                delta = round(after[field] - before[field], 3)
+                if delta:
+                    change[f'{field}_delta'] = delta
+        if len(change) > 1:
+            changed.append(change)
+    changed.sort(key=lambda c: -abs(c.get('load_seconds_delta', 0)))
+
+    comparison = {'pack_version': (baseline.get('pack') or {}).get('version'),
+                  'added': sorted(new.keys() - old.keys()), 'removed': sorted(old.keys() - new.keys()),
+                  'changed': changed}
+    old_log, new_log = baseline.get('log'), report.get('log')
+    if old_log and new_log and 'startup_seconds' in old_log and 'startup_seconds' in new_log:
+        comparison['startup_delta'] = round(new_log['startup_seconds'] - old_log['startup_seconds'], 3)
+        comparison['phase_deltas'] = {name: round(seconds - old_log['phases'].get(name, 0), 3)
+                                      for name, seconds in new_log['phases'].items()}
+    return comparison
+
+
+def analyze(mods_dir: Path, log_path: Optional[Path], pack_dir: Path, workers: int) -> dict:
+    metafiles = read_metafiles(pack_dir)
+    jars = sorted(mods_dir.glob('*.jar'))
+    log(f"🔎 Reading {len(jars)} jars in {mods_dir} ({len(metafiles)} metafiles for names)")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        scanned = list(pool.map(lambda jar: scan_jar(jar, metafiles), jars))
+
+    entries, own, nested = [], {}, {}
+    for entry, classes, nested_classes in scanned:
+        if entry['key'] in own:
+            entry['key'] = entry['file']  # Two jars claim the same mod; keep both visible
+        entries.append(entry)
+        own[entry['key']] = classes
+        nested[entry['key']] = nested_classes
+
+    report = {'mods_dir': str(mods_dir), 'analyzed_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+    try:
+        pack = tomllib.loads((pack_dir / 'pack.toml').read_text(encoding='utf-8'))
+        report['pack'] = {'name': pack.get('name'), 'version': pack.get('version')}
+    except (OSError, ValueError):
+        report['pack'] = None
+    report['duplicates'] = find_duplicates(entries, own, nested)
+
+    if log_path:
+        report['log'] = parse_log(log_path, OwnerIndex(entries, own, nested))
+        for entry in entries:
+            stats = report['log']['owners'].get(entry['key'])
+            entry['load_seconds'] = stats['seconds'] if stats else 0.0
+
+    report['mods'] = sorted(entries, key=lambda e: e['key'])
+    report['summary'] = {
+        'jars': len(entries),
+        'bytes': sum(e['size'] for e in entries),
+        'classes': sum(e.get('classes', 0) for e in entries),
+        'nested_jars': sum(len(e.get('nested', [])) for e in entries),
+        'nested_classes': sum(e.get('nested_classes', 0) for e in entries),
+        'mixin_configs': sum(len(e.get('mixin_configs', [])) for e in entries),
+        'mixins': sum(e.get('mixins', 0) for e in entries),
+        'conflicts': sum(d['classes'] for d in report['duplicates'] if d['conflict']),
+        'unreadable': sorted(e['file'] for e in entries if 'error' in e),
+    }
+    return report
+
+
+def print_summary(report: dict):
+    summary, mods = report['summary'], report['mods']
+    log(f"📦 {summary['jars']} jars, {summary['bytes'] / 1024 / 1024:.1f} MB, {summary['classes']:,} classes "
+        f"(+{summary['nested_classes']:,} in {summary['nested_jars']} jar-in-jars), "
+        f"{summary['mixins']:,} mixins in {summary['mixin_configs']} configs")
+    for label, field in (('🧱 Most classes', 'classes'), ('🧬 Most mixins', 'mixins')):
+        top = sorted((m for m in mods if m.get(field)), key=lambda m: -m[field])[:TOP]
+        log(f"{label}: " + ', '.join(f"{m['key']} {m[field]:,}" for m in top))
+    for group in report['duplicates']:
+        if group['conflict']:
+            log(f"⚠️  {group['classes']} classes in {' and '.join(group['owners'])} (e.g. {group['example']})")
+    for name in summary['unreadable']:
+        log(f"💀 {name} could not be read")
+
+    if 'log' in report:
+        startup = report['log']
+        if not startup['lines']:
+            log(f"⚠️  No log lines recognised in {startup.get('file', 'the log')}")
+        else:
+            log(f"⏱️  Startup {startup['startup_seconds']:.1f}s"
+                + ('' if startup['ready'] else ' (log ends before the game was ready)') + ': '
+                + ', '.join(f"{name} {seconds:.1f}s" for name, seconds in startup['phases'].items()))
+            slowest = [(o, s) for o, s in startup['owners'].items() if o != 'other'][:TOP]
+            log("🐢 Slowest: " + ', '.join(f"{owner} {stats['seconds']:.1f}s" for owner, stats in slowest))
+
+    comparison = report.get('comparison')
+    if comparison:
+        log(f"📈 Against {comparison['pack_version'] or 'baseline'}: "
+            f"{len(comparison['added'])} added, {len(comparison['removed'])} removed, "
+            f"{len(comparison['changed'])} changed"
+            + (f", startup {comparison['startup_delta']:+.1f}s" if 'startup_delta' in comparison else ''))
+        for change in comparison['changed'][:TOP]:
+            details = [f"{change['from']} → {change['to']}"] if 'to' in change else []
+            if 'load_seconds_delta' in change:
+                details.append(f"{change['load_seconds_delta']:+.1f}s")
+            for field, unit in (('classes_delta', 'classes'), ('mixins_delta', 'mixins')):
+                if field in change:
+                    details.append(f"{change[field]:+,} {unit}")
+            log(f"   {change['key']}: {', '.join(details)}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Measure what each installed mod costs at startup')
+    parser.add_argument('--mods', type=Path, required=True, help='mods directory of an installed instance or server')
+    parser.add_argument('--log', type=Path, default=None, help='NeoForge debug.log or latest.log of a launch')
+    parser.add_argument('--pack-dir', type=Path, default=REPO_ROOT,
+                        help='Directory containing pack.toml (names jars after their metafiles)')
+    parser.add_argument('--report', type=Path, default=None, help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', type=Path, default=None, help='Earlier report to compare against')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Jars read in parallel')
+    args = parser.parse_args()
+
+    if not args.mods.is_dir():
+        log(f"❌ {args.mods} is not a directory")
+        return 1
+    try:
+        report = analyze(args.mods, args.log, args.pack_dir, args.workers)
+    except OSError as e:
+        log(f"❌ {e}")
+        return 1
+    if args.baseline:
+        try:
+            report['comparison'] = compare(report, json.loads(args.baseline.read_text(encoding='utf-8')))
+        except (OSError, ValueError, KeyError) as e:
+            log(f"⚠️  Ignoring baseline {args.baseline}: {e}")
+
+    print_summary(report)
+    data = json.dumps(report, indent=2, ensure_ascii=False) + '\n'
+    if args.report:
+        args.report.write_text(data, encoding='utf-8')
+    else:
+        sys.stdout.write(data)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH Pack Sync Benchmark
+Measures update performance against a local stand-in for the pack host.
+
+A synthetic pack with the shape of the real one (every metafile and raw
+file from index.toml, jars of realistic, deterministic sizes) is served
+from a local HTTP server that can add per-request latency and a shared
+bandwidth cap. The sync engine (or any other command) then runs as a
+subprocess for each scenario:
+
+  cold          empty instance, empty store
+  noop          immediately again (the launch that changes nothing)
+  bump          one mod updated in the pack
+  shared-store  a second instance on the same machine (store already warm)
+
+Wall time, bytes served, request count and the child's peak RSS are
+reported per scenario, optionally compared against a saved baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import shlex
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+from compile_manifest import read_pack, build_manifests, write_manifests
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SEED = 'dhh-bench'
+CHUNK_SIZE = 64 * 1024
+SCENARIOS = ('cold', 'noop', 'bump', 'shared-store')
+# Jar sizes: log-normal around 400 KB, clipped to what Modrinth jars actually range over
+JAR_MEDIAN = 400 * 1024
+JAR_SIGMA = 1.3
+JAR_MIN = 16 * 1024
+JAR_MAX = 40 * 1024 * 1024
+SHADERPACK_SIZE = 2 * 1024 * 1024
+DEFAULT_COMMAND = (f'"{sys.executable}" "{REPO_ROOT / "client" / "installer.py"}" sync "{{minecraft_dir}}" '
+                   '--pack-url {pack_url} --store "{store}" --no-mirrors --no-lan --no-trace')
+
+
+def log(message: str):
+    print(message, flush=True)
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def toml_string(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+class SyntheticPack:
+    """A packwiz pack with the real pack's file list and fake, deterministic content"""
+
+    def __init__(self, root: Path, base_url: str, source: Path, seed: str = SEED, scale: float = 1.0,
+                 manifest: bool = False):
+        self.root = root
+        self.manifest = manifest
+        self.base_url = base_url
+        self.source = source
+        self.seed = seed
+        self.scale = scale
+        self.files = {}  # index path -> (content bytes, is metafile)
+
+    def _jar(self, name: str, generation: int = 0) -> bytes:
+        rng = random.Random(f'{self.seed}:{name}:{generation}')
+        size = rng.lognormvariate(0, JAR_SIGMA) * JAR_MEDIAN
+        size = int(min(max(size, JAR_MIN), JAR_MAX) * self.scale)
+        return rng.randbytes(max(size, 1))
+
+    def _metafile(self, meta_path: str, name: str, filename: str, side: str, jar: bytes) -> bytes:
+        jar_path = f'jars/{filename}'
+        (self.root / jar_path).write_bytes(jar)
+        return (f'name = {toml_string(name)}\n'
+                f'filename = {toml_string(filename)}\n'
+                f'side = {toml_string(side)}\n\n'
+                '[download]\n'
+                f'url = {toml_string(self.base_url + "/" + jar_path)}\n'
+                'hash-format = "sha512"\n'
+                f'hash = "{hashlib.sha512(jar).hexdigest()}"\n').encode('utf-8')
+
+    def build(self):
+        """Generate pack.toml, index.toml, metafiles and jars from the real index"""
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        (self.root / 'jars').mkdir(parents=True)
+        index = tomllib.loads((self.source / 'index.toml').read_text(encoding='utf-8'))
+
+        for entry in index['files']:
+            rel_path = entry['file']
+            if entry.get('metafile'):
+                meta = tomllib.loads((self.source / rel_path).read_text(encoding='utf-8'))
+                if 'download' not in meta:
+                    continue
+                data = self._metafile(rel_path, meta.get('name', meta['filename']), meta['filename'],
+                                      meta.get('side', 'both'), self._jar(meta['filename']))
+            elif (self.source / rel_path).is_file():
+                data = (self.source / rel_path).read_bytes()
+            else:
+                # Raw files kept out of git (the shaderpack zip)
+                data = random.Random(f'{self.seed}:{rel_path}').randbytes(int(SHADERPACK_SIZE * self.scale))
+            self.files[rel_path] = (data, bool(entry.get('metafile')))
+        self._write()
+
+    def bump(self) -> str:
+        """Publish a new version of one mod (the median-sized one); returns its metafile path"""
+        metafiles = sorted(p for p, (_, is_meta) in self.files.items() if is_meta and p.startswith('mods/'))
+        metas = {p: tomllib.loads(self.files[p][0].decode('utf-8')) for p in metafiles}
+        sizes = sorted(metafiles, key=lambda p: (self.root / 'jars' / metas[p]['filename']).stat().st_size)
+        target = sizes[len(sizes) // 2]
+        meta = metas[target]
+
+        stem, ext = os.path.splitext(meta['filename'])
+        filename = f'{stem}-bump{ext}'
+        (self.root / 'jars' / meta['filename']).unlink()
+        data = self._metafile(target, meta['name'], filename, meta.get('side', 'both'),
+                              self._jar(meta['filename'], generation=1))
+        self.files[target] = (data, True)
+        self._write()
+        return target
+
+    def _write(self):
+        lines = ['hash-format = "sha256"']
+        for rel_path, (data, is_meta) in self.files.items():
+            dest = self.root / rel_path
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            dest.write_bytes(data)
+            lines += ['', '[[files]]', f'file = {toml_string(rel_path)}', f'hash = "{sha256(data)}"']
+            if is_meta:
+                lines.append('metafile = true')
+        index = ('\n'.join(lines) + '\n').encode('utf-8')
+        (self.root / 'index.toml').write_bytes(index)
+
+        pack = (self.source / 'pack.toml').read_text(encoding='utf-8')
+        before, _, rest = pack.partition('[index]')
+        after = rest.split('\n\n', 1)[1] if '\n\n' in rest else ''
+        (self.root / 'pack.toml').write_text(
+            f'{before}[index]\nfile = "index.toml"\nhash-format = "sha256"\nhash = "{sha256(index)}"\n\n{after}',
+            encoding='utf-8')
+        if self.manifest:
+            write_manifests(build_manifests(*read_pack(self.root)), self.root, verbose=False)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(f.stat().st_size for f in self.root.rglob('*') if f.is_file())
+
+
+class BenchServer(ThreadingHTTPServer):
+    """Static file server with injected latency and a shared bandwidth cap"""
+
+    daemon_threads = True
+
+    def __init__(self, root: Path, latency: float, bandwidth: Optional[float]):
+        super().__init__(('127.0.0.1', 0), BenchHandler)
+        self.root = root
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self._lock = threading.Lock()
+        self._allowance = 0.0
+        self._last = time.monotonic()
+        self.reset()
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def reset(self):
+        with self._lock:
+            self.bytes_sent = 0
+            self.requests = 0
+
+    def count(self, nbytes: int = 0, request: bool = False):
+        with self._lock:
+            self.bytes_sent += nbytes
+            self.requests += request
+
+    def throttle(self, nbytes: int):
+        """Token bucket shared by all connections, like a single home uplink"""
+        if not self.bandwidth:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self._allowance + (now - self._last) * self.bandwidth, self.bandwidth)
+            self._last = now
+            self._allowance -= nbytes
+            wait = -self._allowance / self.bandwidth if self._allowance < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class BenchHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: BenchServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(body=False)
+
+    def do_GET(self, body: bool = True):
+        self.server.count(request=True)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        path = (self.server.root / unquote(self.path.split('?')[0]).lstrip('/')).resolve()
+        if not path.is_file() or not path.is_relative_to(self.server.root.resolve()):
+            self._empty(404)
+            return
+
+        stat = path.stat()
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        if self.headers.get('If-None-Match') == etag:
+            self._empty(304, etag)
+            return
+
+        start = 0
+        range_header = self.headers.get('Range', '')
+        if range_header.startswith('bytes=') and self.headers.get('If-Range') in (None, etag, last_modified):
+            start = int(range_header[6:].split('-')[0] or 0)
+            if start >= stat.st_size:
+                self._empty(416, etag)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{stat.st_size - 1}/{stat.st_size}')
+        else:
+            self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Content-Length', str(stat.st_size - start))
+        self.end_headers()
+        if not body:
+            return
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                self.server.throttle(len(chunk))
+                self.wfile.write(chunk)
+                self.server.count(len(chunk))
+
+    def _empty(self, status: int, etag: Optional[str] = None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def run_command(template: str, values: dict) -> tuple[float, int, Optional[float]]:
+    """Run one engine invocation; returns (seconds, exit code, peak RSS in MB)"""
+    argv = shlex.split(template.format(**values), posix=os.name != 'nt')
+    started = time.perf_counter()
+    proc = subprocess.Popen(argv, cwd=values['minecraft_dir'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if hasattr(os, 'wait4'):
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is KB on Linux, bytes on macOS
+        rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+        return seconds, proc.returncode, rss
+    proc.wait()
+    return time.perf_counter() - started, proc.returncode, None
+
+
+def run_round(server: BenchServer, pack: SyntheticPack, work: Path, command: str) -> dict:
+    """Run every scenario once against a freshly built pack"""
+    pack.build()
+    instance = work / 'instance'
+    second = work / 'instance-2'
+    store = work / 'store'
+    for path in (instance, second, store):
+        if path.exists():
+            shutil.rmtree(path)
+        path.mkdir(parents=True)
+
+    results = {}
+    for scenario in SCENARIOS:
+        if scenario == 'bump':
+            pack.bump()
+        target = second if scenario == 'shared-store' else instance
+        server.reset()
+        seconds, code, rss = run_command(command, {
+            'pack_url': server.base_url + '/pack.toml',
+            'minecraft_dir': target,
+            'store': store,
+            'workdir': work,
+        })
+        results[scenario] = {
+            'seconds': seconds,
+            'bytes': server.bytes_sent,
+            'requests': server.requests,
+            'peak_rss_mb': rss,
+            'exit_code': code,
+        }
+    return results
+
+
+def summarize(rounds: list[dict]) -> dict:
+    """Median of each metric across rounds"""
+    summary = {}
+    for scenario in SCENARIOS:
+        runs = [r[scenario] for r in rounds]
+        summary[scenario] = {
+            'seconds': statistics.median(r['seconds'] for r in runs),
+            'bytes': statistics.median(r['bytes'] for r in runs),
+            'requests': statistics.median(r['requests'] for r in runs),
+            'peak_rss_mb': (statistics.median(r['peak_rss_mb'] for r in runs)
+                            if all(r['peak_rss_mb'] is not None for r in runs) else None),
+            'failures': sum(r['exit_code'] != 0 for r in runs),
+        }
+    return summary
+
+
+def print_table(summary: dict, baseline: Optional[dict]):
+    log(f"{'scenario':<14}{'time':>10}{'MB served':>12}{'requests':>10}{'peak RSS':>11}")
+    for scenario, r in summary.items():
+        rss = f"{r['peak_rss_mb']:.0f} MB" if r['peak_rss_mb'] is not None else 'n/a'
+        line = (f"{scenario:<14}{r['seconds']:>9.2f}s{r['bytes'] / 1024 / 1024:>12.1f}"
+                f"{r['requests']:>10.0f}{rss:>11}")
+        if baseline and scenario in baseline:
+            before = baseline[scenario]['seconds']
+            line += f"   ({(r['seconds'] - before) / before * 100:+.0f}% vs baseline)" if before else ''
+        if r['failures']:
+            line += f"   ❌ {r['failures']} failed run(s)"
+        log(line)
+
+
+def regressions(summary: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Metrics that got worse than the baseline by more than tolerance"""
+    found = []
+    for scenario, r in summary.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        for metric in ('seconds', 'bytes', 'requests', 'peak_rss_mb'):
+            old, new = before.get(metric), r.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                found.append(f"{scenario} {metric}: {old:.2f} -> {new:.2f}")
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark pack sync against a local synthetic pack host')
+    parser.add_argument('--rounds', type=int, default=3, help='Repeat all scenarios N times (median reported)')
+    parser.add_argument('--latency', type=float, default=0.0, metavar='MS',
+                        help='Extra delay before every response, in milliseconds')
+    parser.add_argument('--bandwidth', type=float, default=None, metavar='MBPS',
+                        help='Shared bandwidth cap for all connections, in Mbit/s')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply jar sizes (e.g. 0.1 for a quick smoke run)')
+    parser.add_argument('--seed', default=SEED, help='Seed for jar sizes and content')
+    parser.add_argument('--manifest', action='store_true',
+                        help='Also publish compiled manifest-{side}.json files (tools/compile_manifest.py)')
+    parser.add_argument('--command', default=DEFAULT_COMMAND,
+                        help='Engine command; placeholders {pack_url} {minecraft_dir} {store} {workdir}')
+    parser.add_argument('--workdir', type=Path, default=None, help='Keep the pack and instances here')
+    parser.add_argument('--json', type=Path, default=None, help='Write results as JSON')
+    parser.add_argument('--baseline', type=Path, default=None, help='Compare against a previous --json file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed regression vs baseline before failing (default 0.2 = 20%%)')
+    args = parser.parse_args()
+
+    work = args.workdir or Path(tempfile.mkdtemp(prefix='dhh-bench-'))
+    work.mkdir(parents=True, exist_ok=True)
+    bandwidth = args.bandwidth * 1_000_000 / 8 if args.bandwidth else None
+    server = BenchServer(work / 'pack', args.latency / 1000, bandwidth)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        pack = SyntheticPack(work / 'pack', server.base_url, REPO_ROOT, args.seed, args.scale, args.manifest)
+        pack.build()
+        log(f"📦 Synthetic pack: {len(pack.files)} files, {pack.total_bytes / 1024 / 1024:.1f} MB "
+            f"(latency {args.latency:g} ms, bandwidth {args.bandwidth or 'unlimited'} Mbit/s)")
+
+        rounds = []
+        for i in range(args.rounds):
+            log(f"⏱️  Round {i + 1}/{args.rounds}")
+            rounds.append(run_round(server, pack, work, args.command))
+    finally:
+        server.shutdown()
+        if not args.workdir:
+            shutil.rmtree(work, ignore_errors=True)
+
+    summary = summarize(rounds)
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))['results']
+    print_table(summary, baseline)
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            'config': {'latency_ms': args.latency, 'bandwidth_mbps': args.bandwidth, 'scale': args.scale,
+                       'seed': args.seed, 'rounds': args.rounds, 'manifest': args.manifest,
+                       'command': args.command},
+            'results': summary,
+        }, indent=2), encoding='utf-8')
+
+    failed = any(r['failures'] for r in summary.values())
+    if baseline:
+        worse = regressions(summary, baseline, args.tolerance)
+        for line in worse:
+            log(f"❌ Regression: {line}")
+        failed = failed or bool(worse)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
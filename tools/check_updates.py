@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH Modrinth Update Checker
+Finds updates for every Modrinth metafile with a few batched hash lookups.
+
+`packwiz update --all` asks the API about one mod at a time. This sends the
+sha512 of every pinned file to POST /version_files/update in batches,
+filtered to the pack's Minecraft version and loader, then rewrites the
+metafiles that have a newer version and refreshes the index.toml and
+pack.toml hashes the way `packwiz refresh` would.
+
+Answers are cached per hash (default: 1 hour), so a repeated run makes no
+requests at all.
+
+    python tools/check_updates.py --dry-run     # report only
+    python tools/check_updates.py               # rewrite metafiles and index
+    python tools/check_updates.py --api http://127.0.0.1:8000/v2   # local stand-in of the API
+"""
+
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import urllib.error
+import urllib.request
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+API_URL = 'https://api.modrinth.com/v2'
+USER_AGENT = 'ThatHunky/dhh-update-checker'  # Modrinth asks for an identifying User-Agent
+CACHE_FILE = REPO_ROOT / '.cache' / 'modrinth-updates.json'
+CACHE_MAX_AGE = 3600  # Seconds a cached answer is trusted
+BATCH_SIZE = 50  # Hashes per request
+WORKERS = 4  # Concurrent requests
+TIMEOUT = 30
+MAX_RETRIES = 3  # On HTTP 429 / 5xx
+# Loaders to filter by, per pack directory (mods use the pack's own loader)
+DIR_LOADERS = {
+    'shaderpacks': ['iris', 'optifine'],
+    'resourcepacks': ['minecraft'],
+    'datapacks': ['datapack'],
+}
+
+
+class UpdateError(Exception):
+    """The API could not be queried or a metafile could not be rewritten"""
+
+
+def log(message: str):
+    print(message, flush=True)
+
+
+def toml_string(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def pack_filters(pack: dict) -> tuple[list[str], list[str]]:
+    """(loaders, game versions) the pack accepts, from pack.toml"""
+    versions = pack.get('versions', {})
+    loaders = sorted(name for name in versions if name != 'minecraft')
+    game_versions = [versions['minecraft']]
+    acceptable = pack.get('options', {}).get('acceptable-game-versions', [])
+    for version in [acceptable] if isinstance(acceptable, str) else acceptable:
+        if version not in game_versions:
+            game_versions.append(version)
+    return loaders, game_versions
+
+
+def load_metafiles(pack_dir: Path, pack: dict, index: dict) -> tuple[list[dict], list[str]]:
+    """Modrinth-tracked metafiles of the pack, plus the paths of ones that are not"""
+    pack_loaders, _ = pack_filters(pack)
+    records = []
+    skipped = []
+    for entry in index.get('files', []):
+        if not entry.get('metafile'):
+            continue
+        rel_path = entry['file']
+        text = (pack_dir / rel_path).read_bytes().decode('utf-8')
+        meta = tomllib.loads(text)
+        modrinth = meta.get('update', {}).get('modrinth')
+        download = meta.get('download', {})
+        if not modrinth or meta.get('pin') or download.get('hash-format', 'sha512') != 'sha512':
+            skipped.append(rel_path)
+            continue
+        records.append({
+            'path': rel_path,
+            'text': text,
+            'name': meta.get('name', meta['filename']),
+            'filename': meta['filename'],
+            'hash': download['hash'].lower(),
+            'mod_id': modrinth['mod-id'],
+            'version': modrinth['version'],
+            'loaders': DIR_LOADERS.get(rel_path.split('/')[0], pack_loaders),
+        })
+    return records, skipped
+
+
+class ResponseCache:
+    """Per-hash API answers with their fetch time, stored as JSON"""
+
+    def __init__(self, path: Path, max_age: float):
+        self.path = path
+        self.max_age = max_age
+        try:
+            self.entries = json.loads(path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+        self.hits = 0
+
+    @staticmethod
+    def key(file_hash: str, loaders: list[str], game_versions: list[str]) -> str:
+        return f"{file_hash}|{','.join(loaders)}|{','.join(game_versions)}"
+
+    def get(self, key: str):
+        """(True, answer) for a fresh entry, (False, None) otherwise"""
+        entry = self.entries.get(key)
+        if entry and time.time() - entry['fetched'] < self.max_age:
+            self.hits += 1
+            return True, entry['version']
+        return False, None
+
+    def put(self, key: str, version):
+        self.entries[key] = {'fetched': time.time(), 'version': version}
+
+    def save(self):
+        # Drop answers nobody could use any more
+        now = time.time()
+        self.entries = {k: v for k, v in self.entries.items() if now - v['fetched'] < max(self.max_age, 86400)}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.entries, indent=1, sort_keys=True) + '\n', encoding='utf-8')
+
+
+def api_post(api: str, endpoint: str, body: dict) -> dict:
+    """POST JSON to the API, backing off on rate limits and server errors"""
+    data = json.dumps(body).encode('utf-8')
+    for attempt in range(1, MAX_RETRIES + 1):
+        request = urllib.request.Request(f"{api.rstrip('/')}/{endpoint}", data=data, method='POST', headers={
+            'User-Agent': USER_AGENT,
+            'Content-Type': 'application/json',
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=TIMEOUT) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            if (e.code == 429 or e.code >= 500) and attempt < MAX_RETRIES:
+                delay = float(e.headers.get('Retry-After') or e.headers.get('X-Ratelimit-Reset') or 2 ** attempt)
+                log(f"⏳ HTTP {e.code} from {endpoint}, retrying in {delay:.0f}s")
+                time.sleep(delay)
+                continue
+            raise UpdateError(f"POST {endpoint} returned HTTP {e.code}") from e
+        except (OSError, ValueError) as e:
+            raise UpdateError(f"POST {endpoint} failed: {e}") from e
+    raise UpdateError(f"POST {endpoint} kept failing")
+
+
+def lookup(records: list[dict], game_versions: list[str], api: str, cache: ResponseCache,
+           workers: int = WORKERS, batch_size: int = BATCH_SIZE) -> tuple[dict, int]:
+    """Latest matching version for every record, keyed by metafile path
+
+    Records are grouped by loader filter and only hashes without a fresh
+    cache entry are sent, batch_size per request, workers at a time.
+    Returns the answers and the number of requests made.
+    """
+    answers = {}
+    batches = []
+    for record in records:
+        key = ResponseCache.key(record['hash'], record['loaders'], game_versions)
+        fresh, version = cache.get(key)
+        if fresh:
+            answers[record['path']] = version
+            continue
+        group = [b for b in batches if b['loaders'] == record['loaders'] and len(b['records']) < batch_size]
+        if group:
+            group[0]['records'].append(record)
+        else:
+            batches.append({'loaders': record['loaders'], 'records': [record]})
+
+    def query(batch):
+        hashes = sorted({r['hash'] for r in batch['records']})
+        return batch, api_post(api, 'version_files/update', {
+            'hashes': hashes,
+            'algorithm': 'sha512',
+            'loaders': batch['loaders'],
+            'game_versions': game_versions,
+        })
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch, result in pool.map(query, batches):
+            for record in batch['records']:
+                version = result.get(record['hash'])
+                cache.put(ResponseCache.key(record['hash'], batch['loaders'], game_versions), version)
+                answers[record['path']] = version
+    return answers, len(batches)
+
+
+def primary_file(version: dict) -> dict:
+    files = version.get('files', [])
+    if not files:
+        raise UpdateError(f"Version {version.get('id')} has no files")
+    return next((f for f in files if f.get('primary')), files[0])
+
+
+def rewrite_metafile(text: str, version: dict) -> str:
+    """Point a metafile at a new version, keeping its layout"""
+    new = primary_file(version)
+    replacements = {
+        'filename': new['filename'],
+        'url': new['url'],
+        'hash-format': 'sha512',
+        'hash': new['hashes']['sha512'],
+        'version': version['id'],
+    }
+    for key, value in replacements.items():
+        text, count = re.subn(rf'^{re.escape(key)} = ".*"$', f'{key} = {toml_string(value)}', text,
+                              count=1, flags=re.MULTILINE)
+        if not count:
+            raise UpdateError(f"No `{key}` line to rewrite")
+
+    meta = tomllib.loads(text)
+    if (meta['filename'] != new['filename'] or meta['download']['hash'] != new['hashes']['sha512']
+            or meta['update']['modrinth']['version'] != version['id']):
+        raise UpdateError("Rewritten metafile does not parse back to the new version")
+    return text
+
+
+def refresh_index(index_text: str, rel_path: str, new_hash: str) -> str:
+    """Replace the sha256 of one index entry"""
+    pattern = rf'(^file = {re.escape(toml_string(rel_path))}\nhash = ")[0-9a-f]+(")'
+    index_text, count = re.subn(pattern, rf'\g<1>{new_hash}\g<2>', index_text, count=1, flags=re.MULTILINE)
+    if not count:
+        raise UpdateError(f"{rel_path} not found in index.toml (run packwiz refresh)")
+    return index_text
+
+
+def refresh_pack(pack_text: str, index_hash: str) -> str:
+    text, count = re.subn(r'^(hash = ")[0-9a-f]+(")', rf'\g<1>{index_hash}\g<2>', pack_text,
+                          count=1, flags=re.MULTILINE)
+    if not count:
+        raise UpdateError("No [index] hash in pack.toml (run packwiz refresh)")
+    return text
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Check every Modrinth mod of the pack for updates')
+    parser.add_argument('--pack-dir', type=Path, default=REPO_ROOT, help='Directory containing pack.toml')
+    parser.add_argument('--dry-run', action='store_true', help='Report updates without rewriting anything')
+    parser.add_argument('--api', default=API_URL, help='Modrinth API base URL')
+    parser.add_argument('--cache', type=Path, default=CACHE_FILE, help='Response cache file')
+    parser.add_argument('--max-age', type=float, default=CACHE_MAX_AGE,
+                        help='Seconds a cached answer is used (0 always asks the API)')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Concurrent requests')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Hashes per request')
+    args = parser.parse_args()
+
+    pack_dir = args.pack_dir
+    pack_text = (pack_dir / 'pack.toml').read_bytes().decode('utf-8')
+    pack = tomllib.loads(pack_text)
+    index_path = pack_dir / pack['index']['file']
+    index_text = index_path.read_bytes().decode('utf-8')
+    records, skipped = load_metafiles(pack_dir, pack, tomllib.loads(index_text))
+    loaders, game_versions = pack_filters(pack)
+    log(f"🔎 {len(records)} Modrinth files, Minecraft {', '.join(game_versions)}, {', '.join(loaders)}")
+    for rel_path in skipped:
+        log(f"⏭️  {rel_path} (pinned or not on Modrinth)")
+
+    cache = ResponseCache(args.cache, args.max_age)
+    started = time.monotonic()
+    try:
+        answers, requests_made = lookup(records, game_versions, args.api, cache, args.workers, args.batch_size)
+    except UpdateError as e:
+        log(f"❌ {e}")
+        return 1
+    cache.save()
+    log(f"📡 {requests_made} request(s), {cache.hits} cached, {time.monotonic() - started:.1f}s")
+
+    pack_mod_ids = {r['mod_id'] for r in records}
+    updates = []
+    for record in records:
+        version = answers.get(record['path'])
+        if version is None:
+            log(f"⚠️  {record['name']}: no version for this Minecraft/loader on Modrinth")
+            continue
+        if version['id'] == record['version'] or primary_file(version)['hashes']['sha512'] == record['hash']:
+            continue
+        updates.append((record, version))
+        log(f"⬆️  {record['name']}: {record['filename']} → {primary_file(version)['filename']} "
+            f"({version.get('version_number')}, {version.get('version_type', 'release')})")
+        for dependency in version.get('dependencies', []):
+            if dependency.get('dependency_type') == 'required' and dependency.get('project_id') not in pack_mod_ids:
+                log(f"   ⚠️  requires project {dependency.get('project_id')}, which is not in the pack")
+
+    if not updates:
+        log("✅ Everything is up to date")
+        return 0
+    if args.dry_run:
+        log(f"📋 {len(updates)} update(s) available (dry run, nothing written)")
+        return 0
+
+    written = {}
+    for record, version in updates:
+        try:
+            written[record['path']] = rewrite_metafile(record['text'], version)
+            index_text = refresh_index(index_text, record['path'],
+                                       hashlib.sha256(written[record['path']].encode('utf-8')).hexdigest())
+        except (UpdateError, KeyError) as e:
+            log(f"❌ {record['path']}: {e}")
+            return 1
+    pack_text = refresh_pack(pack_text, hashlib.sha256(index_text.encode('utf-8')).hexdigest())
+
+    # Everything was prepared in memory, so a failure above leaves the pack untouched
+    for rel_path, text in written.items():
+        (pack_dir / rel_path).write_text(text, encoding='utf-8', newline='')
+    index_path.write_text(index_text, encoding='utf-8', newline='')
+    (pack_dir / 'pack.toml').write_text(pack_text, encoding='utf-8', newline='')
+    log(f"✅ Updated {len(updates)} metafile(s), index.toml and pack.toml "
+        "(recompile the manifests with tools/compile_manifest.py)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH Pack Manifest Compiler
+Compiles pack.toml, index.toml and every metafile into one JSON manifest per side.
+
+Clients otherwise fetch index.toml and then each of the ~111 metafiles just
+to learn jar URLs and hashes. The compiled manifest-client.json (client +
+both) and manifest-server.json (server + both) carry the same information
+in a single request. They record the index hash they were built from, so
+the sync engine ignores a manifest that is older than pack.toml and falls
+back to the metafiles.
+
+Run after `packwiz refresh`, from anywhere:
+
+    python tools/compile_manifest.py            # writes next to pack.toml
+    python tools/compile_manifest.py --sizes    # also record jar sizes (HEAD requests)
+"""
+
+import sys
+import json
+import hashlib
+import argparse
+import urllib.request
+from pathlib import Path, PurePosixPath
+from typing import Optional
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MANIFEST_FORMAT = 1
+MANIFEST_NAME = 'manifest-{side}.json'
+SIDES = {'client': ('client', 'both'), 'server': ('server', 'both')}
+USER_AGENT = 'DHH-Manifest-Compiler'
+TIMEOUT = 30
+
+
+class CompileError(Exception):
+    """The pack on disk is inconsistent (run packwiz refresh)"""
+
+
+def check_hash(data: bytes, hash_format: str, expected: str, what: str):
+    if hashlib.new(hash_format, data).hexdigest() != expected.lower():
+        raise CompileError(f"Hash mismatch for {what} (run packwiz refresh)")
+
+
+def raw_size(path: Path, hash_format: str, expected: str, rel_path: str) -> Optional[int]:
+    """Size of a raw (non-metafile) pack file, if the local copy is the one the index pins
+
+    The index stays authoritative either way: raw files can be missing from
+    the checkout (the shaderpack zip) or differ only by CRLF/LF conversion.
+    """
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        print(f"⚠️  {rel_path} is not in this checkout; size unknown", file=sys.stderr)
+        return None
+    try:
+        check_hash(data, hash_format, expected, rel_path)
+    except CompileError as e:
+        print(f"⚠️  {e}; keeping the index hash", file=sys.stderr)
+        return None
+    return len(data)
+
+
+def read_pack(pack_dir: Path) -> tuple[dict, list[dict]]:
+    """Parse pack.toml and resolve every index entry into a file record"""
+    pack_data = (pack_dir / 'pack.toml').read_bytes()
+    pack = tomllib.loads(pack_data.decode('utf-8'))
+    index_info = pack['index']
+    index_data = (pack_dir / index_info['file']).read_bytes()
+    check_hash(index_data, index_info.get('hash-format', 'sha256'), index_info['hash'], index_info['file'])
+    index = tomllib.loads(index_data.decode('utf-8'))
+    default_format = index.get('hash-format', 'sha256')
+
+    files = {}
+    for entry in index.get('files', []):
+        rel_path = entry['file']
+        hash_format = entry.get('hash-format', default_format)
+
+        if entry.get('metafile'):
+            data = (pack_dir / rel_path).read_bytes()
+            check_hash(data, hash_format, entry['hash'], rel_path)
+            meta = tomllib.loads(data.decode('utf-8'))
+            download = meta.get('download', {})
+            if 'url' not in download:
+                raise CompileError(f"Metafile has no download URL: {rel_path}")
+            dest = (PurePosixPath(entry.get('alias', rel_path)).parent / meta['filename']).as_posix()
+            record = {
+                'path': dest,
+                'url': download['url'],
+                'hash': download['hash'].lower(),
+                'hash_format': download.get('hash-format', 'sha512'),
+                'side': meta.get('side', 'both'),
+                'size': None,
+            }
+        else:
+            record = {
+                'path': entry.get('alias', rel_path),
+                # Raw files are served next to pack.toml; the URL is relative to the manifest
+                'url': quote(rel_path),
+                'hash': entry['hash'].lower(),
+                'hash_format': hash_format,
+                'side': 'both',
+                'size': raw_size(pack_dir / rel_path, hash_format, entry['hash'], rel_path),
+            }
+        if entry.get('preserve'):
+            record['preserve'] = True
+
+        # Several metafiles may name the same jar
+        known = files.setdefault(record['path'], record)
+        if known['hash'] != record['hash']:
+            raise CompileError(f"Conflicting hashes for {record['path']}")
+    return pack, list(files.values())
+
+
+def fetch_sizes(files: list[dict], workers: int):
+    """Fill in jar sizes with HEAD requests (used for progress and download ordering)"""
+    def head(record):
+        request = urllib.request.Request(record['url'], method='HEAD', headers={'User-Agent': USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=TIMEOUT) as resp:
+                length = resp.headers.get('Content-Length')
+                return int(length) if length else None
+        except OSError as e:
+            print(f"⚠️  HEAD {record['url']} failed: {e}", file=sys.stderr)
+            return None
+
+    remote = [r for r in files if r['size'] is None]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for record, size in zip(remote, pool.map(head, remote)):
+            record['size'] = size
+
+
+def build_manifests(pack: dict, files: list[dict]) -> dict[str, dict]:
+    """Per-side manifests, keyed by output filename"""
+    manifests = {}
+    for side, wanted in SIDES.items():
+        manifests[MANIFEST_NAME.format(side=side)] = {
+            'format': MANIFEST_FORMAT,
+            'side': side,
+            'pack': {
+                'name': pack.get('name'),
+                'version': pack.get('version'),
+                'versions': pack.get('versions', {}),
+            },
+            'index_hash': pack['index']['hash'].lower(),
+            'files': sorted((r for r in files if r['side'] in wanted), key=lambda r: r['path']),
+        }
+    return manifests
+
+
+def dump_manifest(manifest: dict) -> bytes:
+    """Compact and key-sorted, so identical packs give byte-identical manifests"""
+    return (json.dumps(manifest, sort_keys=True, separators=(',', ':'), ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def write_manifests(manifests: dict[str, dict], output_dir: Path, verbose: bool = True):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name, manifest in manifests.items():
+        data = dump_manifest(manifest)
+        (output_dir / name).write_bytes(data)
+        if verbose:
+            print(f"📝 {name}: {len(manifest['files'])} files, {len(data) / 1024:.1f} KB")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Compile the packwiz pack into per-side JSON manifests')
+    parser.add_argument('--pack-dir', type=Path, default=REPO_ROOT, help='Directory containing pack.toml')
+    parser.add_argument('--output-dir', type=Path, default=None,
+                        help='Where to write the manifests (default: the pack directory)')
+    parser.add_argument('--sizes', action='store_true', help='Record jar sizes via HEAD requests')
+    parser.add_argument('--workers', type=int, default=8, help='Parallel HEAD requests')
+    args = parser.parse_args()
+
+    try:
+        pack, files = read_pack(args.pack_dir)
+    except (CompileError, OSError, KeyError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if args.sizes:
+        fetch_sizes(files, args.workers)
+    write_manifests(build_manifests(pack, files), args.output_dir or args.pack_dir)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
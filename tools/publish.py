@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH Static Publisher
+Builds the deploy directory for the pack host from the repo.
+
+Layout of the output:
+
+  pack.toml                  the only mutable file (short cache, revalidated)
+  index.toml, mods/, ...     repo layout, for packwiz-installer and older clients
+  manifest-{side}.json       compiled manifests (tools/compile_manifest.py)
+  v/<index hash[:16]>/       immutable snapshot of everything pack.toml pins by
+                             hash: index, metafiles, raw files and manifests
+  v/published.json           the mutable paths above, so the next publish
+                             deletes only what this one wrote
+  lod/                       Distant Horizons LODs (server/export_lods.py), left
+                             in place; only lod/index.json changes
+  _headers, nginx-dhh.conf   cache rules for Netlify/Cloudflare Pages and nginx
+
+Text files get precompressed .gz (and .zst when the zstandard module is
+installed) siblings for gzip_static/zstd_static style serving. File mtimes
+are derived from content, so servers that build ETags from mtime and size
+(nginx, Caddy) produce the same ETag on every deploy until a file changes.
+
+    python tools/publish.py --out dist
+    rsync -a --delete dist/ host:/srv/dhh/
+"""
+
+import os
+import sys
+import json
+import gzip
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Optional
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from compile_manifest import CompileError, read_pack, fetch_sizes, build_manifests, dump_manifest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SNAPSHOT_DIR = 'v'
+LOD_DIR = 'lod'  # Written by server/export_lods.py, kept across publishes
+LOD_INDEX = 'lod/index.json'
+HISTORY_FILE = 'history.json'  # Snapshot ids, newest first
+PUBLISHED_FILE = 'published.json'  # Next to history.json: the mutable paths the last publish wrote
+KEEP_SNAPSHOTS = 5  # Older clients may still be mid-update against a previous index
+COMPRESSIBLE = ('.toml', '.json', '.json5', '.txt', '.properties', '.cfg', '.yml', '.yaml')
+MIN_SAVING = 0.1  # Skip a compressed variant that saves less than 10%
+IMMUTABLE_MTIME = 1_000_000_000  # Snapshot content never changes under its path
+MUTABLE_MTIME_BASE = 1_200_000_000  # Plus a content-derived offset, see content_mtime()
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+METADATA_CACHE = 'public, max-age=300, must-revalidate'
+PACK_CACHE = 'no-cache'
+
+
+def log(message: str):
+    print(message, flush=True)
+
+
+def content_mtime(data: bytes) -> int:
+    """A stable mtime that changes whenever the content does (for mtime/size ETags)"""
+    return MUTABLE_MTIME_BASE + int(hashlib.sha256(data).hexdigest()[:7], 16)
+
+
+def write_file(path: Path, data: bytes, mtime: int, compress: bool,
+               written: Optional[list] = None) -> tuple[int, int]:
+    """Write data plus precompressed variants; returns (raw bytes, smallest variant bytes)
+
+    Every path written is appended to `written`, if given.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+    if written is not None:
+        written.append(path)
+    smallest = len(data)
+    if not compress or not path.name.endswith(COMPRESSIBLE):
+        return len(data), smallest
+
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if zstandard is not None:
+        variants['.zst'] = zstandard.ZstdCompressor(level=19).compress(data)
+    for suffix, packed in variants.items():
+        variant = path.with_name(path.name + suffix)
+        if len(packed) > len(data) * (1 - MIN_SAVING):
+            variant.unlink(missing_ok=True)
+            continue
+        variant.write_bytes(packed)
+        os.utime(variant, (mtime, mtime))
+        if written is not None:
+            written.append(variant)
+        smallest = min(smallest, len(packed))
+    return len(data), smallest
+
+
+def verify(pack_dir: Path, rel_path: str, hash_format: str, expected: str) -> Optional[bytes]:
+    """Local bytes of an index entry, or None if missing or not what the index pins"""
+    try:
+        data = (pack_dir / rel_path).read_bytes()
+    except FileNotFoundError:
+        return None
+    if hashlib.new(hash_format, data).hexdigest() != expected.lower():
+        return None
+    return data
+
+
+def collect(pack_dir: Path, force: bool) -> tuple[bytes, dict, dict[str, bytes]]:
+    """pack.toml bytes, parsed pack and {path: bytes} of everything it pins, all verified"""
+    pack_data = (pack_dir / 'pack.toml').read_bytes()
+    pack = tomllib.loads(pack_data.decode('utf-8'))
+    index_file = pack['index']['file']
+    index_data = verify(pack_dir, index_file, pack['index'].get('hash-format', 'sha256'), pack['index']['hash'])
+    if index_data is None:
+        raise CompileError(f"{index_file} does not match pack.toml (run packwiz refresh)")
+    index = tomllib.loads(index_data.decode('utf-8'))
+    default_format = index.get('hash-format', 'sha256')
+
+    files = {index_file: index_data}
+    problems = []
+    for entry in index.get('files', []):
+        data = verify(pack_dir, entry['file'], entry.get('hash-format', default_format), entry['hash'])
+        if data is None:
+            problems.append(entry['file'])
+        else:
+            files[entry['file']] = data
+    if problems:
+        for rel_path in problems:
+            log(f"{'⚠️ ' if force else '❌'} {rel_path} is missing or does not match index.toml")
+        if not force:
+            raise CompileError(f"{len(problems)} file(s) would fail client hash checks "
+                               "(run packwiz refresh, check line endings, or pass --force)")
+    return pack_data, pack, files
+
+
+def check_out(out: Path, pack_dir: Path):
+    """Refuse to publish into a directory this tool did not create, or over the pack itself"""
+    out, pack_dir = out.resolve(), pack_dir.resolve()
+    if pack_dir.is_relative_to(out):
+        raise CompileError(f"--out {out} contains the pack directory; use an empty directory such as dist/")
+    if not out.is_dir() or (out / SNAPSHOT_DIR / HISTORY_FILE).is_file():
+        return
+    foreign = sorted(child.name for child in out.iterdir() if child.name != LOD_DIR)
+    if foreign:
+        raise CompileError(f"--out {out} is not a publish directory (no {SNAPSHOT_DIR}/{HISTORY_FILE}) "
+                           f"and is not empty: {', '.join(foreign[:5])}{', ...' if len(foreign) > 5 else ''}")
+
+
+def clean_root(out: Path):
+    """Remove the mutable files the previous publish wrote; nothing else in out is touched"""
+    try:
+        published = json.loads((out / SNAPSHOT_DIR / PUBLISHED_FILE).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return
+    parents = set()
+    for rel_path in published:
+        path = out / rel_path
+        if '..' in Path(rel_path).parts or rel_path.split('/')[0] in (SNAPSHOT_DIR, LOD_DIR):
+            continue
+        path.unlink(missing_ok=True)
+        parents.update(p for p in path.parents if p != out and p.is_relative_to(out))
+    # Directories the publish created and that are now empty, deepest first
+    for directory in sorted(parents, key=lambda p: len(p.parts), reverse=True):
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
+
+
+def prune_snapshots(out: Path, snapshot_id: str, keep: int) -> list[str]:
+    """Record the new snapshot and delete all but the newest `keep`"""
+    history_path = out / SNAPSHOT_DIR / HISTORY_FILE
+    try:
+        history = json.loads(history_path.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        history = []
+    history = [snapshot_id] + [h for h in history if h != snapshot_id]
+    for old in history[keep:]:
+        shutil.rmtree(out / SNAPSHOT_DIR / old, ignore_errors=True)
+    history = history[:keep]
+    history_path.write_text(json.dumps(history, indent=2) + '\n', encoding='utf-8')
+    return history
+
+
+def snapshot_pack_toml(pack_data: bytes, index_file: str, snapshot: str) -> bytes:
+    """pack.toml pointing at the snapshot's index (same index bytes, so the hash still matches)"""
+    text = pack_data.decode('utf-8')
+    old = f'file = "{index_file}"'
+    if old not in text:
+        raise CompileError('Cannot find [index] file in pack.toml to rewrite')
+    return text.replace(old, f'file = "{snapshot}{index_file}"', 1).encode('utf-8')
+
+
+def write_headers(out: Path, top_level: set[str]):
+    """Cache rules: pack.toml and the LOD index revalidated, snapshots and LODs immutable, the rest short-lived"""
+    rules = [('/pack.toml', PACK_CACHE), (f'/{SNAPSHOT_DIR}/*', IMMUTABLE_CACHE),
+             (f'/{LOD_INDEX}', PACK_CACHE), (f'/{LOD_DIR}/*/*', IMMUTABLE_CACHE)]
+    for name in sorted(top_level):
+        rules.append((f'/{name}/*' if (out / name).is_dir() else f'/{name}', METADATA_CACHE))
+    (out / '_headers').write_text(
+        ''.join(f'{path}\n  Cache-Control: {value}\n' for path, value in rules), encoding='utf-8')
+
+    (out / 'nginx-dhh.conf').write_text(f'''# Include inside the server {{}} block that serves this directory
+gzip_static on;
+# zstd_static on;  # with the zstd module
+
+location = /pack.toml {{
+    add_header Cache-Control "{PACK_CACHE}";
+}}
+
+location /{SNAPSHOT_DIR}/ {{
+    add_header Cache-Control "{IMMUTABLE_CACHE}";
+}}
+
+location = /{LOD_INDEX} {{
+    add_header Cache-Control "{PACK_CACHE}";
+}}
+
+location /{LOD_DIR}/ {{
+    add_header Cache-Control "{IMMUTABLE_CACHE}";
+}}
+
+location / {{
+    add_header Cache-Control "{METADATA_CACHE}";
+}}
+''', encoding='utf-8')
+
+
+def publish(pack_dir: Path, out: Path, keep: int, sizes: bool, snapshot_index: bool,
+            compress: bool, force: bool) -> int:
+    check_out(out, pack_dir)
+    pack_data, pack, files = collect(pack_dir, force)
+    _, records = read_pack(pack_dir)
+    if sizes:
+        fetch_sizes(records, workers=8)
+
+    # Manifests are published alongside the files they describe
+    for name, manifest in build_manifests(pack, records).items():
+        files[name] = dump_manifest(manifest)
+
+    snapshot_id = pack['index']['hash'].lower()[:16]
+    snapshot = f'{SNAPSHOT_DIR}/{snapshot_id}/'
+    out.mkdir(parents=True, exist_ok=True)
+    clean_root(out)
+
+    # Immutable snapshot: content under this path never changes, so it is
+    # written once (via a temporary directory, in case the publish dies)
+    snapshot_dir = out / snapshot
+    if snapshot_dir.is_dir():
+        log(f"♻️  Snapshot {snapshot_id} already published")
+    else:
+        staging = out / SNAPSHOT_DIR / f'.tmp-{snapshot_id}'
+        shutil.rmtree(staging, ignore_errors=True)
+        for rel_path, data in files.items():
+            write_file(staging / rel_path, data, IMMUTABLE_MTIME, compress)
+        os.replace(staging, snapshot_dir)
+
+    # Mutable repo layout, for packwiz-installer and clients that predate the snapshot
+    raw_total = packed_total = 0
+    written = []
+    for rel_path, data in files.items():
+        raw, packed = write_file(out / rel_path, data, content_mtime(data), compress, written)
+        raw_total += raw
+        packed_total += packed
+
+    if snapshot_index:
+        pack_data = snapshot_pack_toml(pack_data, pack['index']['file'], snapshot)
+    write_file(out / 'pack.toml', pack_data, content_mtime(pack_data), compress, written)
+
+    top_level = {path.relative_to(out).parts[0] for path in written
+                 if not path.name.endswith(('.gz', '.zst'))} - {'pack.toml'}
+    write_headers(out, top_level)
+    written += [out / '_headers', out / 'nginx-dhh.conf']
+    history = prune_snapshots(out, snapshot_id, keep)
+    (out / SNAPSHOT_DIR / PUBLISHED_FILE).write_text(
+        json.dumps(sorted(path.relative_to(out).as_posix() for path in written), indent=2) + '\n', encoding='utf-8')
+
+    log(f"📦 {pack.get('name')} {pack.get('version')}: {len(files)} files, snapshot {snapshot_id} "
+        f"({len(history)} kept)")
+    if raw_total:
+        log(f"🗜️  {raw_total / 1024:.0f} KB of pack data, {packed_total / 1024:.0f} KB precompressed "
+            f"({'gzip + zstd' if zstandard else 'gzip'})")
+    log(f"✅ Published to {out}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Build the static deploy directory for the pack host')
+    parser.add_argument('--pack-dir', type=Path, default=REPO_ROOT, help='Directory containing pack.toml')
+    parser.add_argument('--out', type=Path, default=REPO_ROOT / 'dist', help='Deploy directory')
+    parser.add_argument('--keep', type=int, default=KEEP_SNAPSHOTS, help='Snapshots to keep under v/')
+    parser.add_argument('--sizes', action='store_true', help='Record jar sizes in the manifests (HEAD requests)')
+    parser.add_argument('--snapshot-index', action='store_true',
+                        help='Point pack.toml at the immutable index copy (v/<id>/index.toml)')
+    parser.add_argument('--no-compress', action='store_true', help='Skip .gz/.zst variants')
+    parser.add_argument('--force', action='store_true',
+                        help='Publish even if local files do not match index.toml')
+    args = parser.parse_args()
+
+    try:
+        return publish(args.pack_dir, args.out, args.keep, args.sizes, args.snapshot_index,
+                       not args.no_compress, args.force)
+    except (CompileError, OSError, KeyError) as e:
+        log(f"❌ {e}")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
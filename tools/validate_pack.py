@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DHH Pack Validator
+Checks every [download] url of the pack concurrently and writes one JSON report.
+
+`packwiz refresh --check` downloads the mods one by one. This sends a HEAD
+request per file (bounded overall and per host), optionally streams each
+file to compare its hash with the one the metafile pins (--hash), and
+compares sizes with a previous report (--baseline), so a pack bump can be
+gated in seconds:
+
+    python tools/validate_pack.py                        # links only
+    python tools/validate_pack.py --hash --report validation.json
+    python tools/validate_pack.py --baseline validation.json   # after a bump: size deltas
+
+Exit code 1 means a dead link or hash drift; details are in the report.
+"""
+
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from compile_manifest import CompileError, read_pack
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+USER_AGENT = 'DHH-Pack-Validator'
+WORKERS = 16  # Concurrent requests overall
+PER_HOST = 8  # Concurrent requests per host
+TIMEOUT = 30
+RETRIES = 2  # Extra attempts after a network error or 5xx
+CHUNK_SIZE = 1024 * 1024
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+class HostLimiter:
+    """One semaphore per host, so a single CDN is not hit with every request at once"""
+
+    def __init__(self, per_host: int):
+        self.per_host = per_host
+        self._slots: dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def slot(self, url: str) -> threading.Semaphore:
+        with self._lock:
+            return self._slots.setdefault(urlsplit(url).netloc, threading.Semaphore(self.per_host))
+
+
+def request(url: str, method: str, headers: Optional[dict] = None):
+    return urllib.request.urlopen(urllib.request.Request(
+        url, method=method, headers={'User-Agent': USER_AGENT, **(headers or {})}), timeout=TIMEOUT)
+
+
+def probe(record: dict, check_hash: bool) -> dict:
+    """HEAD (or, with check_hash, GET and hash) one file; never raises"""
+    result = {'status': None, 'size': None, 'final_url': None, 'error': None}
+    for attempt in range(RETRIES + 1):
+        try:
+            if check_hash:
+                hasher = hashlib.new(record['hash_format'])
+                size = 0
+                with request(record['url'], 'GET') as resp:
+                    result['status'] = resp.status
+                    result['final_url'] = resp.url
+                    for chunk in iter(lambda: resp.read(CHUNK_SIZE), b''):
+                        hasher.update(chunk)
+                        size += len(chunk)
+                result['size'] = size
+                result['hash_ok'] = hasher.hexdigest() == record['hash']
+            else:
+                try:
+                    with request(record['url'], 'HEAD') as resp:
+                        result['status'] = resp.status
+                        result['final_url'] = resp.url
+                        length = resp.headers.get('Content-Length')
+                except urllib.error.HTTPError as e:
+                    if e.code not in (403, 405, 501):
+                        raise
+                    # Some hosts refuse HEAD; one byte of a GET says as much
+                    with request(record['url'], 'GET', {'Range': 'bytes=0-0'}) as resp:
+                        result['status'] = resp.status
+                        result['final_url'] = resp.url
+                        content_range = resp.headers.get('Content-Range', '')
+                        length = content_range.rpartition('/')[2] if '/' in content_range else None
+                result['size'] = int(length) if length and length.isdigit() else None
+            result['error'] = None
+            return result
+        except urllib.error.HTTPError as e:
+            result['status'] = e.code
+            result['error'] = f"HTTP {e.code}"
+            if e.code < 500:
+                return result
+        except (OSError, ValueError) as e:
+            result['error'] = str(getattr(e, 'reason', e))
+        if attempt < RETRIES:
+            time.sleep(2 ** attempt)
+    return result
+
+
+def validate(records: list[dict], check_hash: bool, baseline: dict, workers: int, per_host: int) -> list[dict]:
+    limiter = HostLimiter(per_host)
+
+    def check(record):
+        started = time.monotonic()
+        with limiter.slot(record['url']):
+            result = probe(record, check_hash)
+        entry = {
+            'path': record['path'],
+            'url': record['url'],
+            'side': record['side'],
+            'ms': round((time.monotonic() - started) * 1000),
+            **result,
+        }
+        if entry['final_url'] == record['url']:
+            del entry['final_url']
+        entry['ok'] = entry['error'] is None and entry.get('hash_ok', True)
+
+        previous = baseline.get(record['path'])
+        if previous and previous.get('size') is not None and entry['size'] is not None:
+            entry['previous_size'] = previous['size']
+            entry['size_delta'] = entry['size'] - previous['size']
+        return entry
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(check, records))
+
+
+def summarize(entries: list[dict], seconds: float, baseline: dict) -> dict:
+    sizes = [e['size'] for e in entries if e['size'] is not None]
+    current = {e['path'] for e in entries}
+    return {
+        'files': len(entries),
+        'ok': sum(e['ok'] for e in entries),
+        'dead': sorted(e['path'] for e in entries if e['error'] is not None),
+        'hash_drift': sorted(e['path'] for e in entries if e.get('hash_ok') is False),
+        'unknown_size': sum(e['size'] is None for e in entries),
+        'total_bytes': sum(sizes),
+        'size_delta_bytes': sum(e.get('size_delta', 0) for e in entries),
+        'added': sorted(current - set(baseline)) if baseline else [],
+        'removed': sorted(set(baseline) - current),
+        'seconds': round(seconds, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Check every download URL of the pack concurrently')
+    parser.add_argument('--pack-dir', type=Path, default=REPO_ROOT, help='Directory containing pack.toml')
+    parser.add_argument('--hash', action='store_true', help='Download every file and compare its hash')
+    parser.add_argument('--report', type=Path, default=None, help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', type=Path, default=None, help='Previous report to compute size deltas against')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Concurrent requests')
+    parser.add_argument('--per-host', type=int, default=PER_HOST, help='Concurrent requests per host')
+    args = parser.parse_args()
+
+    try:
+        pack, records = read_pack(args.pack_dir)
+    except (CompileError, OSError, KeyError) as e:
+        log(f"❌ {e}")
+        return 1
+    # Raw files are served from the pack host itself and were checked against the index above
+    records = [r for r in records if urlsplit(r['url']).scheme in ('http', 'https')]
+
+    baseline = {}
+    if args.baseline:
+        try:
+            baseline = {e['path']: e for e in json.loads(args.baseline.read_text(encoding='utf-8'))['files']}
+        except (OSError, ValueError, KeyError) as e:
+            log(f"⚠️  Ignoring baseline {args.baseline}: {e}")
+
+    log(f"🔎 Checking {len(records)} downloads of {pack.get('name')} {pack.get('version')} "
+        f"({'full hash check' if args.hash else 'HEAD'}, {args.workers} workers)")
+    started = time.monotonic()
+    entries = validate(records, args.hash, baseline, args.workers, args.per_host)
+    summary = summarize(entries, time.monotonic() - started, baseline)
+
+    for entry in entries:
+        if entry['error']:
+            log(f"💀 {entry['path']}: {entry['error']} ({entry['url']})")
+        elif entry.get('hash_ok') is False:
+            log(f"⚠️  {entry['path']}: hash does not match the metafile")
+        elif entry.get('size_delta'):
+            log(f"📏 {entry['path']}: {entry['size_delta']:+d} bytes")
+
+    report = {
+        'pack': {'name': pack.get('name'), 'version': pack.get('version'),
+                 'index_hash': pack['index']['hash'].lower()},
+        'checked_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'hash_checked': args.hash,
+        'summary': summary,
+        'files': sorted(entries, key=lambda e: e['path']),
+    }
+    data = json.dumps(report, indent=2, ensure_ascii=False) + '\n'
+    if args.report:
+        args.report.write_text(data, encoding='utf-8')
+    else:
+        sys.stdout.write(data)
+
+    failed = len(summary['dead']) + len(summary['hash_drift'])
+    log(f"{'❌' if failed else '✅'} {summary['ok']}/{summary['files']} OK in {summary['seconds']}s, "
+        f"{summary['total_bytes'] / 1024 / 1024:.1f} MB"
+        + (f", {summary['size_delta_bytes']:+d} bytes vs baseline" if baseline else ''))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())